@@ -3,11 +3,48 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from core.abcp import compute_abcp, load_tables_preview, load_ca_lookup, lookup_ca
-from core.pdf_utils import generate_traco_pdf
+from core.abcp import compute_abcp, load_ca_lookup, lookup_ca
+from core.pdf_utils import render_traco_pdf
+from core import instrument
+from core.cache import LRUCache, source_key
 
 st.set_page_config(page_title="Dosagem ABCP - Concreto", page_icon="🧮", layout="wide")
 
+# Diagnóstico: um Recorder por sessão (desligado até marcar a opção na barra lateral)
+if "diag_recorder" not in st.session_state:
+    st.session_state["diag_recorder"] = instrument.Recorder("sessao", enabled=False)
+diag = st.session_state["diag_recorder"]
+instrument.activate(diag)
+
+
+# Tabelas lidas do Excel, compartilhadas entre reruns e sessões do servidor.
+# Chave = hash do conteúdo: o mesmo arquivo nos dois uploaders (ou enviado por
+# técnicos diferentes) é lido uma única vez.
+@st.cache_resource
+def tabelas_cache() -> LRUCache:
+    return LRUCache(maxsize=32)
+
+
+def cached_ca_lookup(src):
+    cache = tabelas_cache()
+    key = source_key(src, cache)
+    return cache.get_or_set(("ca_lookup", key), lambda: load_ca_lookup(src))
+
+
+@st.cache_resource
+def traco_archive():
+    # Um escritor por processo para o arquivo histórico de traços
+    from core.archive import TracoArchive, archive_dir
+    return TracoArchive(archive_dir())
+
+
+def cached_sheet_viewer(src):
+    from core.sheetview import SheetViewer
+    cache = tabelas_cache()
+    key = source_key(src, cache)
+    return cache.get_or_set(("viewer", key), lambda: SheetViewer(src))
+
+
 # --- Sidebar: identificação + Excel ---
 with st.sidebar:
     st.header("📋 Identificação")
@@ -19,6 +56,8 @@ with st.sidebar:
     st.subheader("📄 Excel com Tabelas (opcional)")
     excel_file = st.file_uploader("Carregar Excel (para lookup automático do Ca)", type=["xlsx"], key="uploader_sidebar")
     st.caption("Se não carregar, você pode informar o Ca manualmente.")
+    st.markdown("---")
+    diag.enabled = st.checkbox("⏱️ Coletar tempos (diagnóstico)", value=diag.enabled)
 
 st.title("🧮 Dosagem de Concreto — Método ABCP")
 tab_calc, tab_tabelas = st.tabs(["🧪 Dosagem ABCP", "📚 Tabelas (consulta)"])
@@ -34,10 +73,14 @@ elif base_excel_path.exists():
 # Ca lookup (se possível)
 ca_lookup = None
 if excel_path is not None:
-    ca_lookup = load_ca_lookup(excel_path)
+    ca_lookup = cached_ca_lookup(excel_path)
 
 # --- Aba 1: Dosagem ---
-with tab_calc:
+# Fragmento: mudar uma entrada reexecuta só esta seção (compute_abcp + tabelas),
+# sem repassar pela barra lateral, pelo Excel e pela aba de tabelas.
+@st.fragment
+def secao_dosagem(ca_lookup, ident):
+    instrument.activate(st.session_state["diag_recorder"])
     st.subheader("1) Entradas")
     colA, colB, colC, colD = st.columns([1,1,1,1])
 
@@ -153,16 +196,49 @@ with tab_calc:
 
     st.markdown("---")
     st.subheader("4) Gerar PDF do Traço")
-    ident = dict(projeto=projeto, tecnico=tecnico, uso=uso, fabricado_em=fabricado_em)
     if st.button("Gerar PDF"):
-        pdf_path = Path("traco_abcp.pdf")
-        generate_traco_pdf(str(pdf_path), ident, inputs, out)
-        with open(pdf_path, "rb") as f:
-            st.download_button("Baixar PDF", f, file_name="traco_abcp.pdf", mime="application/pdf")
+        pdf_bytes = render_traco_pdf(ident, inputs, out)
+        st.download_button("Baixar PDF", pdf_bytes, file_name="traco_abcp.pdf", mime="application/pdf")
+    if st.button("Arquivar traço"):
+        arq = traco_archive()
+        arq.append_one(ident, inputs, out)
+        st.success(f"Traço arquivado ({len(arq):,} no histórico).")
 
     st.caption("Obs.: Água a adicionar = P33 + Água absorvida (agregados) − Água de umidade (agregados).")
 
+
+with tab_calc:
+    secao_dosagem(ca_lookup, dict(projeto=projeto, tecnico=tecnico, uso=uso, fabricado_em=fabricado_em))
+
 # --- Aba 2: Tabelas ---
+# Navegação paginada em qualquer aba do Excel: só a página pedida é lida.
+@st.fragment
+def secao_tabelas(xp):
+    instrument.activate(st.session_state["diag_recorder"])
+    try:
+        navegar_tabelas(xp)
+    except Exception as e:
+        # arquivo que não é .xlsx válido (zip corrompido, XML malformado...)
+        st.warning(f"Aviso: não foi possível ler o Excel: {e}")
+
+
+def navegar_tabelas(xp):
+    viewer = cached_sheet_viewer(xp)
+    sheet = st.selectbox("Aba da planilha", viewer.sheetnames)
+    max_row, max_col = viewer.dimensions(sheet)
+    c1, c2, c3, c4 = st.columns(4)
+    por_pagina = c1.selectbox("Linhas por página", [25, 50, 100, 200], index=1)
+    n_paginas = max(1, -(-max_row // por_pagina))
+    pagina = c2.number_input("Página", min_value=1, max_value=n_paginas, value=1, step=1)
+    col0 = c3.number_input("Coluna inicial", min_value=1, max_value=max(max_col, 1), value=1, step=1)
+    n_cols = c4.selectbox("Colunas", [10, 26, 52], index=1)
+    n_cols = min(n_cols, max(max_col - int(col0) + 1, 1))
+    st.caption(f"{max_row:,} linhas × {max_col} colunas — página {pagina} de {n_paginas}")
+    df = viewer.page(sheet, (int(pagina) - 1) * por_pagina + 1, por_pagina, int(col0), n_cols)
+    # tipos misturados por coluna (texto e número) -> texto para exibir
+    st.dataframe(df.astype("string"), use_container_width=True, height=min(36 * por_pagina, 640))
+
+
 with tab_tabelas:
     st.subheader("Tabelas de consulta (somente leitura)")
     excel_file_tab = st.file_uploader("Carregar Excel com tabelas (opcional)", type=["xlsx"], key="uploader_tab")
@@ -173,9 +249,33 @@ with tab_tabelas:
     elif base_path.exists():
         xp = str(base_path)
     if xp is not None:
-        previews = load_tables_preview(xp)
-        for name, df in previews.items():
-            st.markdown(f"### {name}")
-            st.dataframe(df, use_container_width=True, height=320)
+        secao_tabelas(xp)
     else:
         st.info("Coloque seu Excel em `data/04_Dosagem_Concreto_ABCP_sem-leg.xlsx` ou faça upload acima.")
+
+# --- Painel de diagnóstico (opcional) ---
+# Fragmento próprio e relido a cada 2 s: as seções acima também rodam sozinhas
+# (fragmentos), e o painel precisa mostrar o que elas acabaram de medir.
+@st.fragment(run_every="2s")
+def painel_diagnostico():
+    diag = st.session_state["diag_recorder"]
+    with st.expander("⏱️ Diagnóstico", expanded=True):
+        summary = diag.summary()
+        if summary["spans"]:
+            st.dataframe(pd.DataFrame([
+                {"Etapa": k, "Chamadas": v["count"], "Total (ms)": round(v["total_s"]*1000, 2),
+                 "Média (ms)": round(v["mean_s"]*1000, 3), "Máx (ms)": round(v["max_s"]*1000, 3)}
+                for k, v in summary["spans"].items()
+            ]), use_container_width=True, hide_index=True)
+        for k, v in summary["counters"].items():
+            st.caption(f"{k}: {v:,}")
+        # exportações geradas só no clique (não a cada atualização do painel)
+        st.download_button("Exportar JSON", lambda: diag.to_json(indent=2), file_name="abcp_diagnostico.json", mime="application/json")
+        st.download_button("Exportar Chrome trace", diag.to_chrome_trace, file_name="abcp_trace.json", mime="application/json")
+        if st.button("Zerar diagnóstico"):
+            diag.reset()
+            st.rerun(scope="fragment")
+
+if diag.enabled:
+    with st.sidebar:
+        painel_diagnostico()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Teste de carga do serviço HTTP (core.server), só com a biblioteca padrão.
+#   python -m bench.load_test --spawn --concurrency 32 --duration 10
+#   python -m bench.load_test --url http://127.0.0.1:8765 --mix compute=8,batch=1,ca=2,pdf=1
+# Com --spawn sobe o servidor numa porta livre com um Excel sintético.
+# Relata, por endpoint e no total: requisições, erros, rps, p50/p90/p99/máx.
+
+BASE_MIX = dict(
+    ac=0.45, Ca_L=200.0, rho_w=1000.0, Cc_min=320.0, rho_c=3100.0, rho_s_grain=2650.0,
+    rho_b_menor=2700.0, rho_b_maior=2700.0, Cb_total=1065.0, perc_b_menor=50,
+    U_areia=6.0, I_inch=20.0, rho_s_bulk=1470.0, a_areia=0.0, a_brita=1.0, U_brita=0.0,
+)
+
+
+def _requests(batch_size: int) -> Dict[str, Tuple[str, bytes]]:
+    mixes = [dict(BASE_MIX, ac=0.35 + 0.3 * i / max(batch_size - 1, 1)) for i in range(batch_size)]
+    return {
+        "compute": ("/compute", json.dumps(BASE_MIX).encode()),
+        "batch": ("/compute/batch", json.dumps({"mixes": mixes}).encode()),
+        "ca": ("/tables/ca", json.dumps({"dmax": 19, "slump": "60-80"}).encode()),
+        "limits": ("/tables/limits", json.dumps({"tipo": "CA", "classe": "II"}).encode()),
+        "pdf": ("/pdf", json.dumps({"ident": {"projeto": "Carga"}, "inputs": BASE_MIX}).encode()),
+    }
+
+
+def _parse_mix(text: str) -> List[str]:
+    # "compute=8,batch=1" -> sequência ponderada de nomes
+    seq: List[str] = []
+    for part in text.split(","):
+        name, _, w = part.partition("=")
+        seq += [name.strip()] * int(w or 1)
+    return seq
+
+
+def percentile(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return float("nan")
+    k = min(int(round(p / 100.0 * (len(sorted_vals) - 1))), len(sorted_vals) - 1)
+    return sorted_vals[k]
+
+
+async def _client(host: str, port: int, plan: List[str], reqs, deadline: float,
+                  results: Dict[str, List[float]], errors: Dict[str, int], offset: int):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            name = plan[i % len(plan)]
+            i += 1
+            path, body = reqs[name]
+            msg = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+            t0 = time.perf_counter()
+            writer.write(msg)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            dt = time.perf_counter() - t0
+            if status == 200:
+                results.setdefault(name, []).append(dt)
+            else:
+                errors[f"{name}:{status}"] = errors.get(f"{name}:{status}", 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, concurrency: int, duration: float, plan: List[str],
+                   batch_size: int) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    reqs = _requests(batch_size)
+    results: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    t0 = time.perf_counter()
+    deadline = t0 + duration
+    await asyncio.gather(*[_client(host, port, plan, reqs, deadline, results, errors, k)
+                           for k in range(concurrency)])
+    return results, errors, time.perf_counter() - t0
+
+
+def report(results: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, Dict[str, float]]:
+    rows = {}
+    allv: List[float] = []
+    for name, vals in sorted(results.items()):
+        allv += vals
+        rows[name] = vals
+    rows["TOTAL"] = allv
+    out = {}
+    print(f"{'endpoint':<10} {'req':>8} {'rps':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    for name, vals in rows.items():
+        s = sorted(vals)
+        st = {"requests": len(s), "rps": len(s) / elapsed,
+              "p50_ms": percentile(s, 50) * 1e3, "p90_ms": percentile(s, 90) * 1e3,
+              "p99_ms": percentile(s, 99) * 1e3, "max_ms": (s[-1] if s else float("nan")) * 1e3}
+        out[name] = st
+        print(f"{name:<10} {st['requests']:>8} {st['rps']:>9.1f} {st['p50_ms']:>8.2f} "
+              f"{st['p90_ms']:>8.2f} {st['p99_ms']:>8.2f} {st['max_ms']:>8.2f}")
+    if errors:
+        print("erros:", ", ".join(f"{k}={v}" for k, v in sorted(errors.items())))
+    return out
+
+
+def _spawn(workers: int) -> Tuple[subprocess.Popen, int, str]:
+    from .synthetic import make_workbook
+    tmp = tempfile.mkdtemp(prefix="abcp-load-")
+    xlsx = make_workbook(Path(tmp) / "abcp.xlsx")
+    env = dict(os.environ, ABCP_CACHE_DIR=str(Path(tmp) / "cache"))
+    proc = subprocess.Popen([sys.executable, "-m", "core.server", "--port", "0", "--excel", str(xlsx),
+                             "--workers", str(workers)], stderr=subprocess.PIPE, env=env,
+                            cwd=str(Path(__file__).resolve().parent.parent), text=True)
+    line = proc.stderr.readline()
+    if "http://" not in line:
+        proc.kill()
+        raise SystemExit(f"Servidor não subiu: {line}{proc.stderr.read()}")
+    port = int(line.rsplit(":", 1)[1])
+    return proc, port, tmp
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench.load_test", description="Teste de carga do serviço HTTP ABCP (p50/p99, rps).")
+    p.add_argument("--url", default="http://127.0.0.1:8765")
+    p.add_argument("--spawn", action="store_true", help="sobe um servidor local com Excel sintético")
+    p.add_argument("--server-workers", type=int, default=2)
+    p.add_argument("--concurrency", type=int, default=16, help="conexões simultâneas (keep-alive)")
+    p.add_argument("--duration", type=float, default=5.0, help="segundos")
+    p.add_argument("--mix", default="compute=8,batch=1,ca=2,limits=1",
+                   help="pesos por endpoint (compute, batch, ca, limits, pdf)")
+    p.add_argument("--batch-size", type=int, default=100, help="traços por requisição de lote")
+    p.add_argument("--json", help="grava o relatório em JSON")
+    args = p.parse_args(argv)
+
+    proc: Optional[subprocess.Popen] = None
+    if args.spawn:
+        proc, port, _ = _spawn(args.server_workers)
+        host = "127.0.0.1"
+    else:
+        hostport = args.url.split("://", 1)[-1].rstrip("/")
+        host, _, port_s = hostport.partition(":")
+        port = int(port_s or 80)
+    try:
+        plan = _parse_mix(args.mix)
+        results, errors, elapsed = asyncio.run(
+            run_load(host, port, args.concurrency, args.duration, plan, args.batch_size))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+    out = report(results, errors, elapsed)
+    if args.json:
+        Path(args.json).write_text(json.dumps({"stats": out, "errors": errors}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
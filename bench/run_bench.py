@@ -0,0 +1,252 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Any, List
+
+# Benchmarks dos caminhos quentes (cálculo, leitura, lookup, prévia, PDF).
+#   python -m bench.run_bench --save bench/baseline.json
+#   python -m bench.run_bench --compare bench/baseline.json --threshold 0.25
+#   python -m bench.run_bench --check-imports     # só o orçamento de import
+# Rodar da raiz do repositório. Não precisa do Excel real: usa bench.synthetic.
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.synthetic import make_workbook  # noqa: E402
+
+BASE_INPUTS = dict(
+    ac=0.45, Ca_L=200.0, rho_w=1000.0, Cc_min=320.0, rho_c=3100.0, rho_s_grain=2650.0,
+    rho_b_menor=2700.0, rho_b_maior=2700.0, Cb_total=1065.0, perc_b_menor=50,
+    U_areia=6.0, I_inch=20.0, rho_s_bulk=1470.0, a_areia=0.0, a_brita=1.0, U_brita=0.0,
+)
+
+# Módulos leves: não podem puxar as dependências pesadas no import
+LIGHT_MODULES = ("core.compute", "core.abcp", "core.abcp_tables", "core.pdf_utils")
+HEAVY_DEPS = ("numpy", "pandas", "openpyxl", "reportlab")
+IMPORT_BUDGET_MS = 100.0
+
+WORKBOOK_SIZES = (0, 5_000, 50_000)
+QUICK_SIZES = (0, 5_000)
+
+
+def _best_time(fn: Callable[[], Any], repeat: int, min_time: float = 0.05) -> float:
+    # Melhor tempo por chamada; como no timeit, chamadas rápidas são repetidas
+    # em laço até somar `min_time`, para o ruído não dominar a medição
+    t = time.perf_counter(); fn(); once = time.perf_counter() - t
+    number = max(1, int(min_time / once)) if once > 0 else 1
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t) / number)
+    return best
+
+
+def _rate(n: int, seconds: float) -> float:
+    return n / seconds if seconds > 0 else float("inf")
+
+
+def _metric(value: float, unit: str, higher_is_better: bool) -> Dict[str, Any]:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_compute(results: Dict[str, Any], repeat: int, n: int):
+    from core.abcp import compute_abcp
+    def run():
+        for _ in range(n):
+            compute_abcp(**BASE_INPUTS)
+    results["compute_abcp.scalar"] = _metric(_rate(n, _best_time(run, repeat)), "calls/s", True)
+
+
+def bench_load(results: Dict[str, Any], repeat: int, workdir: Path, sizes):
+    import core.snapshot as snapshot
+    from core.abcp import load_ca_lookup
+    from core.abcp_tables import load_abcp_tables
+    for size in sizes:
+        path = make_workbook(workdir / f"abcp_{size}.xlsx", extra_rows=size, extra_sheets=1)
+
+        def cold():
+            # cache vazio e sem memo de hash: leitura completa do Excel
+            os.environ["ABCP_CACHE_DIR"] = tempfile.mkdtemp(dir=workdir)
+            snapshot._path_hashes.clear()
+            load_ca_lookup(str(path)); load_abcp_tables(str(path))
+
+        def warm():
+            load_ca_lookup(str(path)); load_abcp_tables(str(path))
+
+        results[f"load.cold.{size}"] = _metric(_best_time(cold, repeat), "s", False)
+        results[f"load.warm.{size}"] = _metric(_best_time(warm, repeat), "s", False)
+
+
+def bench_lookup(results: Dict[str, Any], repeat: int, workdir: Path, n: int):
+    from core.abcp import load_ca_lookup, lookup_ca
+    from core.abcp_tables import load_abcp_tables, lookup_vb_from_tables
+    path = make_workbook(workdir / "abcp_lookup.xlsx")
+    ca = load_ca_lookup(str(path))
+    tables = load_abcp_tables(str(path))
+    d_labels, s_labels = ca["dmax_labels"], ca["slump_labels"]
+    keys = [(d_labels[i % len(d_labels)], s_labels[i % len(s_labels)]) for i in range(n)]
+    mfs = [1.8 + (i % 19) * 0.1 for i in range(n)]
+    dmax3 = tables["tabela3"]["dmax"]
+
+    def run_ca():
+        for d, s in keys:
+            lookup_ca(ca, d, s)
+
+    def run_vb():
+        for i, mf in enumerate(mfs):
+            lookup_vb_from_tables(tables, mf, dmax3[i % len(dmax3)])
+
+    results["lookup_ca"] = _metric(_rate(n, _best_time(run_ca, repeat)), "lookups/s", True)
+    results["lookup_vb_from_tables"] = _metric(_rate(n, _best_time(run_vb, repeat)), "lookups/s", True)
+
+
+def bench_preview(results: Dict[str, Any], repeat: int, workdir: Path):
+    from core.abcp import load_tables_preview
+    path = make_workbook(workdir / "abcp_preview.xlsx", extra_rows=2_000, extra_sheets=2)
+    results["load_tables_preview"] = _metric(_best_time(lambda: load_tables_preview(str(path)), repeat), "s", False)
+
+
+def bench_pdf(results: Dict[str, Any], repeat: int, pages: int):
+    import io
+    from core.abcp import compute_abcp
+    from core.pdf_utils import generate_traco_pdf
+    out = compute_abcp(**BASE_INPUTS)
+    ident = dict(projeto="Benchmark", tecnico="-", uso="Estrutural", fabricado_em="Usina")
+
+    def run():
+        for _ in range(pages):
+            generate_traco_pdf(io.BytesIO(), ident, BASE_INPUTS, out)
+
+    results["generate_traco_pdf"] = _metric(_rate(pages, _best_time(run, repeat)), "pages/s", True)
+
+
+_IMPORT_PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t
+print(json.dumps({{"seconds": dt, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict[str, Any]:
+    # Processo novo a cada medição (sem cache de módulos); melhor de `repeat`
+    best, heavy = float("inf"), []
+    for _ in range(repeat):
+        code = _IMPORT_PROBE.format(module=module, heavy=HEAVY_DEPS)
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        best = min(best, res["seconds"])
+        heavy = res["heavy"]
+    return {"seconds": best, "heavy": heavy}
+
+
+def bench_imports(results: Dict[str, Any], repeat: int):
+    for module in LIGHT_MODULES:
+        results[f"import.{module}"] = _metric(measure_import(module, repeat)["seconds"], "s", False)
+
+
+def check_import_budget(budget_ms: float = IMPORT_BUDGET_MS, repeat: int = 5) -> List[str]:
+    # Trava de regressão do import rápido: orçamento absoluto + nenhuma dependência pesada
+    failures = []
+    for module in LIGHT_MODULES:
+        res = measure_import(module, repeat)
+        ms = res["seconds"] * 1000
+        ok = ms <= budget_ms and not res["heavy"]
+        extra = f" (importou {', '.join(res['heavy'])})" if res["heavy"] else ""
+        print(f"import {module:24s} {ms:8.1f} ms / {budget_ms:.0f} ms{extra}  {'ok' if ok else 'FALHOU'}")
+        if not ok:
+            failures.append(module)
+    return failures
+
+
+def run_all(quick: bool = False) -> Dict[str, Any]:
+    repeat = 2 if quick else 5
+    results: Dict[str, Any] = {}
+    old_cache = os.environ.get("ABCP_CACHE_DIR")
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        os.environ["ABCP_CACHE_DIR"] = str(workdir / "cache")
+        try:
+            bench_imports(results, repeat)
+            bench_compute(results, repeat, 5_000 if quick else 50_000)
+            bench_load(results, repeat, workdir, QUICK_SIZES if quick else WORKBOOK_SIZES)
+            bench_lookup(results, repeat, workdir, 5_000 if quick else 50_000)
+            bench_preview(results, repeat, workdir)
+            bench_pdf(results, repeat, 10 if quick else 50)
+        finally:
+            if old_cache is None:
+                os.environ.pop("ABCP_CACHE_DIR", None)
+            else:
+                os.environ["ABCP_CACHE_DIR"] = old_cache
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "quick": quick, "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    # Regressão relativa: queda de vazão ou aumento de tempo acima de `threshold`
+    failures = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        b, c = base["value"], cur["value"]
+        if base["higher_is_better"]:
+            change = (b - c) / b if b else 0.0
+        else:
+            change = (c - b) / b if b else 0.0
+        status = "REGRESSÃO" if change > threshold else "ok"
+        print(f"{name:32s} {b:14.6g} -> {c:14.6g} {cur['unit']:10s} {change:+8.1%}  {status}")
+        if change > threshold:
+            failures.append(name)
+    return failures
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench.run_bench", description="Benchmarks do app ABCP.")
+    p.add_argument("--save", help="grava os resultados (JSON) neste arquivo")
+    p.add_argument("--compare", help="compara com um baseline (JSON) e falha em regressão")
+    p.add_argument("--threshold", type=float, default=0.25, help="regressão relativa tolerada (padrão: 0.25)")
+    p.add_argument("--quick", action="store_true", help="menos repetições e tamanhos menores")
+    p.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                   help=f"orçamento de tempo de import dos módulos leves (padrão: {IMPORT_BUDGET_MS:.0f} ms)")
+    p.add_argument("--check-imports", "--imports-only", dest="check_imports", action="store_true",
+                   help="só verifica o orçamento de import (independente de --save/--compare)")
+    args = p.parse_args(argv)
+
+    if args.check_imports:
+        if check_import_budget(args.import_budget_ms):
+            print("\nOrçamento de import estourado.")
+            return 1
+        return 0
+
+    current = run_all(quick=args.quick)
+    if args.save:
+        Path(args.save).write_text(json.dumps(current, indent=2), encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        failures = compare(current, baseline, args.threshold)
+        if failures:
+            print(f"\n{len(failures)} caminho(s) regrediram mais de {args.threshold:.0%}: {', '.join(failures)}")
+            return 1
+        return 0
+    for name, m in current["results"].items():
+        print(f"{name:32s} {m['value']:14.6g} {m['unit']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Union
+from openpyxl import Workbook
+from openpyxl.workbook.defined_name import DefinedName
+
+# Excel sintético com o layout esperado por load_abcp_tables (aba ABCP) e os
+# named ranges de load_ca_lookup. Valores plausíveis, não são os da ABCP.
+
+DMAX = [9.5, 19, 25, 32, 38]
+SLUMP = ["40-60", "60-80", "80-100"]
+MF = [1.8, 2.4, 3.0, 3.6]
+
+
+def make_workbook(path: Union[str, Path], extra_rows: int = 0, extra_sheets: int = 0, extra_cols: int = 12) -> Path:
+    # extra_rows/extra_sheets/extra_cols simulam planilhas de usina maiores
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "ABCP"
+
+    # Tabela 1 (linhas 4–9, colunas C–F)
+    for j, v in enumerate(["I", "II", "III", "IV"]): ws.cell(4, 3 + j, v)
+    for j, v in enumerate([0.65, 0.60, 0.55, 0.45]): ws.cell(5, 3 + j, v)
+    for j, v in enumerate([0.60, 0.55, 0.50, 0.45]): ws.cell(6, 3 + j, v)
+    for j, v in enumerate(["C20", "C25", "C30", "C40"]): ws.cell(7, 3 + j, v)
+    for j, v in enumerate(["C25", "C30", "C35", "C40"]): ws.cell(8, 3 + j, v)
+    for j, v in enumerate([260, 280, 320, 360]): ws.cell(9, 3 + j, v)
+
+    # Tabela 4 (Sd por condição A/B/C, linha 5, colunas H–J)
+    for j, v in enumerate([4.0, 5.5, 7.0]): ws.cell(5, 8 + j, v)
+
+    # Tabela 2 (Dmáx na linha 13, Slump em A15:A17) e Tabela 3 (Dmáx na linha 21, MF em A23:A26)
+    for j, v in enumerate(DMAX):
+        ws.cell(13, 2 + j, v)
+        ws.cell(21, 2 + j, v)
+    for i, s in enumerate(SLUMP):
+        ws.cell(15 + i, 1, s)
+        for j in range(len(DMAX)):
+            ws.cell(15 + i, 2 + j, 220 - 10 * min(j, 1) - 5 * j + 5 * i - 15 * min(j, 1))
+    for i, mf in enumerate(MF):
+        ws.cell(23 + i, 1, mf)
+        for j in range(len(DMAX)):
+            ws.cell(23 + i, 2 + j, round(0.645 + 0.05 * j - 0.06 * i, 3))
+
+    # Tabela 5 (britas, linhas 22–26, colunas H–J)
+    britas = [("Brita 0", 9.5, "4,8-9,5"), ("Brita 1", 19, "9,5-19"), ("Brita 2", 25, "19-25"),
+              ("Brita 3", 38, "25-50"), ("Brita 4", 76, "50-76")]
+    for i, (n, d, f) in enumerate(britas):
+        ws.cell(22 + i, 8, n); ws.cell(22 + i, 9, d); ws.cell(22 + i, 10, f)
+
+    # Enchimento abaixo das tabelas
+    for r in range(extra_rows):
+        for c in range(extra_cols):
+            ws.cell(40 + r, 1 + c, r * 0.5 + c)
+
+    for k in range(extra_sheets):
+        wsx = wb.create_sheet(f"Dados{k + 1}")
+        for r in range(max(extra_rows, 1)):
+            for c in range(extra_cols):
+                wsx.cell(1 + r, 1 + c, r + c * 0.25)
+
+    for name, ref in [("Tabela2Ca", "ABCP!$B$15:$F$17"),
+                      ("Tabela2Dmax", "ABCP!$B$13:$F$13"),
+                      ("Tabela2Slump", "ABCP!$A$15:$A$17")]:
+        wb.defined_names[name] = DefinedName(name, attr_text=ref)
+    wb.save(path)
+    return Path(path)
@@ -1,21 +1,32 @@
 
 from __future__ import annotations
-import pandas as pd
-from typing import Dict, Any, Optional, Tuple, List
-from openpyxl import load_workbook
+from typing import Dict, Any, Optional
+from .ingest import WorkbookTables, ingest_workbook
+from . import instrument
 
-def _win(ws, r, c, h, w):
-    return [[ws.cell(row=rr, column=cc).value for cc in range(c, c+w)] for rr in range(r, r+h)]
+def _win(tables: WorkbookTables, key: str):
+    # Janelas já lidas em bloco por ingest_workbook (ver ABCP_WINDOWS)
+    with instrument.span("_win", window=key):
+        return tables.window(key)
 
 def load_abcp_tables(excel_path) -> Dict[str, Any]:
-    wb = load_workbook(excel_path, data_only=True)
-    ws = wb['ABCP'] if 'ABCP' in wb.sheetnames else wb.active
+    if not isinstance(excel_path, WorkbookTables):
+        # snapshot compilado (ver core/snapshot.py); se a aba não pôde ser
+        # interpretada, refaz a leitura para propagar o erro original
+        from .snapshot import compiled_tables
+        compiled = compiled_tables(excel_path)
+        if compiled["abcp_tables"] is not None:
+            return compiled["abcp_tables"]
+        excel_path = ingest_workbook(excel_path)
+    return _parse_abcp_tables(excel_path)
 
+def _parse_abcp_tables(tables: WorkbookTables) -> Dict[str, Any]:
+    import pandas as pd
     # Known anchors from inspection
-    t1 = pd.DataFrame(_win(ws, 1, 1, 12, 12))      # includes Tabela 1 area
-    t2 = pd.DataFrame(_win(ws, 11, 1, 16, 16))     # includes Tabela 2 + 3
-    t4 = pd.DataFrame(_win(ws, 2, 8, 16, 12))      # Tabela 4
-    t5 = pd.DataFrame(_win(ws, 19, 8, 16, 10))     # Tabela 5 (britas)
+    t1 = pd.DataFrame(_win(tables, "t1"))      # includes Tabela 1 area
+    t2 = pd.DataFrame(_win(tables, "t2"))      # includes Tabela 2 + 3
+    t4 = pd.DataFrame(_win(tables, "t4"))      # Tabela 4
+    t5 = pd.DataFrame(_win(tables, "t5"))      # Tabela 5 (britas)
 
     # --- Parse Tabela 1 ---
     # Headers: row 3 contains I, II, III, IV (0-based index 3 -> row 4 human)
@@ -0,0 +1,375 @@
+from __future__ import annotations
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from .compute import ABCP_INPUTS, ABCP_OUTPUTS
+from . import instrument
+
+# Arquivo colunar só de acréscimo com os traços calculados.
+# Um arquivo binário por coluna (float64 / int32 / int64), lido por np.memmap:
+# filtros e agregações tocam só as colunas usadas, sem carregar tudo no pandas.
+# Identificação (projeto, técnico, ...) é codificada em dicionário (int32 -> texto).
+#
+#   <raiz>/meta.json         esquema, nº de linhas, dicionários, índices
+#   <raiz>/<coluna>.col      valores
+#   <raiz>/<coluna>.key      índice: chaves ordenadas (mesmo dtype da coluna)
+#   <raiz>/<coluna>.ord      índice: posição (int64) de cada chave ordenada
+#
+# meta.json é gravado por último (troca atômica): uma gravação interrompida
+# não aparece para quem lê, e o lixo no fim das colunas é descartado.
+#
+# Um único processo gravador por arquivo: as gravações são serializadas só
+# dentro do processo (threads); não há trava entre processos. Leitores em
+# outros processos podem abrir o mesmo diretório.
+
+ARCHIVE_VERSION = 1
+IDENT_FIELDS = ("projeto", "tecnico", "uso", "fabricado_em")
+NUMERIC_FIELDS = ABCP_INPUTS + ABCP_OUTPUTS
+TS_FIELD = "ts"   # segundos desde 1970 (UTC)
+INDEXED = ("projeto", "ts", "ac", "Cc")
+
+_DTYPES = {**{k: np.dtype("<i4") for k in IDENT_FIELDS},
+           TS_FIELD: np.dtype("<i8"),
+           **{k: np.dtype("<f8") for k in NUMERIC_FIELDS}}
+COLUMNS = tuple(_DTYPES)
+
+DateLike = Union[str, int, float, np.datetime64, Any]
+
+
+def archive_dir() -> Path:
+    # Dados do usuário (não é cache: o histórico não deve ser apagado), fora
+    # do repositório e independente do diretório de trabalho
+    if "ABCP_ARCHIVE_DIR" in os.environ:
+        return Path(os.environ["ABCP_ARCHIVE_DIR"])
+    base = os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return Path(base) / "dosagem_abcp" / "arquivo_tracos"
+
+
+def _to_epoch(value: DateLike) -> int:
+    # str ISO / datetime / datetime64 / número (segundos)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    if hasattr(value, "timestamp"):
+        return int(value.timestamp())
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+class TracoArchive:
+    # Um escritor por vez (trava no processo); leitores podem ser muitos.
+
+    def __init__(self, root: Union[str, Path], reindex_fraction: float = 0.1, reindex_min: int = 50_000):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.reindex_fraction = reindex_fraction
+        self.reindex_min = reindex_min
+        self._lock = threading.RLock()
+        self._maps: Dict[str, Tuple[int, np.ndarray]] = {}
+        meta_path = self.root / "meta.json"
+        if meta_path.exists():
+            self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if self.meta.get("version") != ARCHIVE_VERSION:
+                raise ValueError(f"Versão de arquivo não suportada: {self.meta.get('version')}")
+        else:
+            self.meta = {"version": ARCHIVE_VERSION, "n_rows": 0, "columns": list(COLUMNS),
+                         "dicts": {k: [] for k in IDENT_FIELDS}, "indexes": {}, "ts_sorted": True}
+            self._write_meta()
+        self._codes = {k: {s: i for i, s in enumerate(v)} for k, v in self.meta["dicts"].items()}
+
+    # --- gravação ---
+
+    def _write_meta(self):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp, self.root / "meta.json")
+
+    def _write_array(self, filename: str, arr: np.ndarray):
+        # Grava num temporário e troca: memmaps abertos sobre o arquivo antigo
+        # (outros leitores) continuam válidos em vez de verem o arquivo truncado
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                arr.tofile(f)
+            os.replace(tmp, self.root / filename)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _encode(self, field: str, values: Sequence[Any]) -> np.ndarray:
+        # Códigos do dicionário; só os valores distintos passam pelo dict Python
+        vals = np.asarray(values, dtype=object)
+        vals[(vals == None) | (vals != vals)] = ""   # None / NaN
+        uniq, inv = np.unique(vals.astype(str), return_inverse=True)
+        codes = self._codes[field]
+        words = self.meta["dicts"][field]
+        lut = np.empty(len(uniq), dtype=_DTYPES[field])
+        for i, s in enumerate(uniq.tolist()):
+            c = codes.get(s)
+            if c is None:
+                c = codes[s] = len(words)
+                words.append(s)
+            lut[i] = c
+        return lut[inv.ravel()]
+
+    def append(self, rows: Any, ts: Optional[Any] = None) -> int:
+        # `rows`: DataFrame ou dict de colunas (identificação + entradas + saídas)
+        # ou lista de dicts. `ts`: escalar ou coluna; padrão = agora.
+        if isinstance(rows, (list, tuple)):
+            rows = {k: [r.get(k) for r in rows] for k in COLUMNS if any(k in r for r in rows)}
+        n = len(rows[next(iter(rows.keys()))]) if len(rows) else 0
+        if n == 0:
+            return 0
+        missing = [k for k in NUMERIC_FIELDS if k not in rows]
+        if missing:
+            raise KeyError(f"Colunas ausentes: {', '.join(missing)}")
+        if ts is None:
+            ts = rows[TS_FIELD] if TS_FIELD in rows else time.time()
+        if np.ndim(ts) == 0:
+            ts_col = np.full(n, _to_epoch(ts), dtype=_DTYPES[TS_FIELD])
+        else:
+            ts_col = np.fromiter((_to_epoch(t) for t in ts), dtype=_DTYPES[TS_FIELD], count=n)
+
+        with self._lock, instrument.span("archive.append", rows=n):
+            start = self.meta["n_rows"]
+            cols = {TS_FIELD: ts_col}
+            for k in IDENT_FIELDS:
+                vals = rows[k] if k in rows else [""] * n
+                cols[k] = self._encode(k, vals if np.ndim(vals) else [vals] * n)
+            for k in NUMERIC_FIELDS:
+                cols[k] = np.broadcast_to(np.asarray(rows[k], dtype=_DTYPES[k]), (n,))
+            for k, arr in cols.items():
+                with open(self.root / f"{k}.col", "ab+") as f:
+                    # descarta o que sobrou de uma gravação interrompida
+                    f.truncate(start * _DTYPES[k].itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.ascontiguousarray(arr, dtype=_DTYPES[k]).tobytes())
+            if self.meta["ts_sorted"] and n:
+                last = self.column(TS_FIELD)[start - 1] if start else ts_col[0]
+                self.meta["ts_sorted"] = bool(ts_col[0] >= last and np.all(np.diff(ts_col) >= 0))
+                if not self.meta["ts_sorted"]:
+                    # o "índice" de ts era a própria coluna; passa a precisar de um de verdade
+                    self.meta["indexes"].pop(TS_FIELD, None)
+            self.meta["n_rows"] = start + n
+            self._write_meta()
+            instrument.count("archive.rows_appended", n)
+            tail = self.meta["n_rows"] - min(self.meta["indexes"].values(), default=0)
+            if tail >= max(self.reindex_min, self.reindex_fraction * self.meta["n_rows"]):
+                self.build_indexes()
+        return n
+
+    def append_one(self, ident: Dict[str, Any], inputs: Dict[str, Any], outputs: Dict[str, Any], ts: Optional[Any] = None) -> int:
+        row = {**{k: [ident.get(k, "")] for k in IDENT_FIELDS},
+               **{k: [inputs.get(k, 0.0)] for k in ABCP_INPUTS},
+               **{k: [outputs[k]] for k in ABCP_OUTPUTS}}
+        self.append(row, ts=ts)
+        return self.meta["n_rows"] - 1
+
+    # --- leitura ---
+
+    def __len__(self) -> int:
+        return int(self.meta["n_rows"])
+
+    def _map(self, filename: str, dtype: np.dtype, n: int) -> np.ndarray:
+        if n == 0:
+            return np.empty(0, dtype=dtype)
+        cached = self._maps.get(filename)
+        if cached is not None and cached[0] == n:
+            return cached[1]
+        arr = np.memmap(self.root / filename, dtype=dtype, mode="r", shape=(n,))
+        self._maps[filename] = (n, arr)
+        return arr
+
+    def column(self, name: str) -> np.ndarray:
+        # Coluna mapeada em memória (somente leitura); códigos para a identificação
+        if name not in _DTYPES:
+            raise KeyError(f"Coluna desconhecida: {name!r}")
+        return self._map(f"{name}.col", _DTYPES[name], len(self))
+
+    def dictionary(self, field: str) -> List[str]:
+        return list(self.meta["dicts"][field])
+
+    def decode(self, field: str, codes: np.ndarray) -> np.ndarray:
+        words = np.asarray(self.meta["dicts"][field] or [""], dtype=object)
+        return words[np.asarray(codes)]
+
+    # --- índices ---
+
+    def build_indexes(self, fields: Sequence[str] = INDEXED):
+        # Ordenação estável de cada coluna indexada; linhas acrescentadas
+        # depois disso são varridas linearmente até a próxima reconstrução.
+        with self._lock, instrument.span("archive.build_indexes"):
+            n = len(self)
+            for k in fields:
+                if k == TS_FIELD and self.meta["ts_sorted"]:
+                    self.meta["indexes"][k] = n      # a própria coluna já está ordenada
+                    continue
+                col = self.column(k)
+                order = np.argsort(col, kind="stable").astype(np.int64)
+                self._write_array(f"{k}.key", np.asarray(col[order], dtype=_DTYPES[k]))
+                self._write_array(f"{k}.ord", order)
+                self._maps.pop(f"{k}.key", None)
+                self._maps.pop(f"{k}.ord", None)
+                self.meta["indexes"][k] = n
+            self._write_meta()
+
+    def _range_rows(self, field: str, lo: Any, hi: Any) -> np.ndarray:
+        # Linhas com lo <= valor <= hi (None = sem limite), em ordem crescente de linha
+        n = len(self)
+        n_idx = min(int(self.meta["indexes"].get(field, 0)), n)
+        col = self.column(field)
+        parts = []
+        if n_idx:
+            if field == TS_FIELD and self.meta["ts_sorted"]:
+                keys, order = col[:n_idx], None
+            else:
+                keys = self._map(f"{field}.key", _DTYPES[field], n_idx)
+                order = self._map(f"{field}.ord", np.dtype("<i8"), n_idx)
+            i = 0 if lo is None else int(np.searchsorted(keys, lo, side="left"))
+            j = n_idx if hi is None else int(np.searchsorted(keys, hi, side="right"))
+            parts.append(np.arange(i, j, dtype=np.int64) if order is None else np.sort(order[i:j]))
+        if n_idx < n:
+            tail = col[n_idx:]
+            mask = np.ones(len(tail), dtype=bool)
+            if lo is not None:
+                mask &= tail >= lo
+            if hi is not None:
+                mask &= tail <= hi
+            parts.append(np.flatnonzero(mask) + n_idx)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def select(
+        self,
+        projeto: Optional[str] = None,
+        tecnico: Optional[str] = None,
+        uso: Optional[str] = None,
+        fabricado_em: Optional[str] = None,
+        date_from: Optional[DateLike] = None,
+        date_to: Optional[DateLike] = None,
+        ac: Optional[Tuple[Optional[float], Optional[float]]] = None,
+        Cc: Optional[Tuple[Optional[float], Optional[float]]] = None,
+        **ranges: Tuple[Optional[float], Optional[float]],
+    ) -> np.ndarray:
+        # Índices (crescentes) das linhas que atendem a todos os filtros.
+        # Projeto, data, a/c e Cc usam os índices; os demais filtros varrem
+        # só as colunas envolvidas, e só nas linhas já selecionadas.
+        with instrument.span("archive.select"):
+            rows: Optional[np.ndarray] = None
+
+            def narrow(found: np.ndarray):
+                nonlocal rows
+                rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+
+            if projeto is not None:
+                code = self._codes["projeto"].get(str(projeto))
+                if code is None:
+                    return np.empty(0, dtype=np.int64)
+                narrow(self._range_rows("projeto", code, code))
+            if date_from is not None or date_to is not None:
+                narrow(self._range_rows(TS_FIELD,
+                                        None if date_from is None else _to_epoch(date_from),
+                                        None if date_to is None else _to_epoch(date_to)))
+            if ac is not None:
+                narrow(self._range_rows("ac", *ac))
+            if Cc is not None:
+                narrow(self._range_rows("Cc", *Cc))
+            if rows is None:
+                rows = np.arange(len(self), dtype=np.int64)
+
+            for field, value in (("tecnico", tecnico), ("uso", uso), ("fabricado_em", fabricado_em)):
+                if value is not None:
+                    code = self._codes[field].get(str(value), -1)
+                    rows = rows[self.column(field)[rows] == code]
+            for field, (lo, hi) in ranges.items():
+                vals = self.column(field)[rows]
+                mask = np.ones(len(rows), dtype=bool)
+                if lo is not None:
+                    mask &= vals >= lo
+                if hi is not None:
+                    mask &= vals <= hi
+                rows = rows[mask]
+            instrument.count("archive.rows_selected", len(rows))
+            return rows
+
+    def to_frame(self, rows: Optional[np.ndarray] = None, columns: Optional[Sequence[str]] = None):
+        # DataFrame só com as linhas/colunas pedidas (texto decodificado, ts em datetime)
+        import pandas as pd
+        columns = list(columns or COLUMNS)
+        data = {}
+        for k in columns:
+            col = self.column(k)
+            vals = np.asarray(col if rows is None else col[rows])
+            if k in IDENT_FIELDS:
+                data[k] = pd.Categorical.from_codes(vals, categories=pd.Index(self.meta["dicts"][k])) \
+                    if self.meta["dicts"][k] else pd.Categorical([""] * len(vals))
+            elif k == TS_FIELD:
+                data[k] = vals.astype("datetime64[s]")
+            else:
+                data[k] = vals
+        return pd.DataFrame(data, index=None if rows is None else np.asarray(rows))
+
+    def aggregate(
+        self,
+        columns: Sequence[str],
+        by: str = "projeto",
+        rows: Optional[np.ndarray] = None,
+    ):
+        # Contagem, média, mín e máx de `columns` por campo de identificação,
+        # em passadas sobre as colunas mapeadas (np.bincount / ufunc.at)
+        import pandas as pd
+        codes = self.column(by)
+        codes = np.asarray(codes if rows is None else codes[rows])
+        words = self.meta["dicts"][by]
+        m = len(words)
+        count = np.bincount(codes, minlength=m)
+        present = np.flatnonzero(count)
+        out = {"n": count[present]}
+        for k in columns:
+            v = np.asarray(self.column(k) if rows is None else self.column(k)[rows], dtype=float)
+            total = np.bincount(codes, weights=v, minlength=m)
+            lo = np.full(m, np.inf)
+            hi = np.full(m, -np.inf)
+            np.minimum.at(lo, codes, v)
+            np.maximum.at(hi, codes, v)
+            out[f"{k}_mean"] = total[present] / count[present]
+            out[f"{k}_min"] = lo[present]
+            out[f"{k}_max"] = hi[present]
+        return pd.DataFrame(out, index=pd.Index([words[i] for i in present], name=by))
+
+    # --- exportação ---
+
+    def to_arrow(self, rows: Optional[np.ndarray] = None, columns: Optional[Sequence[str]] = None):
+        # Sem `rows`, as colunas numéricas viram buffers Arrow sobre o próprio
+        # memmap (sem cópia); identificação vira DictionaryArray (códigos + dicionário).
+        import pyarrow as pa
+        columns = list(columns or COLUMNS)
+        arrays = []
+        for k in columns:
+            col = self.column(k)
+            vals = col if rows is None else col[rows]
+            if k in IDENT_FIELDS:
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(vals, type=pa.int32()), pa.array(self.meta["dicts"][k], type=pa.string())))
+            elif k == TS_FIELD:
+                arrays.append(pa.array(vals, type=pa.int64()).cast(pa.timestamp("s", tz="UTC")))
+            else:
+                arrays.append(pa.array(vals, type=pa.float64()))
+        return pa.Table.from_arrays(arrays, names=columns)
+
+    def to_parquet(
+        self,
+        path: Union[str, Path],
+        rows: Optional[np.ndarray] = None,
+        columns: Optional[Sequence[str]] = None,
+        row_group_size: int = 1_000_000,
+    ) -> int:
+        import pyarrow.parquet as pq
+        with instrument.span("archive.to_parquet"):
+            table = self.to_arrow(rows, columns)
+            pq.write_table(table, str(path), row_group_size=row_group_size)
+        return table.num_rows
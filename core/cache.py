@@ -0,0 +1,81 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from . import instrument
+
+# Cache LRU limitado e seguro entre threads (sessões do Streamlit rodam em
+# threads do mesmo processo). Chaves típicas: (tipo, hash do conteúdo do Excel).
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = int(maxsize)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.RLock()
+        # uma trava por chave em construção: sessões simultâneas pedindo o
+        # mesmo Excel esperam a primeira leitura em vez de repeti-la
+        self._building: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            instrument.count("cache.hit")
+            return value
+        with self._lock:
+            lock = self._building.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                value = self.get(key, _MISSING)
+                if value is _MISSING:
+                    with self._lock:
+                        self.misses += 1
+                    instrument.count("cache.miss")
+                    value = factory()
+                    self.set(key, value)
+        finally:
+            # também quando factory() falha: a trava não fica para trás
+            with self._lock:
+                self._building.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def source_key(source: Any, cache: Optional[LRUCache] = None) -> Optional[str]:
+    # Hash do conteúdo do Excel (caminho, bytes ou UploadedFile). Para uploads,
+    # o hash fica memorizado pelo file_id para não reler o arquivo a cada rerun.
+    if source is None:
+        return None
+    from .snapshot import content_hash
+    file_id = getattr(source, "file_id", None)
+    if cache is not None and file_id is not None:
+        return cache.get_or_set(("file_id", file_id), lambda: content_hash(source))
+    return content_hash(source)
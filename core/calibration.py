@@ -0,0 +1,266 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from .design import AbramsCurve
+from .snapshot import cache_dir
+from . import instrument
+
+# Calibração da curva de Abrams (fcj = A / B^(a/c)) a partir dos ensaios de
+# compressão do laboratório, por tipo de cimento e idade.
+#
+# Em log, ln fc = ln A - (a/c)·ln B é uma reta: o ajuste por mínimos quadrados
+# de cada grupo sai das somas n, Σx, Σy, Σx², Σxy, Σy² (x = a/c, y = ln fc).
+# Essas somas são aditivas: blocos de registros são somados em paralelo, e
+# registros acrescentados depois só somam o que é novo. O cache guarda as
+# somas + uma impressão digital (hash) dos registros já incorporados.
+
+RECORD_COLUMNS = ("cimento", "idade", "ac", "fc")
+_STATS = ("n", "sx", "sy", "sxx", "sxy", "syy", "ac_min", "ac_max")
+CACHE_VERSION = 1
+# folga de arredondamento nas bordas da faixa ensaiada de a/c
+_AC_TOL = 1e-9
+
+
+def _chunk_stats(df: pd.DataFrame, by: Tuple[str, ...], ac_col: str, fc_col: str) -> pd.DataFrame:
+    # Somas por grupo de um bloco de registros (linhas inválidas descartadas)
+    x = pd.to_numeric(df[ac_col], errors="coerce").to_numpy(dtype=float)
+    fc = pd.to_numeric(df[fc_col], errors="coerce").to_numpy(dtype=float)
+    ok = np.isfinite(x) & np.isfinite(fc) & (fc > 0) & (x > 0)
+    keys = df.loc[ok, list(by)]
+    x, y = x[ok], np.log(fc[ok])
+    codes, uniq = pd.MultiIndex.from_frame(keys).factorize()
+    m = len(uniq)
+    stats = {
+        "n": np.bincount(codes, minlength=m).astype(float),
+        "sx": np.bincount(codes, x, m), "sy": np.bincount(codes, y, m),
+        "sxx": np.bincount(codes, x * x, m), "sxy": np.bincount(codes, x * y, m),
+        "syy": np.bincount(codes, y * y, m),
+    }
+    lo = np.full(m, np.inf)
+    hi = np.full(m, -np.inf)
+    np.minimum.at(lo, codes, x)
+    np.maximum.at(hi, codes, x)
+    stats["ac_min"], stats["ac_max"] = lo, hi
+    return pd.DataFrame(stats, index=pd.MultiIndex.from_tuples(list(uniq), names=list(by)))
+
+
+def _merge(a: Optional[pd.DataFrame], b: pd.DataFrame) -> pd.DataFrame:
+    if a is None or a.empty:
+        return b
+    if b.empty:
+        return a
+    both = pd.concat([a, b])
+    g = both.groupby(level=list(range(both.index.nlevels)), sort=False)
+    out = g[list(_STATS[:6])].sum()
+    out["ac_min"] = g["ac_min"].min()
+    out["ac_max"] = g["ac_max"].max()
+    return out
+
+
+def _solve(stats: pd.DataFrame, min_records: int = 3) -> pd.DataFrame:
+    # Mínimos quadrados de todos os grupos de uma vez (fechado, vetorizado)
+    n, sx, sy = stats["n"].to_numpy(), stats["sx"].to_numpy(), stats["sy"].to_numpy()
+    sxx, sxy, syy = stats["sxx"].to_numpy(), stats["sxy"].to_numpy(), stats["syy"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vxx = sxx - sx * sx / n
+        vxy = sxy - sx * sy / n
+        vyy = syy - sy * sy / n
+        slope = vxy / vxx
+        icpt = (sy - slope * sx) / n
+        sse = np.maximum(vyy - slope * vxy, 0.0)
+        r2 = np.where(vyy > 0, 1.0 - sse / vyy, np.nan)
+        s_log = np.sqrt(sse / (n - 2))
+    ok = (n >= max(min_records, 2)) & (vxx > 0) & (slope < 0)
+    out = stats.index.to_frame(index=False)
+    out["n"] = n.astype(np.int64)
+    out["A"] = np.where(ok, np.exp(icpt), np.nan)
+    out["B"] = np.where(ok, np.exp(-slope), np.nan)
+    out["r2"] = np.where(ok, r2, np.nan)
+    out["s_log"] = np.where(ok & (n > 2), s_log, np.nan)   # desvio dos resíduos em ln(fc)
+    out["ac_min"] = stats["ac_min"].to_numpy()
+    out["ac_max"] = stats["ac_max"].to_numpy()
+    out["ok"] = ok
+    return out
+
+
+def row_hashes(records: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    return pd.util.hash_pandas_object(records[list(columns)], index=False).to_numpy()
+
+
+def fingerprint(hashes: np.ndarray) -> str:
+    # Impressão digital de um prefixo de registros (hash das linhas, em ordem)
+    h = hashlib.sha256()
+    h.update(str(len(hashes)).encode())
+    h.update(np.ascontiguousarray(hashes).tobytes())
+    return h.hexdigest()
+
+
+def accumulate(records: pd.DataFrame, by: Sequence[str] = ("cimento", "idade"), ac_col: str = "ac",
+               fc_col: str = "fc", workers: Optional[int] = None, chunk_size: int = 250_000) -> pd.DataFrame:
+    # Somas por grupo; `workers` > 1 soma blocos de `chunk_size` em processos
+    by = tuple(by)
+    if len(records) == 0:
+        return pd.DataFrame(columns=list(_STATS), dtype=float,
+                            index=pd.MultiIndex.from_tuples([], names=list(by)))
+    chunks = [records.iloc[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+    total: Optional[pd.DataFrame] = None
+    with instrument.span("abrams.accumulate", rows=len(records)):
+        if workers and workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                for st in ex.map(_chunk_stats, chunks, [by] * len(chunks),
+                                 [ac_col] * len(chunks), [fc_col] * len(chunks)):
+                    total = _merge(total, st)
+        else:
+            for c in chunks:
+                total = _merge(total, _chunk_stats(c, by, ac_col, fc_col))
+    return total
+
+
+def fit_abrams(records: pd.DataFrame, by: Sequence[str] = ("cimento", "idade"), ac_col: str = "ac",
+               fc_col: str = "fc", min_records: int = 3, workers: Optional[int] = None,
+               chunk_size: int = 250_000) -> pd.DataFrame:
+    # Uma linha por grupo: chaves, n, A, B, r2, s_log, faixa de a/c ensaiada, ok
+    return _solve(accumulate(records, by, ac_col, fc_col, workers, chunk_size), min_records)
+
+
+class AbramsCalibration:
+    # Curvas por (cimento, idade) com refit incremental. Ex.:
+    #   cal = AbramsCalibration("lab")           # cache em ~/.cache/dosagem_abcp
+    #   cal.fit(ensaios)                         # ensaios: DataFrame com cimento, idade, ac, fc
+    #   cal.ac_for([38.2, 41.0], "CP II-E-32", 28)
+
+    def __init__(self, name: Optional[str] = None, by: Sequence[str] = ("cimento", "idade"),
+                 ac_col: str = "ac", fc_col: str = "fc", min_records: int = 3,
+                 cache_path: Optional[Union[str, Path]] = None):
+        self.by = tuple(by)
+        self.ac_col, self.fc_col = ac_col, fc_col
+        self.min_records = min_records
+        self.cache_path = Path(cache_path) if cache_path else (
+            cache_dir() / f"abrams-{name}-v{CACHE_VERSION}.npz" if name else None)
+        self.stats: Optional[pd.DataFrame] = None
+        self.n_records = 0
+        self.digest = ""
+        self.table = _solve(accumulate(pd.DataFrame(columns=self._columns), self.by))
+        self.last_update = {"mode": "none", "rows": 0}
+        if self.cache_path is not None:
+            self._load()
+
+    @property
+    def _columns(self):
+        return list(self.by) + [self.ac_col, self.fc_col]
+
+    # --- ajuste ---
+
+    def fit(self, records: pd.DataFrame, workers: Optional[int] = None, chunk_size: int = 250_000):
+        # Se os registros já incorporados continuam iguais no início de
+        # `records`, soma só as linhas novas; senão refaz tudo.
+        n_old = self.n_records
+        hashes = row_hashes(records, self._columns)
+        incremental = (self.stats is not None and 0 < n_old <= len(records)
+                       and fingerprint(hashes[:n_old]) == self.digest)
+        new = records.iloc[n_old:] if incremental else records
+        st = accumulate(new, self.by, self.ac_col, self.fc_col, workers, chunk_size)
+        self.stats = _merge(self.stats, st) if incremental else st
+        self.n_records = len(records)
+        self.digest = fingerprint(hashes)
+        self.last_update = {"mode": "incremental" if incremental else "full", "rows": len(new)}
+        instrument.count(f"abrams.fit.{self.last_update['mode']}")
+        self._refresh()
+        return self
+
+    def _refresh(self, save: bool = True):
+        self.table = _solve(self.stats, self.min_records)
+        self._index = pd.MultiIndex.from_frame(self.table[list(self.by)])
+        self._A = self.table["A"].to_numpy()
+        self._lnB = np.log(self.table["B"].to_numpy())
+        self._ac_range = (self.table["ac_min"].to_numpy(), self.table["ac_max"].to_numpy())
+        if save and self.cache_path is not None:
+            self._save()
+
+    # --- cache ---
+
+    def _save(self):
+        meta = {"version": CACHE_VERSION, "by": list(self.by), "n_records": self.n_records,
+                "digest": self.digest, "columns": self._columns,
+                "keys": [list(map(_json_key, k)) for k in self.stats.index.tolist()]}
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_path.parent, suffix=".npz")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, meta=np.array(json.dumps(meta)),
+                         stats=self.stats[list(_STATS)].to_numpy(dtype=float))
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def _load(self):
+        if not self.cache_path.exists():
+            return
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as z:
+                meta = json.loads(str(z["meta"]))
+                if (meta.get("version") != CACHE_VERSION or meta.get("by") != list(self.by)
+                        or meta.get("columns") != self._columns):
+                    return
+                idx = pd.MultiIndex.from_tuples([tuple(k) for k in meta["keys"]], names=list(self.by))
+                self.stats = pd.DataFrame(z["stats"], columns=list(_STATS), index=idx)
+        except Exception:
+            return
+        self.n_records, self.digest = meta["n_records"], meta["digest"]
+        self._refresh(save=False)
+
+    # --- avaliação ---
+
+    def _coef(self, *keys) -> Tuple[np.ndarray, ...]:
+        # A, ln B, a/c mínimo e máximo ensaiados por elemento (chaves escalares
+        # ou arrays, com broadcast); grupo sem curva -> NaN
+        arrays = np.broadcast_arrays(*[np.asarray(k, dtype=object) for k in keys])
+        shape = arrays[0].shape
+        if not len(self.table):
+            return tuple(np.full(shape, np.nan) for _ in range(4))
+        pos = self._index.get_indexer(pd.MultiIndex.from_arrays([a.ravel() for a in arrays])).reshape(shape)
+        hit = pos >= 0
+        p = np.maximum(pos, 0)
+        return tuple(np.where(hit, v[p], np.nan) for v in (self._A, self._lnB, *self._ac_range))
+
+    def _args(self, x, key):
+        # valor e chaves com broadcast entre si: alvo escalar com chaves por
+        # linha, alvos por linha com chaves escalares, ou tudo por linha
+        x, *keys = np.broadcast_arrays(np.asarray(x, dtype=float), *[np.asarray(k, dtype=object) for k in key])
+        return x, self._coef(*keys)
+
+    def curve(self, *key) -> AbramsCurve:
+        A, lnB, _, _ = self._coef(*key)
+        if not np.isfinite(A):
+            raise KeyError(f"Sem curva ajustada para {key!r}")
+        return AbramsCurve(float(A), float(np.exp(lnB)))
+
+    def fc_for(self, ac, *key, extrapolate: bool = False) -> np.ndarray:
+        # fcj previsto; a/c fora da faixa ensaiada do grupo -> NaN
+        # (extrapolate=True devolve o valor da curva mesmo assim)
+        ac, (A, lnB, lo, hi) = self._args(ac, key)
+        fc = A * np.exp(-ac * lnB)
+        return fc if extrapolate else np.where((ac >= lo - _AC_TOL) & (ac <= hi + _AC_TOL), fc, np.nan)
+
+    def ac_for(self, fcj, *key, extrapolate: bool = False) -> np.ndarray:
+        # a/c para o fcj alvo, em lote: chaves (cimento, idade) escalares ou
+        # uma por linha. Grupo sem curva ou a/c fora da faixa ensaiada -> NaN
+        # (a curva não foi verificada ali; extrapolate=True aceita mesmo assim).
+        fcj, (A, lnB, lo, hi) = self._args(fcj, key)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ac = np.log(A / fcj) / lnB
+        return ac if extrapolate else np.where((ac >= lo - _AC_TOL) & (ac <= hi + _AC_TOL), ac, np.nan)
+
+
+def _json_key(v: Any) -> Any:
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
@@ -0,0 +1,191 @@
+from __future__ import annotations
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pandas as pd
+
+from .abcp import compute_abcp_batch, load_ca_lookup, ABCP_OUTPUTS
+
+# Uso:
+#   python -m core.cli entradas.csv saida.parquet --chunk-size 200000 --workers 4
+#   python -m core.cli entradas.parquet saida.csv --excel data/04_Dosagem_Concreto_ABCP_sem-leg.xlsx
+
+
+def _fmt(path: Path, forced: Optional[str]) -> str:
+    fmt = forced or path.suffix.lower().lstrip(".")
+    if fmt in ("parquet", "pq"):
+        return "parquet"
+    if fmt in ("csv", "txt"):
+        return "csv"
+    raise SystemExit(f"Formato não suportado: {path} (use .csv ou .parquet)")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise SystemExit("Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+
+
+def read_chunks(path: Path, fmt: str, chunk_size: int, sep: str = ",") -> Iterator[pd.DataFrame]:
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, sep=sep)
+    else:
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+class ChunkWriter:
+    def __init__(self, path: Path, fmt: str, sep: str = ","):
+        self.path, self.fmt, self.sep = path, fmt, sep
+        self._pq = None
+        self._first = True
+
+    def write(self, df):
+        if self.fmt == "csv":
+            # df pode vir já formatado como texto pelo worker: (colunas, corpo)
+            cols, body = df if isinstance(df, tuple) else (list(df.columns), encode_csv(df, self.sep))
+            with open(self.path, "w" if self._first else "a", encoding="utf-8", newline="") as f:
+                if self._first:
+                    f.write(self.sep.join(map(str, cols)) + "\n")
+                f.write(body)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq is None:
+                self._pq = pq.ParquetWriter(self.path, table.schema)
+            self._pq.write_table(table.cast(self._pq.schema))
+        self._first = False
+
+    def close(self):
+        if self._pq is not None:
+            self._pq.close()
+        elif self._first and self.fmt == "csv":
+            pd.DataFrame(columns=list(ABCP_OUTPUTS)).to_csv(self.path, index=False, sep=self.sep)
+
+
+def process_chunk(df: pd.DataFrame, ca_grid=None, dmax_col: str = "dmax", slump_col: str = "slump",
+                  ca_mode: str = "exact", keep_inputs: bool = True) -> pd.DataFrame:
+    # Ca_L informado tem prioridade; onde faltar, vem da Tabela 2 (Dmáx x Slump)
+    if ca_grid is not None and (dmax_col in df.columns and slump_col in df.columns):
+        looked = ca_grid.lookup(df[dmax_col].to_numpy(), df[slump_col].to_numpy(), mode=ca_mode)
+        if "Ca_L" in df.columns:
+            df = df.assign(Ca_L=df["Ca_L"].fillna(pd.Series(looked, index=df.index)))
+        else:
+            df = df.assign(Ca_L=looked)
+    out = compute_abcp_batch(df)
+    if not keep_inputs:
+        return out.reset_index(drop=True)
+    return pd.concat([df.reset_index(drop=True), out.reset_index(drop=True)], axis=1)
+
+
+def encode_csv(df: pd.DataFrame, sep: str = ",") -> str:
+    return df.to_csv(index=False, header=False, sep=sep, lineterminator="\n")
+
+
+def _process_encoded(df: pd.DataFrame, sep: str, **opts):
+    # Nos workers, a formatação do CSV (a parte mais cara) também fica paralela
+    res = process_chunk(df, **opts)
+    return len(res), (list(res.columns), encode_csv(res, sep))
+
+
+def _report(rows: int, chunks: int, t0: float, final: bool = False):
+    dt = max(time.perf_counter() - t0, 1e-9)
+    end = "\n" if final else "\r"
+    sys.stderr.write(f"{chunks} blocos | {rows:,} linhas | {dt:.1f} s | {rows / dt:,.0f} linhas/s{end}")
+    sys.stderr.flush()
+
+
+def _drain(fut, writer: ChunkWriter, rows: int, chunks: int, t0: float, quiet: bool):
+    res = fut.result()
+    n, payload = res if isinstance(res, tuple) else (len(res), res)
+    writer.write(payload)
+    rows += n; chunks += 1
+    if not quiet:
+        _report(rows, chunks, t0)
+    return rows, chunks
+
+
+def run(args) -> int:
+    src, dst = Path(args.input), Path(args.output)
+    in_fmt, out_fmt = _fmt(src, args.input_format), _fmt(dst, args.output_format)
+    if "parquet" in (in_fmt, out_fmt):
+        _require_pyarrow()
+
+    grid = None
+    if args.excel:
+        from .lookup import ca_grid
+        lookup = load_ca_lookup(args.excel)
+        if lookup is None:
+            raise SystemExit(f"Não foi possível ler a Tabela 2 (Ca) de {args.excel}")
+        grid = ca_grid(lookup)
+    opts = dict(ca_grid=grid, dmax_col=args.dmax_col, slump_col=args.slump_col,
+                ca_mode=args.ca_mode, keep_inputs=not args.only_outputs)
+
+    writer = ChunkWriter(dst, out_fmt, args.sep)
+    rows = chunks = 0
+    t0 = time.perf_counter()
+    chunks_in = read_chunks(src, in_fmt, args.chunk_size, args.sep)
+    try:
+        if args.workers and args.workers > 1:
+            # Janela limitada de blocos em voo: memória ~ 2 x workers blocos
+            with ProcessPoolExecutor(max_workers=args.workers) as ex:
+                pending = deque()
+                for df in chunks_in:
+                    if out_fmt == "csv":
+                        pending.append(ex.submit(_process_encoded, df, args.sep, **opts))
+                    else:
+                        pending.append(ex.submit(process_chunk, df, **opts))
+                    while len(pending) >= 2 * args.workers or (pending and pending[0].done()):
+                        rows, chunks = _drain(pending.popleft(), writer, rows, chunks, t0, args.quiet)
+                while pending:
+                    rows, chunks = _drain(pending.popleft(), writer, rows, chunks, t0, args.quiet)
+        else:
+            for df in chunks_in:
+                res = process_chunk(df, **opts)
+                writer.write(res); rows += len(res); chunks += 1
+                if not args.quiet: _report(rows, chunks, t0)
+    except KeyError as e:
+        raise SystemExit(f"{e.args[0]} (informe Ca_L no arquivo ou use --excel com Dmáx/Slump)")
+    finally:
+        writer.close()
+    if not args.quiet:
+        _report(rows, chunks, t0, final=True)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="python -m core.cli",
+        description="Calcula traços ABCP em lote (CSV/Parquet), em blocos de tamanho limitado.")
+    p.add_argument("input", help="arquivo de entradas (.csv ou .parquet) com as colunas de compute_abcp")
+    p.add_argument("output", help="arquivo de saída (.csv ou .parquet)")
+    p.add_argument("--input-format", choices=["csv", "parquet"])
+    p.add_argument("--output-format", choices=["csv", "parquet"])
+    p.add_argument("--sep", default=",", help="separador do CSV (padrão: ,)")
+    p.add_argument("--chunk-size", type=int, default=100_000, help="linhas por bloco (padrão: 100000)")
+    p.add_argument("--workers", type=int, default=0, help="processos para os blocos (0/1 = sem paralelismo)")
+    p.add_argument("--excel", help="Excel com a Tabela 2 para obter Ca_L por Dmáx x Slump")
+    p.add_argument("--dmax-col", default="dmax")
+    p.add_argument("--slump-col", default="slump")
+    p.add_argument("--ca-mode", choices=["exact", "nearest", "bilinear"], default="exact")
+    p.add_argument("--only-outputs", action="store_true", help="grava só as saídas (sem repetir as entradas)")
+    p.add_argument("-q", "--quiet", action="store_true", help="sem relatório de progresso")
+    return p
+
+
+def main(argv=None) -> int:
+    return run(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, Any
+from . import instrument
+
+if TYPE_CHECKING:  # só para anotações; NumPy é importado sob demanda
+    import numpy as np
+
+# Núcleo de cálculo do método ABCP. Só biblioteca padrão no import:
+# compute_abcp é aritmética pura; NumPy/pandas entram apenas no modo em lote.
+
+# Ordem das entradas/saídas de compute_abcp (usada pelo modo em lote)
+ABCP_INPUTS = (
+    "ac", "Ca_L", "rho_w", "Cc_min", "rho_c", "rho_s_grain",
+    "rho_b_menor", "rho_b_maior", "Cb_total", "perc_b_menor",
+    "U_areia", "I_inch", "rho_s_bulk", "a_areia", "a_brita", "U_brita",
+)
+ABCP_DEFAULTS = {"a_areia": 0.0, "a_brita": 0.0, "U_brita": 0.0}
+ABCP_OUTPUTS = (
+    "P33", "Cc", "Cb_menor", "Cb_maior",
+    "V_c", "V_w", "V_g_total", "Vm",
+    "Cm_seca", "Cm_umida",
+    "agua_areia_total", "agua_brita_total", "agua_absorcao",
+    "agua_moist_total", "agua_adicionar_kg",
+    "V_areia_med_m3", "V_areia_med_L",
+)
+
+@instrument.traced("compute_abcp")
+def compute_abcp(
+    ac: float,
+    Ca_L: float,
+    rho_w: float,
+    Cc_min: float,
+    rho_c: float,
+    rho_s_grain: float,
+    rho_b_menor: float,
+    rho_b_maior: float,
+    Cb_total: float,
+    perc_b_menor: int,
+    U_areia: float,
+    I_inch: float,
+    rho_s_bulk: float,
+    a_areia: float = 0.0,
+    a_brita: float = 0.0,
+    U_brita: float = 0.0,
+) -> Dict[str, Any]:
+    # Água de dosagem (massa) a partir de Ca em L/m³ e rho_w
+    P33 = Ca_L * (rho_w / 1000.0)
+
+    # Consumo de cimento
+    Cc_calc = P33 / max(ac, 1e-9)
+    Cc = max(Cc_calc, Cc_min)
+
+    # Distribuição de brita
+    frac_menor = min(max(perc_b_menor/100.0, 0), 1)
+    Cb_menor = Cb_total * frac_menor
+    Cb_maior = Cb_total * (1.0 - frac_menor)
+
+    # Volumes absolutos
+    V_c = Cc / rho_c
+    V_w = P33 / rho_w
+    V_g_menor = Cb_menor / rho_b_menor
+    V_g_maior = Cb_maior / rho_b_maior
+    V_g_total = V_g_menor + V_g_maior
+
+    Vm = 1.0 - (V_c + V_w + V_g_total)
+    Vm = max(Vm, 0.0)
+
+    # Areia (massa seca e úmida)
+    Cm_seca = Vm * rho_s_grain
+    U = U_areia / 100.0
+    Cm_umida = Cm_seca * (1.0 + U)
+    agua_areia_total = Cm_umida - Cm_seca
+
+    # Brita
+    Ub = U_brita / 100.0
+    Cb_seco_total = Cb_total
+    agua_brita_total = Cb_seco_total * Ub
+
+    # Absorções
+    a_s = a_areia / 100.0
+    a_b = a_brita / 100.0
+    agua_absorcao = (a_s * Cm_seca) + (a_b * Cb_seco_total)
+
+    # Água de umidade
+    agua_moist_total = agua_areia_total + agua_brita_total
+
+    # Água efetiva a adicionar
+    agua_adicionar_kg = P33 + agua_absorcao - agua_moist_total
+
+    # Volumetria para obra (areia aparente + inchamento)
+    V_areia_seca_aparente = Cm_seca / rho_s_bulk
+    I = I_inch / 100.0
+    V_areia_med_m3 = V_areia_seca_aparente * (1.0 + I)
+    V_areia_med_L = V_areia_med_m3 * 1000.0
+
+    return dict(
+        P33=P33, Cc=Cc,
+        Cb_menor=Cb_menor, Cb_maior=Cb_maior,
+        V_c=V_c, V_w=V_w, V_g_total=V_g_total, Vm=Vm,
+        Cm_seca=Cm_seca, Cm_umida=Cm_umida,
+        agua_areia_total=agua_areia_total,
+        agua_brita_total=agua_brita_total,
+        agua_absorcao=agua_absorcao,
+        agua_moist_total=agua_moist_total,
+        agua_adicionar_kg=agua_adicionar_kg,
+        V_areia_med_m3=V_areia_med_m3, V_areia_med_L=V_areia_med_L
+    )
+
+def _is_frame(data) -> bool:
+    # DataFrame sem importar pandas (quem passou um DataFrame já o importou)
+    return hasattr(data, "columns") and hasattr(data, "index") and hasattr(data, "to_numpy")
+
+def _batch_columns(data, kwargs) -> Dict[str, np.ndarray]:
+    import numpy as np
+    # Junta DataFrame/mapping + kwargs e faz broadcast de escalares
+    cols: Dict[str, Any] = dict(ABCP_DEFAULTS)
+    if data is not None:
+        if _is_frame(data):
+            cols.update({k: data[k].to_numpy() for k in ABCP_INPUTS if k in data.columns})
+        else:
+            cols.update({k: data[k] for k in ABCP_INPUTS if k in data})
+    cols.update(kwargs)
+    missing = [k for k in ABCP_INPUTS if k not in cols]
+    if missing:
+        raise KeyError(f"Entradas ausentes: {', '.join(missing)}")
+    arrays = np.broadcast_arrays(*[np.asarray(cols[k], dtype=float) for k in ABCP_INPUTS])
+    return {k: np.atleast_1d(a) for k, a in zip(ABCP_INPUTS, arrays)}
+
+@instrument.traced("compute_abcp_batch")
+def compute_abcp_batch(data=None, as_frame: bool = True, **kwargs):
+    # Versão vetorizada de compute_abcp: mesmas fórmulas e mesmos limites
+    # (max(Cc_calc, Cc_min), clip de perc_b_menor, max(Vm, 0)), uma linha por traço.
+    # NumPy só é importado aqui; pandas só para entrada/saída em DataFrame.
+    import numpy as np
+    x = _batch_columns(data, kwargs)
+    out: Dict[str, np.ndarray] = {}
+
+    P33 = x["Ca_L"] * (x["rho_w"] / 1000.0)
+    Cc = np.maximum(P33 / np.maximum(x["ac"], 1e-9), x["Cc_min"])
+
+    frac_menor = np.clip(x["perc_b_menor"] / 100.0, 0, 1)
+    Cb_total = x["Cb_total"]
+    Cb_menor = Cb_total * frac_menor
+    Cb_maior = Cb_total * (1.0 - frac_menor)
+
+    V_c = Cc / x["rho_c"]
+    V_w = P33 / x["rho_w"]
+    V_g_total = Cb_menor / x["rho_b_menor"] + Cb_maior / x["rho_b_maior"]
+    Vm = np.maximum(1.0 - (V_c + V_w + V_g_total), 0.0)
+
+    Cm_seca = Vm * x["rho_s_grain"]
+    Cm_umida = Cm_seca * (1.0 + x["U_areia"] / 100.0)
+    agua_areia_total = Cm_umida - Cm_seca
+    agua_brita_total = Cb_total * (x["U_brita"] / 100.0)
+    agua_absorcao = (x["a_areia"] / 100.0) * Cm_seca + (x["a_brita"] / 100.0) * Cb_total
+    agua_moist_total = agua_areia_total + agua_brita_total
+    agua_adicionar_kg = P33 + agua_absorcao - agua_moist_total
+
+    V_areia_med_m3 = (Cm_seca / x["rho_s_bulk"]) * (1.0 + x["I_inch"] / 100.0)
+    V_areia_med_L = V_areia_med_m3 * 1000.0
+
+    out.update(
+        P33=P33, Cc=Cc,
+        Cb_menor=Cb_menor, Cb_maior=Cb_maior,
+        V_c=V_c, V_w=V_w, V_g_total=V_g_total, Vm=Vm,
+        Cm_seca=Cm_seca, Cm_umida=Cm_umida,
+        agua_areia_total=agua_areia_total,
+        agua_brita_total=agua_brita_total,
+        agua_absorcao=agua_absorcao,
+        agua_moist_total=agua_moist_total,
+        agua_adicionar_kg=agua_adicionar_kg,
+        V_areia_med_m3=V_areia_med_m3, V_areia_med_L=V_areia_med_L,
+    )
+    if as_frame:
+        import pandas as pd
+        index = data.index if _is_frame(data) and len(data.index) == len(P33) else None
+        return pd.DataFrame(out, columns=list(ABCP_OUTPUTS), index=index)
+    rec = np.empty(len(P33), dtype=[(k, "f8") for k in ABCP_OUTPUTS])
+    for k in ABCP_OUTPUTS:
+        rec[k] = out[k]
+    return rec
@@ -0,0 +1,110 @@
+from __future__ import annotations
+from typing import Dict, Any
+import numpy as np
+import pandas as pd
+
+from .compute import compute_abcp_batch, ABCP_OUTPUTS
+from .lookup import ca_grid, vb_grid
+
+# Colunas da especificação (uma linha por traço)
+SPEC_REQUIRED = (
+    "fck", "cond", "classe", "tipo", "dmax", "slump", "mf",
+    "rho_c", "rho_s_grain", "rho_b_menor", "rho_b_maior", "muc_brita",
+    "perc_b_menor", "U_areia", "I_inch", "rho_s_bulk",
+)
+SPEC_DEFAULTS = {"rho_w": 1000.0, "a_areia": 0.0, "a_brita": 0.0, "U_brita": 0.0}
+
+# fcj = fck + 1,65·Sd (NBR 12655)
+K_STUDENT = 1.65
+
+
+class AbramsCurve:
+    # Lei de Abrams: fcj = A / B^(a/c). Os coeficientes padrão são de uma curva
+    # típica de CP-32 aos 28 dias; use os do seu laboratório sempre que houver.
+
+    def __init__(self, A: float = 96.0, B: float = 9.2):
+        self.A = float(A)
+        self.B = float(B)
+
+    def fc_for(self, ac):
+        return self.A / np.power(self.B, ac)
+
+    def ac_for(self, fcj):
+        return np.log(self.A / np.asarray(fcj, dtype=float)) / np.log(self.B)
+
+    def __repr__(self):
+        return f"AbramsCurve(A={self.A}, B={self.B})"
+
+
+def _spec_frame(specs) -> pd.DataFrame:
+    df = specs.copy() if isinstance(specs, pd.DataFrame) else pd.DataFrame(specs)
+    for k, v in SPEC_DEFAULTS.items():
+        if k not in df.columns:
+            df[k] = v
+    missing = [k for k in SPEC_REQUIRED if k not in df.columns]
+    if missing:
+        raise KeyError(f"Especificação sem as colunas: {', '.join(missing)}")
+    return df
+
+
+def design_abcp(specs, tables: Dict[str, Any], abrams=None,
+                ca_mode: str = "exact", vb_mode: str = "bilinear") -> pd.DataFrame:
+    # Resolve fcj, a/c, Ca, Vb e Cb para cada especificação e devolve as
+    # saídas de compute_abcp_batch junto das grandezas de dosagem.
+    # `tables` é o dicionário de load_abcp_tables; `abrams` é uma AbramsCurve
+    # (padrão) ou uma core.calibration.AbramsCalibration.
+    df = _spec_frame(specs)
+    abrams = abrams or AbramsCurve()
+    t1 = tables["tabela1"]
+
+    # Tabela 4: desvio-padrão por condição de preparo
+    sd = df["cond"].astype(str).str.strip().str.upper().map(tables["tabela4"]["sd"]).to_numpy(dtype=float)
+    fck = df["fck"].to_numpy(dtype=float)
+    fcj = fck + K_STUDENT * sd
+
+    # Tabela 1: limites por classe de agressividade e tipo (CA/CP)
+    j = pd.Index([str(c) for c in t1["classes"]]).get_indexer(df["classe"].astype(str).str.strip())
+    tipo = df["tipo"].astype(str).str.strip().str.upper().to_numpy()
+    ok = j >= 0
+    jj = np.where(ok, j, 0)
+
+    def _by_tipo(table):
+        ca = np.asarray(table["CA"], dtype=float)[jj]
+        cp = np.asarray(table["CP"], dtype=float)[jj]
+        vals = np.where(tipo == "CA", ca, np.where(tipo == "CP", cp, np.nan))
+        return np.where(ok, vals, np.nan)
+
+    ac_max = _by_tipo(t1["ac_max"])
+    fck_min = _by_tipo(t1["fck_min"])
+    cc_min = np.where(ok, np.asarray(t1["cc_min"], dtype=float)[jj], np.nan)
+    if "Cc_min" in df.columns:
+        cc_min = np.maximum(cc_min, df["Cc_min"].to_numpy(dtype=float))
+
+    # a/c pela curva de Abrams, limitado pelo a/c máximo da Tabela 1.
+    # Com uma AbramsCalibration, a curva é a do cimento/idade de cada linha.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if isinstance(abrams, AbramsCurve):
+            ac_abrams = abrams.ac_for(fcj)
+        else:
+            keys = [(df[k] if k in df.columns else pd.Series(None, index=df.index, dtype=object))
+                    .fillna(28 if k == "idade" else "").to_numpy() for k in abrams.by]
+            ac_abrams = abrams.ac_for(fcj, *keys)
+    ac = np.minimum(ac_abrams, ac_max)
+
+    # Tabelas 2 e 3
+    Ca_L = ca_grid(tables).lookup(df["dmax"].to_numpy(), df["slump"].to_numpy(), mode=ca_mode)
+    Vb = vb_grid(tables).lookup(df["mf"].to_numpy(dtype=float), df["dmax"].to_numpy(), mode=vb_mode)
+    Vb = np.where(Vb > 1.0, Vb / 100.0, Vb)  # tabela em % -> m³/m³
+    Cb_total = Vb * df["muc_brita"].to_numpy(dtype=float)
+
+    out = compute_abcp_batch(
+        df, ac=ac, Ca_L=Ca_L, Cc_min=cc_min, Cb_total=Cb_total,
+    )
+    design = pd.DataFrame({
+        "fcj": fcj, "sd": sd,
+        "ac_abrams": ac_abrams, "ac_max": ac_max, "ac": ac,
+        "fck_min": fck_min, "fck_ok": fck >= fck_min,
+        "Ca_L": Ca_L, "Vb": Vb, "Cb_total": Cb_total, "Cc_min": cc_min,
+    }, index=out.index)
+    design["valid"] = ~design[["ac", "Ca_L", "Vb", "Cc_min"]].isna().any(axis=1).to_numpy()
+    return pd.concat([design, out[list(ABCP_OUTPUTS)]], axis=1)
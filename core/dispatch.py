@@ -0,0 +1,233 @@
+from __future__ import annotations
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+import numpy as np
+import pandas as pd
+
+from .compute import compute_abcp_batch, ABCP_INPUTS, ABCP_DEFAULTS
+from . import instrument
+
+# Planejamento de expedição: pedidos do dia -> caminhões -> betonadas.
+# Cada pedido (traço, volume, capacidade do caminhão e do misturador) vira
+# caminhões cheios + um parcial, e cada carga vira betonadas iguais que cabem
+# no misturador. As quantidades por betonada saem do traço por m³ (calculado
+# uma vez por traço distinto) e são arredondadas à resolução da balança
+# levando o resíduo para a betonada seguinte do mesmo pedido: a soma das
+# betonadas bate com o total do pedido arredondado.
+
+# coluna do ticket -> saída de compute_abcp (por m³)
+TICKET_QUANTITIES = (
+    ("cimento_kg", "Cc"),
+    ("brita_menor_kg", "Cb_menor"),
+    ("brita_maior_kg", "Cb_maior"),
+    ("areia_umida_kg", "Cm_umida"),
+    ("areia_L", "V_areia_med_L"),
+    ("agua_kg", "agua_adicionar_kg"),
+)
+
+# resolução da balança / medidor por quantidade
+RESOLUTION = {
+    "cimento_kg": 1.0, "brita_menor_kg": 5.0, "brita_maior_kg": 5.0,
+    "areia_umida_kg": 5.0, "areia_L": 1.0, "agua_kg": 1.0,
+}
+
+ORDER_COLUMNS = ("pedido", "volume_m3", "cap_caminhao", "cap_misturador")
+
+# folga para volumes exatamente múltiplos da capacidade (ex.: 16 / 8)
+_EPS = 1e-9
+
+
+def _order_inputs(orders: pd.DataFrame, mixes: Optional[pd.DataFrame], mix_col: str) -> pd.DataFrame:
+    # Entradas de compute_abcp por pedido: colunas do próprio pedido ou
+    # da tabela de traços (`mixes`, indexada pelo código em `mix_col`).
+    # Entradas com padrão (ABCP_DEFAULTS) podem faltar ou vir vazias.
+    src = orders if mixes is None else mixes
+    missing = [k for k in ABCP_INPUTS if k not in src.columns and k not in ABCP_DEFAULTS]
+    if missing:
+        if mixes is None:
+            raise KeyError(f"Pedidos sem as colunas: {', '.join(missing)} (ou informe a tabela de traços)")
+        raise KeyError(f"Tabela de traços sem as colunas: {', '.join(missing)}")
+    if mixes is None:
+        inputs = orders.reindex(columns=list(ABCP_INPUTS))
+    else:
+        if mix_col not in orders.columns:
+            raise KeyError(f"Pedidos sem a coluna do traço: {mix_col}")
+        if mixes.index.has_duplicates:
+            rep = pd.unique(mixes.index[mixes.index.duplicated()])[:5]
+            raise ValueError(f"Traços repetidos na tabela de traços: {', '.join(map(str, rep))}")
+        pos = mixes.index.get_indexer(orders[mix_col])
+        if (pos < 0).any():
+            faltam = pd.unique(orders[mix_col][pos < 0])[:5]
+            raise KeyError(f"Traços não cadastrados: {', '.join(map(str, faltam))}")
+        inputs = mixes.reindex(columns=list(ABCP_INPUTS)).iloc[pos].set_axis(orders.index)
+    inputs = inputs.fillna(ABCP_DEFAULTS)
+    empty = inputs.isna()
+    bad = empty.any(axis=1).to_numpy()
+    if bad.any():
+        # entrada vazia sem padrão: o traço sairia NaN e os tickets em branco
+        ids = (orders["pedido"] if "pedido" in orders.columns else orders.index.to_series()).to_numpy()[bad]
+        cols = [k for k in ABCP_INPUTS if empty[k].to_numpy()[bad].any()]
+        more = f" (+{len(ids) - 5})" if len(ids) > 5 else ""
+        raise ValueError(f"Pedidos com entradas vazias ({', '.join(cols)}): "
+                         f"{', '.join(map(str, ids[:5]))}{more}")
+    return inputs
+
+
+def unique_mixes(inputs: pd.DataFrame):
+    # Traços distintos (linhas de entrada idênticas) e o código de cada pedido
+    codes, uniq = pd.MultiIndex.from_frame(inputs.astype(float)).factorize()
+    return codes, uniq.to_frame(index=False).set_axis(list(inputs.columns), axis=1)
+
+
+def split_orders(volume, truck, mixer):
+    # Índices do pedido, nº do caminhão e da betonada e volume de cada betonada
+    volume = np.asarray(volume, dtype=float)
+    truck = np.broadcast_to(np.asarray(truck, dtype=float), volume.shape)
+    mixer = np.broadcast_to(np.asarray(mixer, dtype=float), volume.shape)
+    if (truck <= 0).any() or (mixer <= 0).any() or not (np.isfinite(truck).all() and np.isfinite(mixer).all()):
+        raise ValueError("Capacidades de caminhão e misturador devem ser positivas")
+    volume = np.where(np.isfinite(volume) & (volume > 0), volume, 0.0)
+
+    # caminhões: cheios + um parcial
+    n_trucks = np.ceil(volume / truck - _EPS).astype(np.int64)
+    order_t = np.repeat(np.arange(len(volume)), n_trucks)
+    start_t = np.cumsum(n_trucks) - n_trucks
+    k_truck = np.arange(len(order_t)) - np.repeat(start_t, n_trucks)
+    load = np.minimum(truck[order_t], volume[order_t] - k_truck * truck[order_t])
+
+    # betonadas iguais por caminhão
+    n_batches = np.ceil(load / mixer[order_t] - _EPS).astype(np.int64)
+    truck_b = np.repeat(np.arange(len(order_t)), n_batches)
+    start_b = np.cumsum(n_batches) - n_batches
+    k_batch = np.arange(len(truck_b)) - np.repeat(start_b, n_batches)
+    vol = (load / n_batches)[truck_b]
+    return order_t[truck_b], k_truck[truck_b] + 1, k_batch + 1, vol
+
+
+def _runs(group: np.ndarray):
+    # Início e tamanho de cada sequência de valores iguais (grupos contíguos)
+    first = np.r_[True, group[1:] != group[:-1]] if len(group) else np.zeros(0, dtype=bool)
+    starts = np.flatnonzero(first)
+    return first, starts, np.diff(np.r_[starts, len(group)])
+
+
+def carry_round(exact: np.ndarray, group: np.ndarray, resolution) -> np.ndarray:
+    # Arredonda o acumulado de cada grupo (linhas contíguas) e devolve as
+    # diferenças: cada linha erra no máximo uma resolução e o total do grupo
+    # é o total exato arredondado.
+    exact = np.asarray(exact, dtype=float)
+    res = np.asarray(resolution, dtype=float)
+    if len(exact) == 0:
+        return exact.copy()
+    first, starts, sizes = _runs(group)
+    # acumulado dentro do grupo, sem propagar NaN de um grupo para outro
+    filled = np.where(np.isnan(exact), 0.0, exact)
+    cs = np.cumsum(filled, axis=0)
+    base = np.concatenate([np.zeros((1,) + cs.shape[1:]), cs[starts[1:] - 1]])
+    cs = cs - np.repeat(base, sizes, axis=0)
+    rc = np.round(cs / res) * res
+    prev = np.roll(rc, 1, axis=0)
+    prev[first] = 0.0
+    out = rc - prev
+    out[np.isnan(exact)] = np.nan
+    return out
+
+
+def plan_dispatch(orders, mixes: Optional[pd.DataFrame] = None, mix_col: str = "traco",
+                  resolution: Optional[Mapping[str, float]] = None,
+                  carry_columns=None) -> pd.DataFrame:
+    # Tabela de tickets (uma linha por betonada) a partir dos pedidos.
+    # `orders`: pedido, volume_m3, cap_caminhao, cap_misturador e as entradas
+    #   de compute_abcp (ou `mix_col` apontando para `mixes`).
+    # `resolution`: sobrescreve RESOLUTION por coluna do ticket.
+    # `carry_columns`: colunas do pedido repetidas no ticket (ex.: cliente, obra).
+    orders = orders if isinstance(orders, pd.DataFrame) else pd.DataFrame(orders)
+    missing = [k for k in ORDER_COLUMNS[1:] if k not in orders.columns]
+    if missing:
+        raise KeyError(f"Pedidos sem as colunas: {', '.join(missing)}")
+    res = dict(RESOLUTION, **(resolution or {}))
+
+    with instrument.span("dispatch.plan", orders=len(orders)):
+        codes, uniq = unique_mixes(_order_inputs(orders, mixes, mix_col))
+        instrument.count("dispatch.mixes", len(uniq))
+        with instrument.span("dispatch.compute", mixes=len(uniq)):
+            per_m3 = compute_abcp_batch(uniq)
+        q = per_m3[[src for _, src in TICKET_QUANTITIES]].to_numpy(dtype=float)
+
+        o, caminhao, betonada, vol = split_orders(orders["volume_m3"].to_numpy(),
+                                                  orders["cap_caminhao"].to_numpy(),
+                                                  orders["cap_misturador"].to_numpy())
+        exact = vol[:, None] * q[codes[o]]
+        rounded = carry_round(exact, o, [res[name] for name, _ in TICKET_QUANTITIES])
+
+        pedido = orders["pedido"].to_numpy() if "pedido" in orders.columns else orders.index.to_numpy()
+        _, starts, sizes = _runs(o)
+        seq = np.arange(len(o)) - np.repeat(starts, sizes)
+        cols: Dict[str, np.ndarray] = {
+            "pedido": pedido[o], "caminhao": caminhao, "betonada": betonada, "seq": seq + 1,
+            "traco": orders[mix_col].to_numpy()[o] if mix_col in orders.columns else codes[o],
+            "volume_m3": vol,
+        }
+        for j, (name, _) in enumerate(TICKET_QUANTITIES):
+            cols[name] = rounded[:, j]
+        tickets = pd.DataFrame(cols)
+        for c in carry_columns or ():
+            tickets[c] = orders[c].to_numpy()[o]
+    return tickets
+
+
+def order_totals(tickets: pd.DataFrame) -> pd.DataFrame:
+    # Resumo por pedido: caminhões, betonadas, volume e quantidades totais
+    g = tickets.groupby("pedido", sort=False)
+    out = g[["volume_m3"] + [name for name, _ in TICKET_QUANTITIES]].sum()
+    out.insert(0, "betonadas", g.size())
+    out.insert(0, "caminhoes", g["caminhao"].max())
+    return out
+
+
+def main(argv=None) -> int:
+    # python -m core.dispatch pedidos.csv tickets.csv [--mixes tracos.csv] [--pdf tickets.pdf]
+    p = argparse.ArgumentParser(prog="python -m core.dispatch",
+                                description="Divide os pedidos do dia em betonadas (tickets do misturador).")
+    p.add_argument("orders", help="pedidos (.csv ou .parquet)")
+    p.add_argument("output", help="tickets (.csv ou .parquet)")
+    p.add_argument("--mixes", help="tabela de traços (.csv/.parquet) com a coluna do código e as entradas de compute_abcp")
+    p.add_argument("--mix-col", default="traco")
+    p.add_argument("--sep", default=",")
+    p.add_argument("--carry", default="", help="colunas do pedido repetidas no ticket (ex.: cliente,obra)")
+    p.add_argument("--pdf", help="grava também o relatório de tickets em PDF")
+    args = p.parse_args(argv)
+
+    from .cli import _fmt, _require_pyarrow
+
+    def _read(path):
+        fmt = _fmt(Path(path), None)
+        if fmt == "parquet":
+            _require_pyarrow()
+            return pd.read_parquet(path)
+        return pd.read_csv(path, sep=args.sep)
+
+    orders = _read(args.orders)
+    mixes = _read(args.mixes).set_index(args.mix_col) if args.mixes else None
+    carry = [c for c in args.carry.split(",") if c]
+    try:
+        tickets = plan_dispatch(orders, mixes, mix_col=args.mix_col, carry_columns=carry)
+    except (KeyError, ValueError) as e:
+        raise SystemExit(str(e.args[0]))
+    out = Path(args.output)
+    if _fmt(out, None) == "parquet":
+        _require_pyarrow()
+        tickets.to_parquet(out, index=False)
+    else:
+        tickets.to_csv(out, index=False, sep=args.sep)
+    if args.pdf:
+        from .pdf_utils import generate_ticket_report
+        generate_ticket_report(args.pdf, tickets)
+    sys.stderr.write(f"{len(orders):,} pedidos | {len(tickets):,} betonadas\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
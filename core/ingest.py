@@ -0,0 +1,107 @@
+from __future__ import annotations
+from typing import Dict, Any, Union, Optional, Tuple, List
+from pathlib import Path
+from . import instrument
+
+# Named ranges da Tabela 2 (lookup de Ca)
+CA_NAMES = ("Tabela2Ca", "Tabela2Dmax", "Tabela2Slump")
+
+# Janelas fixas da aba ABCP: (linha, coluna, altura, largura), 1-based
+ABCP_WINDOWS = {
+    "t1": (1, 1, 12, 12),    # Tabela 1
+    "t2": (11, 1, 16, 16),   # Tabelas 2 + 3
+    "t4": (2, 8, 16, 12),    # Tabela 4
+    "t5": (19, 8, 16, 10),   # Tabela 5 (britas)
+}
+
+Bounds = Tuple[int, int, int, int]  # (min_row, min_col, max_row, max_col)
+
+
+class WorkbookTables:
+    # Resultado de uma única leitura do Excel: blocos de células por aba,
+    # com as coordenadas de cada named range e a aba das tabelas ABCP.
+
+    def __init__(self, sheetnames: List[str], abcp_sheet: Optional[str],
+                 blocks: Dict[str, Tuple[int, int, List[List[Any]]]],
+                 names: Dict[str, Tuple[str, Bounds]]):
+        self.sheetnames = sheetnames
+        self.abcp_sheet = abcp_sheet
+        self.blocks = blocks
+        self.names = names
+
+    def block(self, sheet: str, row: int, col: int, height: int, width: int) -> List[List[Any]]:
+        # Recorte (height x width) a partir de (row, col); fora do bloco lido -> None
+        r0, c0, data = self.blocks.get(sheet, (row, col, []))
+        out = []
+        for rr in range(row - r0, row - r0 + height):
+            src = data[rr] if 0 <= rr < len(data) else ()
+            out.append([src[cc] if 0 <= cc < len(src) else None
+                        for cc in range(col - c0, col - c0 + width)])
+        return out
+
+    def named(self, name: str) -> Optional[List[List[Any]]]:
+        ref = self.names.get(name)
+        if ref is None:
+            return None
+        sheet, (min_row, min_col, max_row, max_col) = ref
+        return self.block(sheet, min_row, min_col, max_row - min_row + 1, max_col - min_col + 1)
+
+    def window(self, key: str) -> List[List[Any]]:
+        r, c, h, w = ABCP_WINDOWS[key]
+        return self.block(self.abcp_sheet, r, c, h, w)
+
+
+def _resolve_name(wb, name: str) -> Optional[Tuple[str, Bounds]]:
+    from openpyxl.utils import range_boundaries
+    try:
+        dn = wb.defined_names.get(name)
+        if dn is None:
+            return None
+        dests = list(dn.destinations)
+        if not dests:
+            return None
+        sheet_name, ref = dests[0]
+        min_col, min_row, max_col, max_row = range_boundaries(ref)
+        return sheet_name, (min_row, min_col, max_row, max_col)
+    except Exception:
+        return None
+
+
+@instrument.traced("ingest_workbook")
+def ingest_workbook(excel_path: Union[str, bytes, Path], names=CA_NAMES) -> WorkbookTables:
+    # Abre o Excel uma vez (read-only/streaming) e lê, por aba, só o retângulo
+    # que cobre todos os named ranges e janelas ABCP pedidos.
+    from openpyxl import load_workbook
+    with instrument.span("load_workbook", read_only=True):
+        wb = load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        sheetnames = list(wb.sheetnames)
+        abcp_sheet = "ABCP" if "ABCP" in sheetnames else (wb.active.title if wb.active is not None else None)
+
+        resolved: Dict[str, Tuple[str, Bounds]] = {}
+        for name in names:
+            ref = _resolve_name(wb, name)
+            if ref is not None and ref[0] in sheetnames:
+                resolved[name] = ref
+
+        regions: Dict[str, List[Bounds]] = {}
+        for sheet, bounds in resolved.values():
+            regions.setdefault(sheet, []).append(bounds)
+        if abcp_sheet is not None:
+            for r, c, h, w in ABCP_WINDOWS.values():
+                regions.setdefault(abcp_sheet, []).append((r, c, r + h - 1, c + w - 1))
+
+        blocks = {}
+        for sheet, rects in regions.items():
+            min_row = min(b[0] for b in rects); min_col = min(b[1] for b in rects)
+            max_row = max(b[2] for b in rects); max_col = max(b[3] for b in rects)
+            ws = wb[sheet]
+            with instrument.span("ingest.read_block", sheet=sheet):
+                rows = [list(r) for r in ws.iter_rows(min_row=min_row, max_row=max_row,
+                                                      min_col=min_col, max_col=max_col,
+                                                      values_only=True)]
+            instrument.count("cells_read", (max_row - min_row + 1) * (max_col - min_col + 1))
+            blocks[sheet] = (min_row, min_col, rows)
+    finally:
+        wb.close()
+    return WorkbookTables(sheetnames, abcp_sheet, blocks, resolved)
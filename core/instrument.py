@@ -0,0 +1,193 @@
+from __future__ import annotations
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+# Instrumentação leve dos caminhos quentes (só biblioteca padrão).
+# Desligada por padrão: span()/count() viram no-op. Liga-se globalmente com
+# ABCP_TRACE=1 / enable(), ou por sessão com activate(Recorder(...)).
+
+_enabled = os.environ.get("ABCP_TRACE", "").strip() not in ("", "0", "false", "False")
+_current: contextvars.ContextVar = contextvars.ContextVar("abcp_recorder", default=None)
+_PID = os.getpid()
+
+
+class _SpanStats:
+    __slots__ = ("count", "total", "min", "max", "hist")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.hist: Dict[int, int] = {}
+
+    def add(self, dur: float):
+        self.count += 1
+        self.total += dur
+        self.min = min(self.min, dur)
+        self.max = max(self.max, dur)
+        # classes em potências de 2 de microssegundos
+        b = int(dur * 1e6).bit_length()
+        self.hist[b] = self.hist.get(b, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count, "total_s": self.total,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "min_s": self.min if self.count else 0.0, "max_s": self.max,
+            "hist_us": {f"<{1 << b}": n for b, n in sorted(self.hist.items())},
+        }
+
+
+class Recorder:
+    # Agregados (tempo, chamadas, histograma) por span, contadores
+    # (ex.: células lidas) e os últimos `max_events` eventos para o trace.
+
+    def __init__(self, name: str = "default", enabled: bool = True, max_events: int = 50_000):
+        self.name = name
+        self.enabled = enabled
+        self.spans: Dict[str, _SpanStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.events: deque = deque(maxlen=max_events)
+        self.t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, dur: float, args: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            st = self.spans.get(name)
+            if st is None:
+                st = self.spans[name] = _SpanStats()
+            st.add(dur)
+            self.events.append((name, start, dur, threading.get_ident(), args))
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+            self.events.clear()
+            self.t0 = time.perf_counter()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "recorder": self.name,
+                "spans": {k: v.as_dict() for k, v in sorted(self.spans.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_json(self, **kw) -> str:
+        return json.dumps(self.summary(), **kw)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        # Formato "Trace Event" (chrome://tracing, Perfetto): eventos completos (ph=X) em µs
+        with self._lock:
+            events = [
+                {"name": name, "cat": "abcp", "ph": "X", "pid": _PID, "tid": tid,
+                 "ts": (start - self.t0) * 1e6, "dur": dur * 1e6, "args": args or {}}
+                for name, start, dur, tid, args in self.events
+            ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"recorder": self.name}}
+
+    def to_chrome_trace(self, **kw) -> str:
+        return json.dumps(self.chrome_trace(), default=str, **kw)
+
+
+GLOBAL = Recorder("global")
+
+
+def enable(flag: bool = True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def is_enabled() -> bool:
+    return _active() is not None
+
+
+def activate(rec: Optional[Recorder]):
+    # Recorder do contexto atual (thread/tarefa); None volta ao global
+    return _current.set(rec)
+
+
+@contextmanager
+def use_recorder(rec: Optional[Recorder]):
+    token = _current.set(rec)
+    try:
+        yield rec
+    finally:
+        _current.reset(token)
+
+
+def _active() -> Optional[Recorder]:
+    rec = _current.get()
+    if rec is not None and rec.enabled:
+        return rec
+    return GLOBAL if _enabled else None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("rec", "name", "args", "start")
+
+    def __init__(self, rec: Recorder, name: str, args):
+        self.rec, self.name, self.args = rec, name, args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.rec.record(self.name, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+
+def span(label: str, **args):
+    rec = _active()
+    if rec is None:
+        return _NULL
+    return _Span(rec, label, args or None)
+
+
+def count(name: str, n: int = 1):
+    rec = _active()
+    if rec is not None:
+        rec.count(name, n)
+
+
+def traced(name: Optional[str] = None):
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **k):
+            rec = _active()
+            if rec is None:
+                return fn(*a, **k)
+            start = time.perf_counter()
+            try:
+                return fn(*a, **k)
+            finally:
+                rec.record(label, start, time.perf_counter() - start, None)
+        return wrapper
+    return deco
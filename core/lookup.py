@@ -0,0 +1,166 @@
+from __future__ import annotations
+import re
+from typing import Dict, Any, Sequence
+import numpy as np
+import pandas as pd
+
+LOOKUP_MODES = ("exact", "nearest", "bilinear")
+
+_NUM = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def label_key(v) -> str:
+    # Mesma normalização de lookup_ca: str(v).strip(); 19 e 19.0 viram "19"
+    if isinstance(v, (int, float, np.number)) and not isinstance(v, bool):
+        f = float(v)
+        return str(int(f)) if f.is_integer() else str(f)
+    s = str(v).strip()
+    try:
+        f = float(s.replace(",", "."))
+        return str(int(f)) if f.is_integer() else str(f)
+    except ValueError:
+        return s
+
+
+def label_value(v) -> float:
+    # Valor numérico do rótulo: 19 -> 19.0; "40-60" / "40 a 60" -> 50.0 (ponto médio)
+    if v is None:
+        return np.nan
+    if isinstance(v, (int, float, np.number)) and not isinstance(v, bool):
+        return float(v)
+    nums = [float(n.replace(",", ".")) for n in _NUM.findall(str(v).replace("±", " "))]
+    if not nums:
+        return np.nan
+    if len(nums) >= 2 and re.search(r"\d\s*(?:-|a|–)\s*\d", str(v)):
+        return (nums[0] + nums[1]) / 2.0
+    return nums[0]
+
+
+class _Axis:
+    def __init__(self, labels: Sequence[Any]):
+        self.labels = list(labels)
+        self.index = pd.Index([label_key(v) for v in self.labels])
+        self.values = np.array([label_value(v) for v in self.labels], dtype=float)
+        ok = ~np.isnan(self.values)
+        order = np.argsort(self.values[ok], kind="stable")
+        self.order = np.flatnonzero(ok)[order]
+        self.sorted = self.values[self.order]
+
+    def exact(self, x) -> np.ndarray:
+        # Posição do rótulo (hash) ou do valor numérico exato; -1 se não houver
+        x = np.asarray(x)
+        if x.dtype.kind in "fiu":
+            xf = x.astype(float).ravel()
+            pos = np.clip(np.searchsorted(self.sorted, xf), 0, max(len(self.sorted) - 1, 0))
+            if len(self.sorted) == 0:
+                return np.full(x.shape, -1)
+            hit = np.isclose(self.sorted[pos], xf, rtol=0, atol=1e-9)
+            return np.where(hit, self.order[pos], -1).reshape(x.shape)
+        # rótulos repetidos (caso típico em lote) são normalizados uma vez só
+        codes, uniq = pd.factorize(x.ravel(), use_na_sentinel=False)
+        pos = self.index.get_indexer([label_key(v) for v in uniq])
+        return pos[codes].reshape(x.shape)
+
+    def numeric(self, x) -> np.ndarray:
+        x = np.asarray(x)
+        if x.dtype.kind in "fiu":
+            return x.astype(float)
+        codes, uniq = pd.factorize(x.ravel(), use_na_sentinel=False)
+        vals = np.array([label_value(v) for v in uniq], dtype=float)
+        return vals[codes].reshape(x.shape)
+
+    def nearest(self, x) -> np.ndarray:
+        xf = self.numeric(x)
+        n = len(self.sorted)
+        if n == 0:
+            return np.full(xf.shape, -1)
+        hi = np.clip(np.searchsorted(self.sorted, xf), 0, n - 1)
+        lo = np.clip(hi - 1, 0, n - 1)
+        take_lo = np.abs(xf - self.sorted[lo]) <= np.abs(self.sorted[hi] - xf)
+        pos = np.where(take_lo, lo, hi)
+        return np.where(np.isnan(xf), -1, self.order[pos])
+
+    def bracket(self, x):
+        # Índices vizinhos e peso linear (sem extrapolar: satura nas bordas)
+        xf = self.numeric(x)
+        n = len(self.sorted)
+        if n == 0:
+            m = np.full(xf.shape, -1)
+            return m, m, np.zeros(xf.shape)
+        xc = np.clip(xf, self.sorted[0], self.sorted[-1])
+        hi = np.clip(np.searchsorted(self.sorted, xc, side="right"), 1, max(n - 1, 1))
+        lo = hi - 1
+        if n == 1:
+            hi = lo = np.zeros(xf.shape, dtype=int)
+            w = np.zeros(xf.shape)
+        else:
+            span = self.sorted[hi] - self.sorted[lo]
+            w = np.where(span > 0, (xc - self.sorted[lo]) / np.where(span > 0, span, 1.0), 0.0)
+        bad = np.isnan(xf)
+        return np.where(bad, -1, self.order[lo]), np.where(bad, -1, self.order[hi]), w
+
+
+class GridTable:
+    # Tabela de dupla entrada indexada uma vez: rótulos por hash (pd.Index),
+    # eixos numéricos ordenados para nearest/bilinear, consultas vetorizadas.
+
+    def __init__(self, row_labels: Sequence[Any], col_labels: Sequence[Any], values, name: str = ""):
+        self.name = name
+        self.rows = _Axis(row_labels)
+        self.cols = _Axis(col_labels)
+        vals = np.array([[np.nan if v is None else float(v) for v in row] for row in np.asarray(values, dtype=object)],
+                        dtype=float).reshape(len(self.rows.labels), -1)
+        self.values = vals[:, :len(self.cols.labels)]
+
+    @property
+    def row_labels(self):
+        return self.rows.labels
+
+    @property
+    def col_labels(self):
+        return self.cols.labels
+
+    def _take(self, i, j) -> np.ndarray:
+        ok = (i >= 0) & (j >= 0)
+        out = np.full(np.shape(ok), np.nan)
+        out[ok] = self.values[i[ok], j[ok]]
+        return out
+
+    def lookup(self, row, col, mode: str = "exact"):
+        # Escalares -> float; arrays -> np.ndarray (NaN onde não há valor)
+        if mode not in LOOKUP_MODES:
+            raise ValueError(f"mode deve ser um de {LOOKUP_MODES}")
+        scalar = np.ndim(row) == 0 and np.ndim(col) == 0
+        r, c = np.broadcast_arrays(np.asarray(row), np.asarray(col))
+        if mode == "exact":
+            out = self._take(self.rows.exact(r), self.cols.exact(c))
+        elif mode == "nearest":
+            out = self._take(self.rows.nearest(r), self.cols.nearest(c))
+        else:
+            r0, r1, wr = self.rows.bracket(r)
+            c0, c1, wc = self.cols.bracket(c)
+            # vizinho com peso 0 não entra (célula em branco não vira NaN
+            # numa consulta exatamente sobre um ponto da grade)
+            out = 0.0
+            for w, i, j in (((1 - wr) * (1 - wc), r0, c0), ((1 - wr) * wc, r0, c1),
+                            (wr * (1 - wc), r1, c0), (wr * wc, r1, c1)):
+                out = out + np.where(w == 0, 0.0, w * self._take(i, j))
+        return float(out) if scalar else out
+
+
+def ca_grid(source: Dict[str, Any]) -> GridTable:
+    # Ca (L/m³) por Dmáx (linhas) x Slump (colunas), a partir de load_ca_lookup
+    # ou de load_abcp_tables (onde a Tabela 2 vem como slump x dmax)
+    if "ca_table" in source:
+        return GridTable(source["dmax_labels"], source["slump_labels"], source["ca_table"], name="Ca")
+    t2 = source["tabela2"]
+    keep = [j for j, d in enumerate(t2["dmax"]) if not (d is None or (isinstance(d, float) and np.isnan(d)))]
+    dmax = [t2["dmax"][j] for j in keep]
+    ca = [[row[j] if j < len(row) else None for j in keep] for row in t2["ca"]]
+    return GridTable(dmax, t2["slump"], np.array(ca, dtype=object).T.reshape(len(keep), -1), name="Ca")
+
+
+def vb_grid(tables: Dict[str, Any]) -> GridTable:
+    # Vb por MF (linhas) x Dmáx (colunas), a partir de load_abcp_tables
+    t3 = tables["tabela3"]
+    return GridTable(t3["mf"], t3["dmax"], t3["vb"], name="Vb")
@@ -0,0 +1,185 @@
+from __future__ import annotations
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from .compute import compute_abcp
+from . import instrument
+
+# Correção de umidade em fluxo (sondas da central dosadora). Só a parte do
+# traço que depende de U_areia/U_brita é recalculada a cada leitura; P33, Cc,
+# Vm, Cm_seca e a água de absorção vêm do traço base e ficam fixos.
+
+MOISTURE_OUTPUTS = (
+    "Cm_umida", "agua_areia_total", "agua_brita_total",
+    "agua_moist_total", "agua_adicionar_kg",
+)
+
+
+class Reading(NamedTuple):
+    # Leitura de uma sonda; None = grandeza não medida nesta leitura (mantém a anterior)
+    mixer: Any
+    U_areia: Optional[float] = None
+    U_brita: Optional[float] = None
+    t: Optional[float] = None
+
+
+class MoistureCorrector:
+    # Traço base + umidades correntes. update() custa O(1) e reproduz
+    # exatamente os valores de compute_abcp para as mesmas umidades.
+
+    def __init__(self, inputs: Dict[str, Any], base: Optional[Dict[str, Any]] = None):
+        self.inputs = dict(inputs)
+        self.base = dict(base) if base is not None else compute_abcp(**self.inputs)
+        self._Cm_seca = self.base["Cm_seca"]
+        self._Cb_total = self.inputs["Cb_total"]
+        # mesma ordem de soma de compute_abcp: (P33 + absorção) - umidade
+        self._agua_alvo = self.base["P33"] + self.base["agua_absorcao"]
+        self.U_areia = float(self.inputs["U_areia"])
+        self.U_brita = float(self.inputs.get("U_brita", 0.0))
+        self.n_updates = 0
+        self.current = self._outputs()
+
+    def _outputs(self) -> Dict[str, float]:
+        Cm_umida = self._Cm_seca * (1.0 + self.U_areia / 100.0)
+        agua_areia_total = Cm_umida - self._Cm_seca
+        agua_brita_total = self._Cb_total * (self.U_brita / 100.0)
+        agua_moist_total = agua_areia_total + agua_brita_total
+        return dict(
+            Cm_umida=Cm_umida,
+            agua_areia_total=agua_areia_total,
+            agua_brita_total=agua_brita_total,
+            agua_moist_total=agua_moist_total,
+            agua_adicionar_kg=self._agua_alvo - agua_moist_total,
+        )
+
+    def update(self, U_areia: Optional[float] = None, U_brita: Optional[float] = None) -> Dict[str, float]:
+        if U_areia is not None:
+            self.U_areia = float(U_areia)
+        if U_brita is not None:
+            self.U_brita = float(U_brita)
+        self.n_updates += 1
+        self.current = self._outputs()
+        return self.current
+
+    def design(self) -> Dict[str, Any]:
+        # Traço completo com as umidades correntes (formato de compute_abcp)
+        return {**self.base, **self.current}
+
+
+def _emit(correctors: Dict[Any, MoistureCorrector], r: Reading) -> Dict[str, Any]:
+    corr = correctors.get(r.mixer)
+    if corr is None:
+        raise KeyError(f"Misturador sem traço base: {r.mixer!r}")
+    out = corr.update(r.U_areia, r.U_brita)
+    return {"mixer": r.mixer, "t": r.t, "U_areia": corr.U_areia, "U_brita": corr.U_brita, **out}
+
+
+def correct_stream(
+    correctors: Dict[Any, MoistureCorrector],
+    readings: Iterable[Reading],
+) -> Iterator[Dict[str, Any]]:
+    # Uma saída por leitura; as leituras de vários misturadores podem vir intercaladas
+    n = 0
+    with instrument.span("moisture.stream"):
+        for r in readings:
+            n += 1
+            yield _emit(correctors, r)
+    instrument.count("moisture.readings", n)
+
+
+async def correct_stream_async(
+    correctors: Dict[Any, MoistureCorrector],
+    readings: AsyncIterable[Reading],
+) -> AsyncIterator[Dict[str, Any]]:
+    n = 0
+    async for r in readings:
+        n += 1
+        yield _emit(correctors, r)
+    instrument.count("moisture.readings", n)
+
+
+async def merge_streams(*sources: AsyncIterable[Reading], maxsize: int = 1024) -> AsyncIterator[Reading]:
+    # Junta os fluxos de várias sondas/misturadores na ordem de chegada.
+    # Fila limitada: uma fonte rápida espera se o consumidor atrasar.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    done = object()
+
+    async def pump(src):
+        # Ao terminar, a fonte avisa com `done` (ou com o erro, que sobe para
+        # quem consome). Cancelada, não avisa: o consumidor já parou e a fila
+        # cheia bloquearia o cancelamento.
+        try:
+            async for r in src:
+                await queue.put(r)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(_SourceError(e))
+            return
+        await queue.put(done)
+
+    tasks = [asyncio.ensure_future(pump(s)) for s in sources]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            r = await queue.get()
+            if r is done:
+                remaining -= 1
+            elif isinstance(r, _SourceError):
+                raise r.error
+            else:
+                yield r
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class _SourceError:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+# --- Sondas simuladas (testes locais) ---
+
+def _walk(rng: random.Random, u: float, sd: float, lo: float, hi: float) -> float:
+    return min(max(u + rng.gauss(0.0, sd), lo), hi)
+
+
+def simulated_readings(
+    mixer: Any,
+    n: int,
+    U_areia: float = 6.0,
+    U_brita: float = 0.5,
+    sd: Tuple[float, float] = (0.05, 0.02),
+    seed: Optional[int] = None,
+    rate_hz: Optional[float] = None,
+) -> Iterator[Reading]:
+    # Passeio aleatório em torno das umidades iniciais (limitado a 0–20 % / 0–6 %).
+    # Com `rate_hz`, espera entre leituras como uma sonda real.
+    rng = random.Random(seed)
+    ua, ub = float(U_areia), float(U_brita)
+    for _ in range(int(n)):
+        ua = _walk(rng, ua, sd[0], 0.0, 20.0)
+        ub = _walk(rng, ub, sd[1], 0.0, 6.0)
+        yield Reading(mixer, ua, ub, time.time())
+        if rate_hz:
+            time.sleep(1.0 / rate_hz)
+
+
+async def simulated_readings_async(
+    mixer: Any,
+    n: int,
+    U_areia: float = 6.0,
+    U_brita: float = 0.5,
+    sd: Tuple[float, float] = (0.05, 0.02),
+    seed: Optional[int] = None,
+    rate_hz: Optional[float] = None,
+) -> AsyncIterator[Reading]:
+    for r in simulated_readings(mixer, n, U_areia, U_brita, sd, seed):
+        yield r
+        await asyncio.sleep(1.0 / rate_hz if rate_hz else 0)
@@ -0,0 +1,212 @@
+from __future__ import annotations
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+from .compute import compute_abcp_batch, ABCP_INPUTS
+
+MC_OUTPUTS = ("agua_adicionar_kg", "Cm_umida", "V_areia_med_L")
+MC_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def sample(dist, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Distribuições aceitas (por entrada de compute_abcp):
+    #   valor fixo | ("normal", média, dp[, mín, máx]) | ("uniform", mín, máx)
+    #   ("triangular", mín, moda, máx) | ("lognormal", média_log, dp_log) | callable(rng, n)
+    if callable(dist):
+        return np.asarray(dist(rng, n), dtype=float)
+    if not isinstance(dist, (tuple, list)):
+        return np.full(n, float(dist))
+    kind, *p = dist
+    if kind == "normal":
+        x = rng.normal(p[0], p[1], n)
+        if len(p) >= 4:
+            x = np.clip(x, p[2], p[3])
+        return x
+    if kind == "uniform":
+        return rng.uniform(p[0], p[1], n)
+    if kind == "triangular":
+        return rng.triangular(p[0], p[1], p[2], n)
+    if kind == "lognormal":
+        return rng.lognormal(p[0], p[1], n)
+    raise ValueError(f"Distribuição desconhecida: {kind!r}")
+
+
+class StreamingHistogram:
+    # Histograma em fluxo para percentis: memória O(bins), combinável entre
+    # blocos/processos. A faixa cresce quando chega valor fora dela: a
+    # largura da classe dobra e as classes antigas são somadas duas a duas
+    # (sem perda), então as caudas nunca são achatadas nas pontas.
+
+    def __init__(self, lo: float, hi: float, bins: int = 4096):
+        if bins < 2 or bins % 2:
+            raise ValueError("bins deve ser par")
+        self.lo, self.bins = float(lo), int(bins)
+        self.width = (float(hi) - self.lo) / self.bins
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.nonfinite = 0
+
+    @property
+    def hi(self) -> float:
+        return self.lo + self.width * self.bins
+
+    def _widen(self, left: bool):
+        # Dobra a faixa para a esquerda ou para a direita
+        pairs = self.counts.reshape(-1, 2).sum(axis=1)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        half = self.bins // 2
+        if left:
+            self.counts[half:] = pairs
+            self.lo -= self.width * self.bins
+        else:
+            self.counts[:half] = pairs
+        self.width *= 2.0
+
+    def _cover(self, lo: float, hi: float):
+        while lo < self.lo:
+            self._widen(left=True)
+        while hi >= self.hi:
+            self._widen(left=False)
+
+    def add(self, x: np.ndarray):
+        x = np.asarray(x, dtype=float).ravel()
+        finite = np.isfinite(x)
+        self.nonfinite += int((~finite & ~np.isnan(x)).sum())
+        x = x[finite]
+        if len(x) == 0:
+            return
+        xmin, xmax = float(x.min()), float(x.max())
+        self._cover(xmin, xmax)
+        pos = np.floor((x - self.lo) / self.width).astype(np.int64)
+        self.counts += np.bincount(np.clip(pos, 0, self.bins - 1), minlength=self.bins)
+        self.n += len(x)
+        self.total += float(x.sum())
+        self.total_sq += float(np.dot(x, x))
+        self.min = min(self.min, xmin)
+        self.max = max(self.max, xmax)
+
+    def merge(self, other: "StreamingHistogram"):
+        # Histogramas do mesmo piloto têm grades alinhadas: a soma é exata.
+        # Grades diferentes: as classes de `other` entram pelo centro.
+        if other.n:
+            self._cover(other.lo, other.hi - other.width * 0.5)
+            while self.width < other.width:
+                self._widen(left=False)
+            centers = other.lo + (np.arange(other.bins) + 0.5) * other.width
+            pos = np.clip(np.floor((centers - self.lo) / self.width).astype(np.int64), 0, self.bins - 1)
+            self.counts += np.bincount(pos, weights=other.counts, minlength=self.bins).astype(np.int64)
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.nonfinite += other.nonfinite
+
+    def quantile(self, q) -> np.ndarray:
+        # Interpolação linear dentro da classe; limitada ao mín/máx observados
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        cum = np.cumsum(self.counts)
+        target = q * self.n
+        k = np.clip(np.searchsorted(cum, target, side="left"), 0, self.bins - 1)
+        below = np.where(k > 0, cum[k - 1], 0)
+        inside = np.maximum(self.counts[k], 1)
+        x = self.lo + (k + (target - below) / inside) * self.width
+        return np.clip(x, self.min, self.max)
+
+    def summary(self, percentiles: Sequence[float] = MC_PERCENTILES) -> Dict[str, float]:
+        mean = self.total / self.n if self.n else np.nan
+        var = max(self.total_sq / self.n - mean * mean, 0.0) if self.n else np.nan
+        out = {"n": self.n, "mean": mean, "std": float(np.sqrt(var)), "min": self.min, "max": self.max}
+        for p, v in zip(percentiles, self.quantile(np.asarray(percentiles) / 100.0)):
+            out[f"p{p:g}"] = float(v)
+        out["nonfinite"] = self.nonfinite
+        return out
+
+
+def _draw(base: Dict[str, Any], dists: Dict[str, Any], rng: np.random.Generator, n: int) -> Dict[str, np.ndarray]:
+    # Ordem fixa (ABCP_INPUTS) -> mesma semente, mesmas amostras
+    cols = dict(base)
+    for k in ABCP_INPUTS:
+        if k in dists:
+            cols[k] = sample(dists[k], rng, n)
+    return cols
+
+
+def _run_chunk(task):
+    base, dists, seed, n, outputs, ranges, bins = task
+    rng = np.random.default_rng(seed)
+    out = compute_abcp_batch(_draw(base, dists, rng, n), as_frame=False)
+    hists = {}
+    for k in outputs:
+        h = StreamingHistogram(*ranges[k], bins=bins)
+        h.add(out[k])
+        hists[k] = h
+    return hists
+
+
+def run_monte_carlo(
+    base: Dict[str, Any],
+    dists: Dict[str, Any],
+    n_samples: int,
+    chunk_size: int = 200_000,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    outputs: Sequence[str] = MC_OUTPUTS,
+    percentiles: Sequence[float] = MC_PERCENTILES,
+    bins: int = 4096,
+) -> pd.DataFrame:
+    # Propaga a variabilidade de `dists` por compute_abcp em blocos de
+    # `chunk_size` amostras. Cada bloco tem sua própria semente derivada de
+    # `seed` (SeedSequence.spawn), então o resultado não depende de `workers`.
+    # `workers` > 1 distribui os blocos num ProcessPoolExecutor.
+    if int(n_samples) < 1:
+        raise ValueError("n_samples deve ser >= 1")
+    unknown = [k for k in dists if k not in ABCP_INPUTS]
+    if unknown:
+        raise KeyError(f"Distribuições para entradas desconhecidas: {', '.join(map(str, unknown))} "
+                       f"(entradas: {', '.join(ABCP_INPUTS)})")
+    if workers and workers > 1:
+        # lambdas/funções locais não vão para outro processo: falha aqui,
+        # com mensagem clara, e não dentro dos workers
+        try:
+            pickle.dumps((base, dists))
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            raise ValueError(
+                "Distribuições não serializáveis para workers > 1 (lambda ou função local?); "
+                f"use uma função de módulo ou workers=1 ({e})") from None
+    n_chunks = -(-int(n_samples) // int(chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks + 1)
+
+    # Bloco piloto (semente própria) define a faixa inicial dos histogramas
+    pilot_n = min(int(chunk_size), int(n_samples), 50_000)
+    pilot = compute_abcp_batch(_draw(base, dists, np.random.default_rng(seeds[0]), pilot_n), as_frame=False)
+    ranges = {}
+    for k in outputs:
+        lo, hi = float(np.nanmin(pilot[k])), float(np.nanmax(pilot[k]))
+        pad = 0.5 * (hi - lo) if hi > lo else max(abs(lo) * 0.1, 1.0)
+        ranges[k] = (lo - pad, hi + pad)
+
+    sizes = [min(chunk_size, n_samples - i * chunk_size) for i in range(n_chunks)]
+    tasks = [(base, dists, seeds[i + 1], sizes[i], tuple(outputs), ranges, bins) for i in range(n_chunks)]
+    totals = {k: StreamingHistogram(*ranges[k], bins=bins) for k in outputs}
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = ex.map(_run_chunk, tasks)
+            for hists in results:
+                for k in outputs:
+                    totals[k].merge(hists[k])
+    else:
+        for task in tasks:
+            hists = _run_chunk(task)
+            for k in outputs:
+                totals[k].merge(hists[k])
+    return pd.DataFrame({k: totals[k].summary(percentiles) for k in outputs}).T
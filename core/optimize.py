@@ -0,0 +1,128 @@
+from __future__ import annotations
+from typing import Dict, Any, Optional, Sequence, Tuple, List
+import numpy as np
+import pandas as pd
+
+from .compute import compute_abcp_batch, ABCP_OUTPUTS
+
+# Preços por kg de material seco (mesma unidade monetária para todos)
+PRICE_KEYS = ("cimento", "brita_menor", "brita_maior", "areia", "agua")
+
+# Entradas fixas de compute_abcp (as variáveis de busca saem daqui)
+SEARCH_VARS = ("ac", "perc_b_menor", "Ca_L", "Cb_total", "Cc_min")
+
+
+def mix_cost(out, prices: Dict[str, float]):
+    # Custo por m³: massas secas x preço/kg
+    p = {k: float(prices.get(k, 0.0)) for k in PRICE_KEYS}
+    return (out["Cc"] * p["cimento"] + out["Cb_menor"] * p["brita_menor"]
+            + out["Cb_maior"] * p["brita_maior"] + out["Cm_seca"] * p["areia"]
+            + out["P33"] * p["agua"])
+
+
+def pareto_front(cost: np.ndarray, cement: np.ndarray) -> np.ndarray:
+    # Índices não dominados (minimiza custo e consumo de cimento)
+    order = np.lexsort((cost, cement))
+    c = cost[order]
+    best_before = np.concatenate(([np.inf], np.minimum.accumulate(c)[:-1]))
+    return order[c < best_before]
+
+
+def _choices(base: Dict[str, Any], tables: Optional[Dict[str, Any]], dmax_slump) -> pd.DataFrame:
+    # Uma linha por escolha de Dmáx/Slump com o Ca e o Cb correspondentes
+    if dmax_slump is None:
+        return pd.DataFrame({"dmax": [None], "slump": [None],
+                             "Ca_L": [float(base["Ca_L"])], "Cb_total": [float(base["Cb_total"])]})
+    from .lookup import ca_grid, vb_grid
+    ch = pd.DataFrame(list(dmax_slump), columns=["dmax", "slump"])
+    ch["Ca_L"] = ca_grid(tables).lookup(ch["dmax"].to_numpy(), ch["slump"].to_numpy())
+    if "Cb_total" in base:
+        ch["Cb_total"] = float(base["Cb_total"])
+    else:
+        vb = vb_grid(tables).lookup(np.full(len(ch), float(base["mf"])), ch["dmax"].to_numpy(), mode="bilinear")
+        vb = np.where(vb > 1.0, vb / 100.0, vb)
+        ch["Cb_total"] = vb * float(base["muc_brita"])
+    return ch.dropna(subset=["Ca_L", "Cb_total"]).reset_index(drop=True)
+
+
+def optimize_mix(
+    base: Dict[str, Any],
+    prices: Dict[str, float],
+    ac_max: float,
+    cc_min: float,
+    ac_grid: Optional[Sequence[float]] = None,
+    perc_grid: Optional[Sequence[float]] = None,
+    cc_floor_grid: Optional[Sequence[float]] = None,
+    dmax_slump: Optional[Sequence[Tuple[Any, Any]]] = None,
+    tables: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 250_000,
+) -> Dict[str, Any]:
+    # Busca o traço de menor custo/m³ sobre a/c x %brita menor x (Dmáx, Slump)
+    # x piso de cimento, respeitando a/c <= ac_max, Cc >= cc_min (Tabela 1) e Vm > 0.
+    # `base` traz as demais entradas de compute_abcp; com `dmax_slump` e
+    # `tables` (load_abcp_tables), Ca vem da Tabela 2 e Cb de Vb (Tabela 3,
+    # com base["mf"]) x base["muc_brita"], salvo se base["Cb_total"] for dado.
+    ac_grid = np.round(np.arange(0.30, 0.701, 0.01), 4) if ac_grid is None else np.asarray(ac_grid, dtype=float)
+    perc_grid = np.arange(0, 101, 5, dtype=float) if perc_grid is None else np.asarray(perc_grid, dtype=float)
+    floors = np.asarray([cc_min] if cc_floor_grid is None else cc_floor_grid, dtype=float)
+    floors = np.unique(floors[floors >= cc_min])
+    if len(floors) == 0:
+        floors = np.array([float(cc_min)])
+
+    n_total = len(ac_grid) * len(perc_grid) * len(floors) * max(len(dmax_slump or [None]), 1)
+    ac_grid = ac_grid[ac_grid <= ac_max + 1e-12]
+    ch = _choices(base, tables, dmax_slump)
+
+    # Poda 1 (sem %brita): Cc e volumes de água/cimento não dependem de perc_b_menor.
+    # Se nem a brita de menor volume deixa Vm > 0, a combinação inteira cai.
+    # Pisos abaixo de Cc_calc não mudam o traço: fica só o menor deles.
+    gc, ga, gf = np.meshgrid(np.arange(len(ch)), ac_grid, floors, indexing="ij")
+    gc, ga, gf = gc.ravel(), ga.ravel(), gf.ravel()
+    rho_w = float(base.get("rho_w", 1000.0))
+    P33 = ch["Ca_L"].to_numpy()[gc] * rho_w / 1000.0
+    Cc_calc = P33 / np.maximum(ga, 1e-9)
+    Cc = np.maximum(Cc_calc, gf)
+    Cb = ch["Cb_total"].to_numpy()[gc]
+    frac = np.clip(perc_grid / 100.0, 0, 1)
+    vg = Cb[:, None] * (frac[None, :] / float(base["rho_b_menor"]) + (1 - frac[None, :]) / float(base["rho_b_maior"]))
+    room = 1.0 - (Cc / float(base["rho_c"]) + P33 / rho_w)
+    alive = room > vg.min(axis=1)
+    redundant = np.zeros_like(alive)
+    inactive = gf <= Cc_calc
+    if inactive.any():
+        key = pd.DataFrame({"c": gc, "a": ga, "f": gf, "inactive": inactive})
+        first = key[key["inactive"]].groupby(["c", "a"])["f"].transform("min")
+        redundant[first.index.to_numpy()] = key.loc[first.index, "f"].to_numpy() != first.to_numpy()
+    keep = np.flatnonzero(alive & ~redundant)
+
+    n_cand = len(keep) * len(perc_grid)
+    fixed = {k: v for k, v in base.items() if k not in SEARCH_VARS}
+    best_rows: List[pd.DataFrame] = []
+    evaluated = 0
+    for start in range(0, n_cand, chunk_size):
+        idx = np.arange(start, min(start + chunk_size, n_cand))
+        g, p = keep[idx // len(perc_grid)], idx % len(perc_grid)
+        cand = pd.DataFrame({
+            "dmax": ch["dmax"].to_numpy()[gc[g]], "slump": ch["slump"].to_numpy()[gc[g]],
+            "ac": ga[g], "perc_b_menor": perc_grid[p], "Cc_min": gf[g],
+            "Ca_L": ch["Ca_L"].to_numpy()[gc[g]], "Cb_total": Cb[g],
+        })
+        out = compute_abcp_batch(cand, **fixed)
+        evaluated += len(cand)
+        feasible = (out["Vm"] > 0).to_numpy() & (out["Cc"] >= cc_min).to_numpy()
+        if not feasible.any():
+            continue
+        res = pd.concat([cand, out[list(ABCP_OUTPUTS)]], axis=1)[feasible].reset_index(drop=True)
+        res["custo"] = mix_cost(res, prices)
+        # só a frente de Pareto de cada bloco segue adiante (memória limitada)
+        best_rows.append(res.iloc[pareto_front(res["custo"].to_numpy(), res["Cc"].to_numpy())])
+
+    if not best_rows:
+        return {"best": None, "pareto": pd.DataFrame(), "evaluated": evaluated,
+                "pruned": n_total - evaluated, "candidates": n_total}
+    allp = pd.concat(best_rows, ignore_index=True)
+    front = allp.iloc[pareto_front(allp["custo"].to_numpy(), allp["Cc"].to_numpy())]
+    front = front.sort_values("Cc").reset_index(drop=True)
+    best = front.loc[front["custo"].idxmin()]
+    return {"best": best, "pareto": front, "evaluated": evaluated,
+            "pruned": n_total - evaluated, "candidates": n_total}
@@ -1,17 +1,47 @@
+import io
+from . import instrument
 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.lib import colors
+# reportlab é importado na primeira renderização (import do módulo fica leve)
 
-def generate_traco_pdf(path, ident, inputs, outputs):
-    c = canvas.Canvas(path, pagesize=A4)
+INPUT_KEYS = ["ac","Ca_L","rho_w","Cc_min","rho_c","rho_s_grain","rho_b_menor","rho_b_maior","Cb_total","perc_b_menor","U_areia","I_inch","rho_s_bulk","a_areia","a_brita","U_brita"]
+
+OUTPUT_LABELS = [
+    ("P33","Água (massa alvo) — P33 [kg/m³]"),
+    ("Cc","Cimento — Cc [kg/m³]"),
+    ("Cb_menor","Brita Menor — [kg/m³]"),
+    ("Cb_maior","Brita Maior — [kg/m³]"),
+    ("V_c","Volume do cimento — Vc [m³]"),
+    ("V_w","Volume da água — Vw [m³]"),
+    ("V_g_total","Volume das britas — Vg [m³]"),
+    ("Vm","Volume da areia — Vm [m³]"),
+    ("Cm_seca","Areia (seca) — [kg/m³]"),
+    ("Cm_umida","Areia (úmida) — [kg/m³]"),
+    ("agua_areia_total","Água na areia — [kg/m³]"),
+    ("agua_brita_total","Água na brita — [kg/m³]"),
+    ("agua_absorcao","Água absorvida (areia+brita) — [kg/m³]"),
+    ("agua_moist_total","Água de umidade (areia+brita) — [kg/m³]"),
+    ("agua_adicionar_kg","Água a adicionar — [kg/m³]"),
+    ("V_areia_med_m3","Areia a medir com inchamento — [m³]"),
+    ("V_areia_med_L","Areia a medir com inchamento — [L]"),
+]
+
+def _canvas(path):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    return canvas.Canvas(path, pagesize=A4)
+
+def _draw_traco(c, ident, inputs, outputs):
+    # Uma página do traço no canvas `c` (fontes/recursos são do canvas e
+    # reaproveitados entre páginas do mesmo relatório)
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib import colors
     W, H = A4
     x0, y = 20*mm, H - 20*mm
 
-    def line(txt, dy=6*mm, color=colors.black, size=11, bold=False):
+    def line(txt, dy=6*mm, color=None, size=11, bold=False):
         nonlocal y
-        c.setFillColor(color)
+        c.setFillColor(color or colors.black)
         c.setFont("Helvetica-Bold" if bold else "Helvetica", size)
         c.drawString(x0, y, str(txt))
         y -= dy
@@ -27,7 +57,7 @@ def generate_traco_pdf(path, ident, inputs, outputs):
 
     # Entradas resumidas
     line("Entradas:", bold=True)
-    for k in ["ac","Ca_L","rho_w","Cc_min","rho_c","rho_s_grain","rho_b_menor","rho_b_maior","Cb_total","perc_b_menor","U_areia","I_inch","rho_s_bulk","a_areia","a_brita","U_brita"]:
+    for k in INPUT_KEYS:
         if k in inputs:
             line(f" - {k}: {inputs[k]}")
 
@@ -36,28 +66,117 @@ def generate_traco_pdf(path, ident, inputs, outputs):
 
     # Resultados
     line("Resultados (por 1 m³):", bold=True)
-    keys_order = [
-        ("P33","Água (massa alvo) — P33 [kg/m³]"),
-        ("Cc","Cimento — Cc [kg/m³]"),
-        ("Cb_menor","Brita Menor — [kg/m³]"),
-        ("Cb_maior","Brita Maior — [kg/m³]"),
-        ("V_c","Volume do cimento — Vc [m³]"),
-        ("V_w","Volume da água — Vw [m³]"),
-        ("V_g_total","Volume das britas — Vg [m³]"),
-        ("Vm","Volume da areia — Vm [m³]"),
-        ("Cm_seca","Areia (seca) — [kg/m³]"),
-        ("Cm_umida","Areia (úmida) — [kg/m³]"),
-        ("agua_areia_total","Água na areia — [kg/m³]"),
-        ("agua_brita_total","Água na brita — [kg/m³]"),
-        ("agua_absorcao","Água absorvida (areia+brita) — [kg/m³]"),
-        ("agua_moist_total","Água de umidade (areia+brita) — [kg/m³]"),
-        ("agua_adicionar_kg","Água a adicionar — [kg/m³]"),
-        ("V_areia_med_m3","Areia a medir com inchamento — [m³]"),
-        ("V_areia_med_L","Areia a medir com inchamento — [L]"),
-    ]
-    for key, label in keys_order:
+    for key, label in OUTPUT_LABELS:
         if key in outputs:
             line(f" - {label}: {round(outputs[key],4)}")
 
     c.showPage()
+
+@instrument.traced("generate_traco_pdf")
+def generate_traco_pdf(path, ident, inputs, outputs):
+    # `path` pode ser um caminho ou um buffer (file-like) já aberto
+    c = _canvas(path)
+    _draw_traco(c, ident, inputs, outputs)
+    c.save()
+
+def render_traco_pdf(ident, inputs, outputs) -> bytes:
+    buf = io.BytesIO()
+    generate_traco_pdf(buf, ident, inputs, outputs)
+    return buf.getvalue()
+
+@instrument.traced("generate_traco_report")
+def generate_traco_report(path, designs):
+    # Relatório multipágina: uma página por (ident, inputs, outputs)
+    c = _canvas(path)
+    for ident, inputs, outputs in designs:
+        _draw_traco(c, ident, inputs, outputs)
     c.save()
+
+def render_traco_report(designs) -> bytes:
+    buf = io.BytesIO()
+    generate_traco_report(buf, designs)
+    return buf.getvalue()
+
+def _render_many(designs):
+    return [render_traco_pdf(*d) for d in designs]
+
+def _unique_names(names, n):
+    # Um nome por traço; repetidos ganham sufixo (_2, _3, ...) em vez de se
+    # sobrescreverem dentro do ZIP
+    names = [str(x) for x in names]
+    if len(names) != n:
+        raise ValueError(f"{len(names)} nomes para {n} traços")
+    seen, out = set(), []
+    for name in names:
+        stem, dot, ext = name.rpartition(".") if "." in name else (name, "", "")
+        cand, k = name, 1
+        while cand in seen:
+            k += 1
+            cand = f"{stem}_{k}{dot}{ext}"
+        seen.add(cand)
+        out.append(cand)
+    return out
+
+def render_traco_zip(designs, names=None, workers=None, chunk_size=200) -> bytes:
+    # ZIP com um PDF por traço; `workers` > 1 renderiza blocos em paralelo
+    import zipfile
+    from concurrent.futures import ProcessPoolExecutor
+    designs = list(designs)
+    names = _unique_names(names, len(designs)) if names is not None else [f"traco_{i+1:05d}.pdf" for i in range(len(designs))]
+    chunks = [designs[i:i+chunk_size] for i in range(0, len(designs), chunk_size)]
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            rendered = ex.map(_render_many, chunks)
+            pdfs = [p for chunk in rendered for p in chunk]
+    else:
+        pdfs = [p for chunk in chunks for p in _render_many(chunk)]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, pdf in zip(names, pdfs):
+            zf.writestr(name, pdf)
+    return buf.getvalue()
+
+TICKET_COLUMNS = [
+    ("pedido", "Pedido", 0), ("caminhao", "Cam.", 0), ("betonada", "Bet.", 0), ("traco", "Traço", 0),
+    ("volume_m3", "m³", 3), ("cimento_kg", "Cimento kg", 0), ("brita_menor_kg", "B. menor kg", 0),
+    ("brita_maior_kg", "B. maior kg", 0), ("areia_umida_kg", "Areia kg", 0), ("areia_L", "Areia L", 0),
+    ("agua_kg", "Água kg", 0),
+]
+
+@instrument.traced("generate_ticket_report")
+def generate_ticket_report(path, tickets, title="TICKETS DE BETONADA"):
+    # Tabela de tickets (core.dispatch.plan_dispatch), ~45 betonadas por página
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+    W, H = landscape(A4)
+    c = canvas.Canvas(path, pagesize=(W, H))
+    cols = [(k, label, nd) for k, label, nd in TICKET_COLUMNS if k in tickets.columns]
+    xs = [15*mm + i * (W - 30*mm) / len(cols) for i in range(len(cols))]
+    data = [tickets[k].tolist() for k, _, _ in cols]
+    n = len(tickets)
+    per_page = 45
+    for p0 in range(0, max(n, 1), per_page):
+        y = H - 15*mm
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(15*mm, y, f"{title} — {min(p0 + 1, n)}–{min(p0 + per_page, n)} de {n}")
+        y -= 8*mm
+        c.setFont("Helvetica-Bold", 8)
+        for x, (_, label, _) in zip(xs, cols):
+            c.drawString(x, y, label)
+        y -= 2*mm
+        c.line(15*mm, y, W - 15*mm, y)
+        y -= 4*mm
+        c.setFont("Helvetica", 8)
+        for i in range(p0, min(p0 + per_page, n)):
+            for x, (_, _, nd), vals in zip(xs, cols, data):
+                v = vals[i]
+                c.drawString(x, y, f"{v:.{nd}f}" if isinstance(v, float) else str(v))
+            y -= 4*mm
+        c.showPage()
+    c.save()
+
+def render_ticket_report(tickets, title="TICKETS DE BETONADA") -> bytes:
+    buf = io.BytesIO()
+    generate_ticket_report(buf, tickets, title)
+    return buf.getvalue()
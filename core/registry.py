@@ -0,0 +1,259 @@
+from __future__ import annotations
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional, Tuple
+import numpy as np
+
+from .snapshot import compiled_tables, content_hash
+from . import instrument
+
+# Registro em memória das tabelas ABCP de várias centrais (uma versão do Excel
+# por central, às vezes várias). Chave = (central, hash do conteúdo).
+# - carga em paralelo num pool de threads; pedidos simultâneos da mesma chave
+#   esperam a mesma carga;
+# - rótulos e matrizes iguais entre versões/centrais são o mesmo objeto
+#   (tuplas e arrays somente leitura, contados por referência);
+# - acima de `max_bytes`, sai o conjunto usado há mais tempo.
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _own_size(obj: Any) -> int:
+    # Tamanho de uma entrada do pool sem os filhos que também são entradas
+    # (tuplas/arrays internos já são cobrados à parte); escalares são contados
+    # aqui porque não entram no pool.
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + sys.getsizeof(obj)
+    if isinstance(obj, tuple):
+        return sys.getsizeof(obj) + sum(sys.getsizeof(v) for v in obj
+                                        if not isinstance(v, (tuple, np.ndarray)))
+    return sys.getsizeof(obj)
+
+
+class _InternPool:
+    # Objetos imutáveis compartilhados: chave de conteúdo -> [objeto, refs, bytes]
+
+    def __init__(self):
+        self._items: Dict[Hashable, list] = {}
+        self.bytes = 0
+
+    @staticmethod
+    def _key(obj: Any) -> Hashable:
+        if isinstance(obj, np.ndarray):
+            digest = hashlib.sha1(np.ascontiguousarray(obj).tobytes()).hexdigest()
+            return ("nd", obj.dtype.str, obj.shape, digest)
+        return ("py", _InternPool._norm(obj))
+
+    @staticmethod
+    def _norm(v: Any) -> Hashable:
+        # chave de conteúdo: NaN igual a NaN e 19 diferente de 19.0
+        if isinstance(v, tuple):
+            return tuple(_InternPool._norm(x) for x in v)
+        if isinstance(v, float) and v != v:
+            return ("float", "nan")
+        return (type(v).__name__, v)
+
+    def intern(self, obj: Any, keys: list) -> Any:
+        # Listas viram tuplas (recursivo); `keys` acumula as chaves usadas
+        # para devolver as referências quando o conjunto sair do registro.
+        if isinstance(obj, dict):
+            return {k: self.intern(v, keys) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            obj = tuple(self.intern(v, keys) for v in obj)
+        elif isinstance(obj, np.ndarray):
+            obj = np.array(obj, copy=True)
+            obj.setflags(write=False)
+        else:
+            return obj
+        try:
+            key = self._key(obj)
+            hash(key)
+        except TypeError:
+            return obj
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = [obj, 0, _own_size(obj)]
+            self.bytes += item[2]
+        item[1] += 1
+        keys.append(key)
+        return item[0]
+
+    def release(self, keys: Iterable[Hashable]):
+        for key in keys:
+            item = self._items.get(key)
+            if item is None:
+                continue
+            item[1] -= 1
+            if item[1] <= 0:
+                self.bytes -= item[2]
+                del self._items[key]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class TableSet:
+    # Tabelas de uma versão do Excel de uma central (somente leitura)
+
+    def __init__(self, plant: Hashable, version: str, ca_lookup, abcp_tables, keys: list):
+        self.plant = plant
+        self.version = version
+        self.ca_lookup = ca_lookup
+        self.abcp_tables = abcp_tables
+        self._keys = keys
+        self._grids: Dict[str, Any] = {}
+
+    def ca_grid(self):
+        from .lookup import ca_grid
+        if "ca" not in self._grids:
+            src = self.ca_lookup if self.ca_lookup is not None else self.abcp_tables
+            self._grids["ca"] = ca_grid(src)
+        return self._grids["ca"]
+
+    def vb_grid(self):
+        from .lookup import vb_grid
+        if "vb" not in self._grids:
+            self._grids["vb"] = vb_grid(self.abcp_tables)
+        return self._grids["vb"]
+
+    def __repr__(self):
+        return f"TableSet(plant={self.plant!r}, version={self.version[:12]!r})"
+
+
+class TableRegistry:
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, workers: int = 4):
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.RLock()
+        self._sets: "OrderedDict[Tuple[Hashable, str], TableSet]" = OrderedDict()
+        self._loading: Dict[Tuple[Hashable, str], Future] = {}
+        self._sources: Dict[Hashable, Any] = {}
+        self._versions: Dict[Hashable, Optional[str]] = {}
+        self._pool = _InternPool()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="abcp-tables")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --- fontes ---
+
+    def register(self, plant: Hashable, source: Any):
+        # Excel atual da central (caminho ou bytes); a versão sai do conteúdo.
+        # bytes/arquivos são lidos só aqui; caminhos são conferidos a cada
+        # get() por (mtime, tamanho) e relidos apenas se o arquivo mudou.
+        version = None if isinstance(source, (str, Path)) else content_hash(source)
+        with self._lock:
+            self._sources[plant] = source
+            self._versions[plant] = version
+
+    def plants(self):
+        with self._lock:
+            return list(self._sources)
+
+    # --- carga ---
+
+    def _build(self, plant: Hashable, version: str, source: Any) -> TableSet:
+        with instrument.span("registry.load", plant=str(plant)):
+            compiled = compiled_tables(source)
+        with self._lock:
+            keys: list = []
+            ca = self._pool.intern(compiled["ca_lookup"], keys) if compiled["ca_lookup"] is not None else None
+            t = self._pool.intern(compiled["abcp_tables"], keys) if compiled["abcp_tables"] is not None else None
+            ts = TableSet(plant, version, ca, t, keys)
+            self._sets[(plant, version)] = ts
+            self._loading.pop((plant, version), None)
+            self._evict(keep=(plant, version))
+        return ts
+
+    def _submit(self, plant: Hashable, source: Any, version: Optional[str] = None) -> Future:
+        version = version or content_hash(source)
+        key = (plant, version)
+        with self._lock:
+            ts = self._sets.get(key)
+            if ts is not None:
+                self._sets.move_to_end(key)
+                self.hits += 1
+                instrument.count("registry.hit")
+                done: Future = Future()
+                done.set_result(ts)
+                return done
+            fut = self._loading.get(key)
+            if fut is None:
+                self.misses += 1
+                instrument.count("registry.miss")
+                fut = self._executor.submit(self._build, plant, version, source)
+                self._loading[key] = fut
+                fut.add_done_callback(lambda f, key=key: f.exception() and self._forget(key))
+            return fut
+
+    def _forget(self, key):
+        with self._lock:
+            self._loading.pop(key, None)
+
+    def submit(self, plant: Hashable, source: Optional[Any] = None) -> Future:
+        # Como get(), mas devolve o Future (para esperar sem bloquear, ex.:
+        # asyncio.wrap_future no servidor)
+        if source is not None:
+            return self._submit(plant, source)
+        with self._lock:
+            if plant not in self._sources:
+                raise KeyError(f"Central não registrada: {plant!r}")
+            source, version = self._sources[plant], self._versions[plant]
+        return self._submit(plant, source, version)
+
+    def get(self, plant: Hashable, source: Optional[Any] = None) -> TableSet:
+        # Conjunto da central (fonte dada ou a registrada); carrega se preciso
+        return self.submit(plant, source).result()
+
+    def load_many(self, sources: Mapping[Hashable, Any]) -> Dict[Hashable, TableSet]:
+        # Registra e carrega todas em paralelo; erros sobem para quem chamou
+        for plant, src in sources.items():
+            self.register(plant, src)
+        futures = {plant: self.submit(plant) for plant in sources}
+        return {plant: f.result() for plant, f in futures.items()}
+
+    # --- memória ---
+
+    def _evict(self, keep=None):
+        while self._pool.bytes > self.max_bytes and len(self._sets) > 1:
+            key = next(iter(self._sets))
+            if key == keep:
+                self._sets.move_to_end(key)
+                key = next(iter(self._sets))
+            ts = self._sets.pop(key)
+            self._pool.release(ts._keys)
+            self.evictions += 1
+            instrument.count("registry.evict")
+
+    def discard(self, plant: Hashable, version: Optional[str] = None):
+        with self._lock:
+            for key in [k for k in self._sets if k[0] == plant and (version is None or k[1] == version)]:
+                self._pool.release(self._sets.pop(key)._keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sets": len(self._sets), "shared_objects": len(self._pool),
+                    "bytes": self._pool.bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._sets
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sets)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
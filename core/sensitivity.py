@@ -0,0 +1,182 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional, Sequence
+import numpy as np
+
+from .compute import ABCP_INPUTS, ABCP_OUTPUTS, _batch_columns
+from . import instrument
+
+# Derivadas parciais exatas de todas as saídas de compute_abcp em relação a
+# todas as entradas, numa única passada (modo direto: cada grandeza carrega o
+# seu vetor tangente, uma coluna por entrada).
+#
+# Pontos não suaves (max(Cc_calc, Cc_min), max(Vm, 0), clip de perc_b_menor,
+# max(ac, 1e-9)): longe deles vale o ramo ativo; exatamente neles a derivada
+# não existe e usamos as derivadas laterais. side="right" dá a taxa para um
+# aumento da entrada, side="left" para uma redução; side="both" devolve as
+# duas e marca em `kinks` quais linhas estavam sobre cada limite.
+
+SIDES = ("right", "left", "both")
+
+
+def _dmax(a, da, b, db):
+    # derivada direcional de max(a, b): ramo ativo; empate -> maior tangente
+    a, b = np.broadcast_arrays(a, b)
+    return np.where((a > b)[:, None], da, np.where((a < b)[:, None], db, np.maximum(da, db)))
+
+
+def _dmin(a, da, b, db):
+    a, b = np.broadcast_arrays(a, b)
+    return np.where((a < b)[:, None], da, np.where((a > b)[:, None], db, np.minimum(da, db)))
+
+
+def _col(v):
+    return np.asarray(v)[:, None]
+
+
+def _jacobian_pass(x: Dict[str, np.ndarray], sign: float):
+    # Tangentes na direção sign·e_j para cada entrada j; no fim, J = sign·tangente.
+    # Mesmas expressões (e mesma ordem) de compute_abcp_batch nos valores.
+    n = len(x["ac"])
+    eye = sign * np.eye(len(ABCP_INPUTS))
+    d = {k: eye[j][None, :] for j, k in enumerate(ABCP_INPUTS)}
+    zero = np.zeros((1, len(ABCP_INPUTS)))
+    v: Dict[str, np.ndarray] = {}
+    t: Dict[str, np.ndarray] = {}
+
+    rho_w = x["rho_w"]
+    P33 = x["Ca_L"] * (rho_w / 1000.0)
+    dP33 = d["Ca_L"] * _col(rho_w / 1000.0) + _col(x["Ca_L"] / 1000.0) * d["rho_w"]
+
+    ac_g = np.maximum(x["ac"], 1e-9)
+    dac_g = _dmax(x["ac"], d["ac"], 1e-9, zero)
+    Cc_calc = P33 / ac_g
+    dCc_calc = dP33 / _col(ac_g) - _col(P33 / ac_g**2) * dac_g
+    Cc = np.maximum(Cc_calc, x["Cc_min"])
+    dCc = _dmax(Cc_calc, dCc_calc, x["Cc_min"], d["Cc_min"])
+
+    u = x["perc_b_menor"] / 100.0
+    frac_lo = np.maximum(u, 0)
+    dfrac_lo = _dmax(u, d["perc_b_menor"] / 100.0, 0.0, zero)
+    frac = np.minimum(frac_lo, 1)
+    dfrac = _dmin(frac_lo, dfrac_lo, 1.0, zero)
+    Cb_total = x["Cb_total"]
+    Cb_menor = Cb_total * frac
+    dCb_menor = d["Cb_total"] * _col(frac) + _col(Cb_total) * dfrac
+    Cb_maior = Cb_total * (1.0 - frac)
+    dCb_maior = d["Cb_total"] * _col(1.0 - frac) - _col(Cb_total) * dfrac
+
+    def quot(a, da, b, db):
+        # d(a/b)
+        return da / _col(b) - _col(a / b**2) * db
+
+    V_c = Cc / x["rho_c"]
+    dV_c = quot(Cc, dCc, x["rho_c"], d["rho_c"])
+    V_w = P33 / rho_w
+    dV_w = quot(P33, dP33, rho_w, d["rho_w"])
+    V_g_total = Cb_menor / x["rho_b_menor"] + Cb_maior / x["rho_b_maior"]
+    dV_g_total = (quot(Cb_menor, dCb_menor, x["rho_b_menor"], d["rho_b_menor"])
+                  + quot(Cb_maior, dCb_maior, x["rho_b_maior"], d["rho_b_maior"]))
+    Vm_raw = 1.0 - (V_c + V_w + V_g_total)
+    dVm_raw = -(dV_c + dV_w + dV_g_total)
+    Vm = np.maximum(Vm_raw, 0.0)
+    dVm = _dmax(Vm_raw, dVm_raw, 0.0, zero)
+
+    rs = x["rho_s_grain"]
+    Cm_seca = Vm * rs
+    dCm_seca = dVm * _col(rs) + _col(Vm) * d["rho_s_grain"]
+    fu = 1.0 + x["U_areia"] / 100.0
+    Cm_umida = Cm_seca * fu
+    dCm_umida = dCm_seca * _col(fu) + _col(Cm_seca / 100.0) * d["U_areia"]
+    agua_areia_total = Cm_umida - Cm_seca
+    dagua_areia = dCm_umida - dCm_seca
+    agua_brita_total = Cb_total * (x["U_brita"] / 100.0)
+    dagua_brita = d["Cb_total"] * _col(x["U_brita"] / 100.0) + _col(Cb_total / 100.0) * d["U_brita"]
+    agua_absorcao = (x["a_areia"] / 100.0) * Cm_seca + (x["a_brita"] / 100.0) * Cb_total
+    dagua_abs = (d["a_areia"] * _col(Cm_seca / 100.0) + _col(x["a_areia"] / 100.0) * dCm_seca
+                 + d["a_brita"] * _col(Cb_total / 100.0) + _col(x["a_brita"] / 100.0) * d["Cb_total"])
+    agua_moist_total = agua_areia_total + agua_brita_total
+    dagua_moist = dagua_areia + dagua_brita
+    agua_adicionar_kg = P33 + agua_absorcao - agua_moist_total
+    dagua_add = dP33 + dagua_abs - dagua_moist
+
+    rsb = x["rho_s_bulk"]
+    fi = 1.0 + x["I_inch"] / 100.0
+    V_areia_med_m3 = (Cm_seca / rsb) * fi
+    dV_med = quot(Cm_seca, dCm_seca, rsb, d["rho_s_bulk"]) * _col(fi) + _col(Cm_seca / rsb / 100.0) * d["I_inch"]
+    V_areia_med_L = V_areia_med_m3 * 1000.0
+    dV_med_L = dV_med * 1000.0
+
+    v.update(P33=P33, Cc=Cc, Cb_menor=Cb_menor, Cb_maior=Cb_maior, V_c=V_c, V_w=V_w,
+             V_g_total=V_g_total, Vm=Vm, Cm_seca=Cm_seca, Cm_umida=Cm_umida,
+             agua_areia_total=agua_areia_total, agua_brita_total=agua_brita_total,
+             agua_absorcao=agua_absorcao, agua_moist_total=agua_moist_total,
+             agua_adicionar_kg=agua_adicionar_kg, V_areia_med_m3=V_areia_med_m3,
+             V_areia_med_L=V_areia_med_L)
+    t.update(P33=dP33, Cc=dCc, Cb_menor=dCb_menor, Cb_maior=dCb_maior, V_c=dV_c, V_w=dV_w,
+             V_g_total=dV_g_total, Vm=dVm, Cm_seca=dCm_seca, Cm_umida=dCm_umida,
+             agua_areia_total=dagua_areia, agua_brita_total=dagua_brita,
+             agua_absorcao=dagua_abs, agua_moist_total=dagua_moist,
+             agua_adicionar_kg=dagua_add, V_areia_med_m3=dV_med, V_areia_med_L=dV_med_L)
+
+    J = np.empty((n, len(ABCP_OUTPUTS), len(ABCP_INPUTS)))
+    for i, k in enumerate(ABCP_OUTPUTS):
+        J[:, i, :] = sign * np.broadcast_to(t[k], (n, len(ABCP_INPUTS))) + 0.0   # sem -0.0
+    kinks = {
+        "Cc_min": Cc_calc == x["Cc_min"],
+        "Vm_zero": Vm_raw == 0.0,
+        "perc_clip": (u == 0.0) | (u == 1.0),
+        "ac_floor": x["ac"] == 1e-9,
+    }
+    return v, J, kinks
+
+
+@instrument.traced("compute_abcp_jacobian")
+def compute_abcp_jacobian(data=None, side: str = "right", chunk_size: int = 100_000, **kwargs) -> Dict[str, Any]:
+    # Valores + jacobiano de compute_abcp para um traço ou um lote (mesmas
+    # entradas de compute_abcp_batch). Retorna um dict com
+    #   "values":   {saída: array (n,)}
+    #   "jacobian": array (n, 17, 16) com J[:, i, j] = d saída_i / d entrada_j
+    #               (side="both": "jacobian_right" e "jacobian_left")
+    #   "kinks":    {limite: array bool (n,)} linhas exatamente sobre o limite
+    #   "outputs" / "inputs": rótulos dos eixos
+    if side not in SIDES:
+        raise ValueError(f"side deve ser um de {SIDES}")
+    x = _batch_columns(data, kwargs)
+    n = len(x["ac"])
+    signs = {"right": (1.0,), "left": (-1.0,), "both": (1.0, -1.0)}[side]
+    values = {k: np.empty(n) for k in ABCP_OUTPUTS}
+    jac = {s: np.empty((n, len(ABCP_OUTPUTS), len(ABCP_INPUTS))) for s in signs}
+    kinks: Dict[str, np.ndarray] = {}
+    for start in range(0, max(n, 1), chunk_size):
+        sl = slice(start, min(start + chunk_size, n))
+        xc = {k: a[sl] for k, a in x.items()}
+        for s in signs:
+            v, J, kc = _jacobian_pass(xc, s)
+            jac[s][sl] = J
+        for k in ABCP_OUTPUTS:
+            values[k][sl] = v[k]
+        for k, m in kc.items():
+            kinks.setdefault(k, np.zeros(n, dtype=bool))[sl] = m
+    out: Dict[str, Any] = {"values": values, "kinks": kinks,
+                           "outputs": ABCP_OUTPUTS, "inputs": ABCP_INPUTS}
+    if side == "both":
+        out["jacobian_right"], out["jacobian_left"] = jac[1.0], jac[-1.0]
+    else:
+        out["jacobian"] = jac[signs[0]]
+    return out
+
+
+def sensitivity_table(
+    J: np.ndarray,
+    outputs: Sequence[str] = ABCP_OUTPUTS,
+    inputs: Sequence[str] = ABCP_INPUTS,
+    row: Optional[int] = 0,
+):
+    # Jacobiano de um traço como DataFrame (linhas = saídas, colunas = entradas).
+    # Ex.: sensitivity_table(res["jacobian"]).loc["agua_adicionar_kg", "U_areia"]
+    # = variação da água a adicionar (kg/m³) por 1 % de umidade da areia.
+    import pandas as pd
+    M = J[row] if J.ndim == 3 else J
+    out_idx = [ABCP_OUTPUTS.index(k) for k in outputs]
+    in_idx = [ABCP_INPUTS.index(k) for k in inputs]
+    return pd.DataFrame(M[np.ix_(out_idx, in_idx)], index=list(outputs), columns=list(inputs))
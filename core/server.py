@@ -0,0 +1,474 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import base64
+import json
+import math
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .compute import compute_abcp, compute_abcp_batch, ABCP_INPUTS, ABCP_DEFAULTS, ABCP_OUTPUTS
+from . import instrument
+
+# Serviço HTTP/JSON local (só biblioteca padrão) para ERP e software de central.
+#   python -m core.server --excel data/04_Dosagem_Concreto_ABCP_sem-leg.xlsx --port 8765
+#   python -m core.server --excel norte=norte.xlsx --excel sul=sul.xlsx --workers 4
+#
+# POST /compute            {"ac": 0.45, "Ca_L": 200, ...}            -> saídas
+# POST /compute/batch      {"mixes": [{...}, ...]} ou {"columns": {...}} -> {"outputs": [...]}
+# POST /tables/limits      {"tipo": "CA", "classe": "II"}             (Tabela 1)
+# POST /tables/ca          {"dmax": 19, "slump": "60-80"}             (Tabela 2)
+# POST /tables/vb          {"mf": 2.4, "dmax": 19}                    (Tabela 3)
+# POST /tables/sd          {"cond": "A"}                              (Tabela 4)
+#                          (todas aceitam {"items": [...]} para lote e ?plant=)
+# POST /pdf                {"ident": {...}, "inputs": {...}}          -> application/pdf
+# POST /pdf/batch          {"designs": [...], "format": "zip"|"report"}
+# GET  /health, GET /stats
+#
+# Trabalho pesado (PDF, lotes acima de --offload-rows) vai para um pool de
+# processos; no máximo --max-inflight tarefas em execução e --max-queue
+# esperando. Acima disso a resposta é 503 com Retry-After (pressão de volta).
+
+MAX_BODY = 32 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error",
+           501: "Not Implemented", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _clean(v):
+    # NaN/inf não existem em JSON
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    return v
+
+
+def _columns_to_rows(out) -> List[Dict[str, Any]]:
+    cols = {k: [_clean(x) for x in out[k].tolist()] for k in ABCP_OUTPUTS}
+    return [dict(zip(ABCP_OUTPUTS, vals)) for vals in zip(*(cols[k] for k in ABCP_OUTPUTS))]
+
+
+def _mix_columns(body: Dict[str, Any]) -> Dict[str, List[float]]:
+    if "columns" in body:
+        if not isinstance(body["columns"], dict):
+            raise HTTPError(400, "'columns' deve ser um objeto JSON {entrada: lista de valores}")
+        return body["columns"]
+    mixes = body.get("mixes")
+    if not isinstance(mixes, list):
+        raise HTTPError(400, "Informe 'mixes' (lista de traços) ou 'columns'")
+    cols: Dict[str, List[float]] = {}
+    for k in ABCP_INPUTS:
+        default = ABCP_DEFAULTS.get(k)
+        try:
+            cols[k] = [m[k] if k in m else default for m in mixes]
+        except TypeError:
+            raise HTTPError(400, "Cada traço deve ser um objeto JSON")
+        if any(v is None for v in cols[k]):
+            raise HTTPError(422, f"Entradas ausentes: {k}")
+    return cols
+
+
+def _design(d: Any) -> Tuple[dict, dict, Optional[dict]]:
+    # (ident, inputs, outputs) de um traço do corpo de /pdf e /pdf/batch
+    if not isinstance(d, dict) or not isinstance(d.get("inputs"), dict):
+        raise HTTPError(400, "Informe 'inputs' (e opcionalmente 'ident' e 'outputs')")
+    ident, outputs = d.get("ident") or {}, d.get("outputs")
+    if not isinstance(ident, dict) or not (outputs is None or isinstance(outputs, dict)):
+        raise HTTPError(400, "'ident' e 'outputs' devem ser objetos JSON")
+    return ident, d["inputs"], outputs
+
+
+# --- tarefas do pool (nível de módulo para serem serializáveis) ---
+
+def _batch_job(cols: Dict[str, List[float]]) -> List[Dict[str, Any]]:
+    return _columns_to_rows(compute_abcp_batch(cols, as_frame=False))
+
+
+def _pdf_job(ident: Dict[str, Any], inputs: Dict[str, Any], outputs: Optional[Dict[str, Any]]) -> bytes:
+    from .pdf_utils import render_traco_pdf
+    return render_traco_pdf(ident, inputs, outputs or compute_abcp(**inputs))
+
+
+def _pdf_batch_job(designs: List[Tuple[dict, dict, Optional[dict]]], fmt: str) -> bytes:
+    from .pdf_utils import render_traco_report, render_traco_zip
+    full = [(i, x, o or compute_abcp(**x)) for i, x, o in designs]
+    return render_traco_report(full) if fmt == "report" else render_traco_zip(full)
+
+
+class ComputeService:
+
+    def __init__(self, excel: Optional[Dict[str, str]] = None, workers: int = 2,
+                 max_inflight: int = 64, max_queue: int = 256, offload_rows: int = 5_000,
+                 max_body: int = MAX_BODY):
+        self.excel = dict(excel or {})
+        self.workers = max(int(workers), 0)
+        self.offload_rows = int(offload_rows)
+        self.max_inflight = int(max_inflight)
+        self.max_queue = int(max_queue)
+        self.max_body = int(max_body)
+        self.registry = None
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.requests = 0
+        self.rejected = 0
+        self.started = time.time()
+        self.routes: Dict[Tuple[str, str], Callable] = {
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+            ("POST", "/compute"): self.compute,
+            ("POST", "/compute/batch"): self.compute_batch,
+            ("POST", "/tables/limits"): self.table_limits,
+            ("POST", "/tables/ca"): self.table_ca,
+            ("POST", "/tables/vb"): self.table_vb,
+            ("POST", "/tables/sd"): self.table_sd,
+            ("POST", "/pdf"): self.pdf,
+            ("POST", "/pdf/batch"): self.pdf_batch,
+        }
+
+    # --- ciclo de vida ---
+
+    def warm(self):
+        # Tabelas carregadas antes de aceitar conexões (e mantidas em memória)
+        if self.excel:
+            from .registry import TableRegistry
+            self.registry = TableRegistry(workers=min(len(self.excel), 4))
+            self.registry.load_many(self.excel)
+        if self.workers > 0:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            # sobe os processos agora, não na primeira requisição
+            list(self.pool.map(abs, range(self.workers)))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.registry is not None:
+            self.registry.close()
+
+    async def offload(self, fn, *args):
+        # Executa no pool com limite de concorrência; fila cheia -> 503
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_inflight)
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            instrument.count("server.rejected")
+            raise HTTPError(503, "Servidor ocupado, tente novamente")
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if self.pool is None:
+                return await loop.run_in_executor(None, fn, *args)
+            return await loop.run_in_executor(self.pool, fn, *args)
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    # --- handlers ---
+
+    async def health(self, body, query):
+        return {"status": "ok", "plants": list(self.excel), "uptime_s": round(time.time() - self.started, 1)}
+
+    async def stats(self, body, query):
+        out = {"requests": self.requests, "rejected": self.rejected, "running": self.running,
+               "waiting": self.waiting, "max_inflight": self.max_inflight, "max_queue": self.max_queue}
+        if self.registry is not None:
+            out["tables"] = self.registry.stats()
+        return out
+
+    async def compute(self, body, query):
+        inputs = body.get("inputs", body)
+        try:
+            out = compute_abcp(**{k: inputs[k] for k in ABCP_INPUTS if k in inputs})
+        except TypeError as e:
+            raise HTTPError(422, str(e))
+        return {k: _clean(v) for k, v in out.items()}
+
+    async def compute_batch(self, body, query):
+        cols = _mix_columns(body)
+        n = max((len(v) for v in cols.values() if isinstance(v, list)), default=1)
+        try:
+            if n <= self.offload_rows:
+                rows = _batch_job(cols)           # lote pequeno: NumPy no próprio laço
+            else:
+                rows = await self.offload(_batch_job, cols)
+        except (KeyError, ValueError, TypeError) as e:
+            raise HTTPError(422, str(e.args[0] if e.args else e))
+        return {"n": len(rows), "outputs": rows}
+
+    async def _tables(self, query) -> Dict[str, Any]:
+        if self.registry is None:
+            raise HTTPError(404, "Servidor sem Excel de tabelas (--excel)")
+        plant = query.get("plant", [None])[0] or next(iter(self.excel))
+        try:
+            # Excel alterado/removido do registro recarrega no pool de threads
+            # do registro; o laço de eventos segue atendendo as outras conexões
+            ts = await asyncio.wrap_future(self.registry.submit(plant))
+        except KeyError:
+            raise HTTPError(404, f"Central desconhecida: {plant}")
+        if ts.abcp_tables is None:
+            raise HTTPError(404, f"Tabelas ABCP não encontradas no Excel de {plant}")
+        return ts.abcp_tables
+
+    async def _lookup(self, body, query, fn, fields):
+        tables = await self._tables(query)
+
+        def one(item):
+            try:
+                args = [item[f] for f in fields]
+            except (KeyError, TypeError):
+                raise HTTPError(422, f"Campos obrigatórios: {', '.join(fields)}")
+            try:
+                return _clean(fn(tables, *args))
+            except (KeyError, ValueError, IndexError):
+                return None
+        if "items" in body:
+            return {"results": [one(it) for it in body["items"]]}
+        return {"result": one(body)}
+
+    async def table_limits(self, body, query):
+        from .abcp_tables import lookup_limits_from_tabela1
+        return await self._lookup(body, query, lookup_limits_from_tabela1, ("tipo", "classe"))
+
+    async def table_ca(self, body, query):
+        from .abcp_tables import lookup_ca_from_tables
+        return await self._lookup(body, query, lookup_ca_from_tables, ("dmax", "slump"))
+
+    async def table_vb(self, body, query):
+        from .abcp_tables import lookup_vb_from_tables
+        return await self._lookup(body, query, lookup_vb_from_tables, ("mf", "dmax"))
+
+    async def table_sd(self, body, query):
+        from .abcp_tables import lookup_sd_from_tabela4
+        return await self._lookup(body, query, lookup_sd_from_tabela4, ("cond",))
+
+    async def pdf(self, body, query):
+        ident, inputs, outputs = _design(body)
+        data = await self._render(_pdf_job, ident, inputs, outputs)
+        if query.get("format", [""])[0] == "base64":
+            return {"pdf_base64": base64.b64encode(data).decode("ascii")}
+        return ("application/pdf", data)
+
+    async def pdf_batch(self, body, query):
+        designs = body.get("designs")
+        if not isinstance(designs, list) or not designs:
+            raise HTTPError(400, "Informe 'designs': [{ident, inputs[, outputs]}, ...]")
+        fmt = body.get("format", "zip")
+        if fmt not in ("zip", "report"):
+            raise HTTPError(400, "'format' deve ser 'zip' ou 'report'")
+        jobs = []
+        for i, d in enumerate(designs):
+            try:
+                jobs.append(_design(d))
+            except HTTPError as e:
+                raise HTTPError(e.status, f"designs[{i}]: {e}")
+        data = await self._render(_pdf_batch_job, jobs, fmt)
+        return ("application/pdf" if fmt == "report" else "application/zip", data)
+
+    async def _render(self, fn, *args):
+        # entradas faltando/inválidas só aparecem no cálculo, já no pool
+        try:
+            return await self.offload(fn, *args)
+        except (KeyError, ValueError, TypeError) as e:
+            raise HTTPError(422, str(e.args[0] if e.args else e))
+
+    # --- HTTP ---
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 413, {"error": "Cabeçalho grande demais"}, keep=False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._send(writer, 400, {"error": "Requisição inválida"}, keep=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                keep = (headers.get("connection", "").lower() != "close") and version == "HTTP/1.1"
+                try:
+                    raw = await self._read_body(reader, headers)
+                except HTTPError as e:
+                    # o resto do corpo não foi lido: a conexão não tem como continuar
+                    await self._send(writer, e.status, {"error": str(e)}, keep=False)
+                    break
+                status, payload = await self.dispatch(method, target, raw)
+                await self._send(writer, status, payload, keep)
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass             # cliente desconectou no meio do corpo ou da resposta
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        te = headers.get("transfer-encoding", "").lower()
+        if te:
+            if te != "chunked":
+                raise HTTPError(501, f"Transfer-Encoding não suportado: {te}")
+            if "content-length" in headers:
+                raise HTTPError(400, "Content-Length e Transfer-Encoding juntos")
+            return await self._read_chunked(reader)
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(400, "Content-Length inválido")
+        if length > self.max_body:
+            raise HTTPError(413, "Corpo grande demais")
+        return await reader.readexactly(length) if length else b""
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        # <tamanho hex>[;extensões]\r\n<dados>\r\n ... 0\r\n[trailers]\r\n
+        parts: List[bytes] = []
+        total = 0
+        try:
+            while True:
+                line = await reader.readuntil(b"\r\n")
+                try:
+                    size = int(line.split(b";", 1)[0].strip(), 16)
+                except ValueError:
+                    raise HTTPError(400, "Tamanho de bloco inválido")
+                if size < 0:
+                    raise HTTPError(400, "Tamanho de bloco inválido")
+                if size == 0:
+                    while await reader.readuntil(b"\r\n") != b"\r\n":
+                        pass     # trailers ignorados
+                    return b"".join(parts)
+                total += size
+                if total > self.max_body:
+                    raise HTTPError(413, "Corpo grande demais")
+                chunk = await reader.readexactly(size + 2)
+                if chunk[-2:] != b"\r\n":
+                    raise HTTPError(400, "Bloco sem CRLF final")
+                parts.append(chunk[:-2])
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "Linha de bloco grande demais")
+
+    async def dispatch(self, method: str, target: str, raw: bytes):
+        self.requests += 1
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            known = any(p == url.path for _, p in self.routes)
+            return (405 if known else 404), {"error": f"{method} {url.path} não disponível"}
+        try:
+            body = json.loads(raw) if raw else {}
+            if not isinstance(body, dict):
+                raise HTTPError(400, "O corpo deve ser um objeto JSON")
+            with instrument.span("server" + url.path):
+                return 200, await handler(body, parse_qs(url.query))
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"JSON inválido: {e}"}
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload, keep: bool):
+        if isinstance(payload, tuple):
+            ctype, data = payload
+        else:
+            ctype, data = "application/json", json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                f"Content-Type: {ctype}", f"Content-Length: {len(data)}",
+                f"Connection: {'keep-alive' if keep else 'close'}"]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        # espera o cliente ler: um cliente lento não acumula respostas na memória
+        await writer.drain()
+
+
+async def serve(service: ComputeService, host: str = "127.0.0.1", port: int = 8765,
+                ready: Optional[Callable[[int], None]] = None):
+    server = await asyncio.start_server(service.handle, host, port, limit=64 * 1024,
+                                        backlog=max(service.max_queue, 128))
+    port = server.sockets[0].getsockname()[1]
+    if ready is not None:
+        ready(port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    async with server:
+        await stop.wait()
+
+
+def _parse_excel(values: List[str]) -> Dict[str, str]:
+    # "caminho" ou "central=caminho"
+    from pathlib import Path
+    out: Dict[str, str] = {}
+    for v in values or []:
+        plant, sep, path = v.partition("=")
+        if sep:
+            out[plant] = path
+        else:
+            out["default" if not out else Path(v).stem] = v
+    return out
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m core.server",
+                                description="Serviço HTTP/JSON local para os cálculos ABCP.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765, help="0 = porta livre qualquer")
+    p.add_argument("--excel", action="append", default=[],
+                   help="Excel com as tabelas ('caminho' ou 'central=caminho'; pode repetir)")
+    p.add_argument("--workers", type=int, default=2, help="processos para PDF e lotes grandes (0 = threads)")
+    p.add_argument("--max-inflight", type=int, default=64, help="tarefas pesadas simultâneas")
+    p.add_argument("--max-queue", type=int, default=256, help="tarefas pesadas aguardando antes de 503")
+    p.add_argument("--offload-rows", type=int, default=5_000, help="lotes acima disso vão para o pool")
+    return p
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    service = ComputeService(_parse_excel(args.excel), workers=args.workers,
+                             max_inflight=args.max_inflight, max_queue=args.max_queue,
+                             offload_rows=args.offload_rows)
+    service.warm()
+
+    def ready(port):
+        print(f"ABCP em http://{args.host}:{port}", file=sys.stderr, flush=True)
+    try:
+        asyncio.run(serve(service, args.host, args.port, ready))
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
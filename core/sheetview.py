@@ -0,0 +1,345 @@
+from __future__ import annotations
+import io
+import posixpath
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+
+from .cache import LRUCache
+from . import instrument
+
+# Visualizador paginado de planilhas grandes (aba "Tabelas").
+# Na primeira consulta de uma aba, o XML dela é descompactado uma vez para um
+# arquivo temporário e varrido em blocos, guardando o deslocamento (byte) de
+# uma linha a cada `stride`. Uma página (linhas x colunas) é lida com seek no
+# ponto de controle anterior e análise de no máximo `stride` + n linhas de XML,
+# então o custo por página não depende do tamanho da aba. Páginas recentes
+# ficam num LRU.
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_ROW_RE = re.compile(rb"<(?:\w+:)?row\b([^>]*)>")
+_R_ATTR = re.compile(rb'\br="(\d+)"')
+_CELL_COL = re.compile(rb'<(?:\w+:)?c\b[^>]*?\br="([A-Z]+)\d+"')
+_END_RE = re.compile(rb"</(?:\w+:)?sheetData>")
+_NSDECL = re.compile(rb'xmlns(?::\w+)?="[^"]*"')
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+
+_BLOCK = 1 << 20
+
+
+def col_letter(idx: int) -> str:
+    # 1 -> A, 27 -> AA
+    s = ""
+    while idx > 0:
+        idx, r = divmod(idx - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def col_index(letters: Union[str, bytes]) -> int:
+    if isinstance(letters, bytes):
+        letters = letters.decode()
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def _root_nsdecl(buf: bytes) -> Optional[bytes]:
+    # declarações xmlns do elemento raiz (para analisar trechos soltos de <row>)
+    m = re.search(rb"<(?![?!])[^>]*>", buf)
+    return b" ".join(dict.fromkeys(_NSDECL.findall(m.group(0)))) if m else None
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class _SheetIndex:
+    # Pontos de controle (nº da linha, byte) de uma aba descompactada
+
+    def __init__(self, path: Path, rows: np.ndarray, offsets: np.ndarray, nsdecl: bytes,
+                 max_row: int, max_col: int, end: int):
+        self.path, self.rows, self.offsets = path, rows, offsets
+        self.nsdecl, self.max_row, self.max_col, self.end = nsdecl, max_row, max_col, end
+
+
+class SheetViewer:
+
+    def __init__(self, source: Union[str, bytes, Path, Any], stride: int = 256,
+                 page_cache: int = 64, workdir: Optional[Union[str, Path]] = None):
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        elif hasattr(source, "getvalue"):
+            source = io.BytesIO(source.getvalue())
+        self._zip = zipfile.ZipFile(source)
+        self._zip_lock = threading.Lock()
+        self.stride = int(stride)
+        self._dir = Path(tempfile.mkdtemp(prefix="abcp-sheets-", dir=workdir))
+        self._indexes: Dict[str, _SheetIndex] = {}
+        self._index_lock = threading.Lock()
+        self.pages = LRUCache(maxsize=page_cache)
+        self._sheet_paths = self._read_workbook()
+        self._strings: Optional[List[str]] = None
+        self._date_styles: Optional[np.ndarray] = None
+
+    # --- metadados do pacote ---
+
+    def _read(self, name: str) -> bytes:
+        with self._zip_lock:
+            return self._zip.read(name)
+
+    def _read_workbook(self) -> Dict[str, str]:
+        wb = ET.fromstring(self._read("xl/workbook.xml"))
+        rels = ET.fromstring(self._read("xl/_rels/workbook.xml.rels"))
+        targets = {r.get("Id"): r.get("Target") for r in rels.iter(f"{{{_NS_PKG}}}Relationship")}
+        out = {}
+        for sh in wb.iter(f"{{{_NS_MAIN}}}sheet"):
+            target = targets.get(sh.get(f"{{{_NS_REL}}}id"), "")
+            path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            out[sh.get("name")] = path
+        return out
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self._sheet_paths)
+
+    def _shared_strings(self) -> List[str]:
+        if self._strings is None:
+            strings: List[str] = []
+            try:
+                data = self._read("xl/sharedStrings.xml")
+            except KeyError:
+                data = None
+            if data:
+                for _, el in ET.iterparse(io.BytesIO(data)):
+                    if _local(el.tag) == "si":
+                        strings.append("".join(t.text or "" for t in el.iter() if _local(t.tag) == "t"))
+                        el.clear()
+            self._strings = strings
+        return self._strings
+
+    def _date_style_mask(self) -> np.ndarray:
+        # estilo (atributo s) -> formato de data?
+        if self._date_styles is None:
+            from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+            mask: List[bool] = []
+            try:
+                st = ET.fromstring(self._read("xl/styles.xml"))
+                custom = {int(n.get("numFmtId")): n.get("formatCode")
+                          for n in st.iter(f"{{{_NS_MAIN}}}numFmt")}
+                xfs = st.find(f"{{{_NS_MAIN}}}cellXfs")
+                for xf in (xfs if xfs is not None else []):
+                    fid = int(xf.get("numFmtId", 0))
+                    fmt = custom.get(fid, BUILTIN_FORMATS.get(fid))
+                    mask.append(bool(fmt) and is_date_format(fmt))
+            except KeyError:
+                pass
+            self._date_styles = np.array(mask, dtype=bool)
+        return self._date_styles
+
+    # --- índice ---
+
+    def _index(self, sheet: str) -> _SheetIndex:
+        with self._index_lock:
+            idx = self._indexes.get(sheet)
+            if idx is None:
+                with instrument.span("sheetview.index", sheet=sheet):
+                    idx = self._indexes[sheet] = self._build_index(sheet)
+            return idx
+
+    def _build_index(self, sheet: str) -> _SheetIndex:
+        if sheet not in self._sheet_paths:
+            raise KeyError(f"Aba inexistente: {sheet!r}")
+        out_path = self._dir / f"{len(self._indexes)}.xml"
+        rows: List[int] = []
+        offsets: List[int] = []
+        nsdecl: Optional[bytes] = None
+        max_row = max_col = 0
+        seen = 0
+        pos = 0          # deslocamento de `buf` no arquivo descompactado
+        buf = b""
+        end = -1
+        last_row = 0
+        with self._zip_lock:
+            src = self._zip.open(self._sheet_paths[sheet])
+            try:
+                with open(out_path, "wb") as out:
+                    while True:
+                        chunk = src.read(_BLOCK)
+                        out.write(chunk)
+                        buf += chunk
+                        if nsdecl is None:
+                            nsdecl = _root_nsdecl(buf)
+                        # processa até a última tag de linha completa do bloco
+                        cut = len(buf) if not chunk else max(buf.rfind(b"<"), 0)
+                        for m in _ROW_RE.finditer(buf, 0, cut):
+                            if m.end() > cut:
+                                break
+                            r = _R_ATTR.search(m.group(1))
+                            last_row = int(r.group(1)) if r else last_row + 1
+                            if seen % self.stride == 0:
+                                rows.append(last_row)
+                                offsets.append(pos + m.start())
+                            seen += 1
+                            max_row = max(max_row, last_row)
+                        # a última coluna sai das células: <dimension> pode estar
+                        # desatualizado (ou ausente) em arquivos de outros programas
+                        for m in _CELL_COL.finditer(buf, 0, cut):
+                            max_col = max(max_col, col_index(m.group(1)))
+                        e = _END_RE.search(buf, 0, cut)
+                        if e is not None:
+                            end = pos + e.start()
+                        if not chunk:
+                            break
+                        pos += cut
+                        buf = buf[cut:]
+            finally:
+                src.close()
+        instrument.count("sheetview.rows_indexed", seen)
+        if end < 0:
+            end = out_path.stat().st_size
+        return _SheetIndex(out_path, np.array(rows, dtype=np.int64), np.array(offsets, dtype=np.int64),
+                           nsdecl or b"", max_row, max_col, end)
+
+    def dimensions(self, sheet: str) -> Tuple[int, int]:
+        # (última linha, última coluna) com conteúdo
+        idx = self._index(sheet)
+        return idx.max_row, idx.max_col
+
+    # --- páginas ---
+
+    def _cell_value(self, c: ET.Element):
+        t = c.get("t", "n")
+        if t == "inlineStr":
+            return "".join(x.text or "" for x in c.iter() if _local(x.tag) == "t")
+        v = None
+        for ch in c:
+            if _local(ch.tag) == "v":
+                v = ch.text
+                break
+        if v is None:
+            return None
+        if t == "s":
+            strings = self._shared_strings()
+            i = int(v)
+            return strings[i] if i < len(strings) else None
+        if t == "b":
+            return v == "1"
+        if t in ("str", "e"):
+            return v
+        if t == "d":
+            # data ISO 8601 (gravada assim por alguns programas)
+            from openpyxl.utils.datetime import from_ISO8601
+            try:
+                return from_ISO8601(v)
+            except ValueError:
+                return v
+        try:
+            num = float(v)
+        except ValueError:
+            return v
+        s = c.get("s")
+        if s is not None:
+            mask = self._date_style_mask()
+            si = int(s)
+            if si < len(mask) and mask[si]:
+                from openpyxl.utils.datetime import from_excel
+                return from_excel(num)
+        return int(num) if num.is_integer() and "." not in v and "E" not in v.upper() else num
+
+    def _read_rows(self, idx: _SheetIndex, row0: int, row1: int, col0: int, col1: int) -> Dict[int, Dict[int, Any]]:
+        # linhas row0..row1-1, colunas col0..col1-1 -> {linha: {coluna: valor}}
+        if len(idx.offsets) == 0:
+            return {}
+        k = max(int(np.searchsorted(idx.rows, row0, side="right")) - 1, 0)
+        start = int(idx.offsets[k])
+        row_no = int(idx.rows[k]) - 1
+        found: Dict[int, Dict[int, Any]] = {}
+        with open(idx.path, "rb") as f:
+            f.seek(start)
+            buf = b""
+            pos = start
+            stop = None
+            while stop is None:
+                chunk = f.read(min(_BLOCK, max(idx.end - pos - len(buf), 0)))
+                buf += chunk
+                # acha a primeira linha >= row1 (ou o fim da sheetData)
+                rn = row_no
+                for m in _ROW_RE.finditer(buf):
+                    r = _R_ATTR.search(m.group(1))
+                    rn = int(r.group(1)) if r else rn + 1
+                    if rn >= row1:
+                        stop = m.start()
+                        break
+                if stop is None and not chunk:
+                    stop = len(buf)
+        frag = b"<wrap " + idx.nsdecl + b">" + buf[:stop] + b"</wrap>"
+        root = ET.fromstring(frag)
+        for row in root:
+            if _local(row.tag) != "row":
+                continue
+            r = row.get("r")
+            row_no = int(r) if r else row_no + 1
+            if row_no < row0:
+                continue
+            if row_no >= row1:
+                break
+            cells: Dict[int, Any] = {}
+            col_no = 0
+            for c in row:
+                if _local(c.tag) != "c":
+                    continue
+                ref = c.get("r")
+                col_no = col_index(_CELL_REF.match(ref).group(1)) if ref else col_no + 1
+                if col0 <= col_no < col1:
+                    cells[col_no] = self._cell_value(c)
+            found[row_no] = cells
+        return found
+
+    def page(self, sheet: str, row: int = 1, nrows: int = 50, col: int = 1, ncols: int = 26):
+        # DataFrame da janela [row, row+nrows) x [col, col+ncols), com índice
+        # = nº da linha no Excel e colunas = letras; células vazias = None
+        key = (sheet, int(row), int(nrows), int(col), int(ncols))
+        return self.pages.get_or_set(key, lambda: self._page(*key))
+
+    def _page(self, sheet: str, row: int, nrows: int, col: int, ncols: int):
+        import pandas as pd
+        idx = self._index(sheet)
+        row = max(row, 1)
+        col = max(col, 1)
+        with instrument.span("sheetview.page", sheet=sheet):
+            found = self._read_rows(idx, row, row + nrows, col, col + ncols)
+        rows = list(range(row, row + nrows))
+        cols = list(range(col, col + ncols))
+        data = [[found.get(r, {}).get(c) for c in cols] for r in rows]
+        instrument.count("cells_read", sum(len(v) for v in found.values()))
+        return pd.DataFrame(data, index=pd.Index(rows, name="Linha"),
+                            columns=[col_letter(c) for c in cols], dtype=object)
+
+    def close(self):
+        with self._zip_lock:
+            self._zip.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __del__(self):
+        try:
+            shutil.rmtree(self._dir, ignore_errors=True)
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
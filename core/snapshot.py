@@ -0,0 +1,164 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Any, Union, Optional
+from pathlib import Path
+import numpy as np
+from . import instrument
+
+# Snapshot compilado das tabelas (Ca, Vb, Tabelas 1/4/5) em .npz, chaveado
+# pelo hash do conteúdo do Excel + versão do esquema. Mudou o Excel -> novo hash
+# -> o snapshot é reconstruído. Mudou o formato -> incrementar SCHEMA_VERSION.
+SCHEMA_VERSION = 2
+
+# (caminho, mtime, tamanho) -> hash, para não reler o arquivo a cada chamada
+_path_hashes: Dict[tuple, str] = {}
+
+
+def cache_dir() -> Path:
+    return Path(os.environ.get("ABCP_CACHE_DIR", Path.home() / ".cache" / "dosagem_abcp"))
+
+
+def content_hash(source: Union[str, bytes, Path, Any]) -> str:
+    h = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        h.update(source)
+        return h.hexdigest()
+    if isinstance(source, (str, Path)):
+        st = os.stat(source)
+        memo = (str(source), st.st_mtime_ns, st.st_size)
+        if memo in _path_hashes:
+            return _path_hashes[memo]
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _path_hashes[memo] = h.hexdigest()
+        return _path_hashes[memo]
+    # file-like (ex.: UploadedFile do Streamlit)
+    if hasattr(source, "getvalue"):
+        h.update(source.getvalue())
+    else:
+        pos = source.tell()
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            h.update(chunk)
+        source.seek(pos)
+    return h.hexdigest()
+
+
+def snapshot_path(key: str) -> Path:
+    return cache_dir() / f"abcp-{key}-v{SCHEMA_VERSION}.npz"
+
+
+def _json_default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"Tipo não serializável: {type(o)!r}")
+
+
+def _to_array(rows) -> np.ndarray:
+    return np.array([[np.nan if v is None else float(v) for v in row] for row in rows], dtype=float).reshape(len(rows), -1)
+
+
+def _none_mask(rows) -> np.ndarray:
+    # Células vazias lidas como None (as numéricas em branco vêm como NaN):
+    # guardadas à parte para o snapshot devolver exatamente a leitura direta
+    return np.array([[v is None for v in row] for row in rows], dtype=bool).reshape(len(rows), -1)
+
+
+def _from_array(arr: np.ndarray, none: Optional[np.ndarray] = None):
+    rows = arr.tolist()
+    if none is not None:
+        for row, mask in zip(rows, none.tolist()):
+            for j, is_none in enumerate(mask):
+                if is_none:
+                    row[j] = None
+    return rows
+
+
+def write_snapshot(key: str, ca_lookup: Optional[Dict[str, Any]], abcp_tables: Optional[Dict[str, Any]]) -> Optional[Path]:
+    meta: Dict[str, Any] = {"schema": SCHEMA_VERSION, "key": key}
+    arrays: Dict[str, np.ndarray] = {}
+    try:
+        if ca_lookup is not None:
+            meta["ca_lookup"] = {"dmax_labels": ca_lookup["dmax_labels"], "slump_labels": ca_lookup["slump_labels"]}
+            arrays["ca_table"] = np.asarray(ca_lookup["ca_table"], dtype=float)
+        if abcp_tables is not None:
+            t2 = abcp_tables["tabela2"]; t3 = abcp_tables["tabela3"]
+            meta["abcp_tables"] = {
+                "tabela1": abcp_tables["tabela1"],
+                "tabela2": {"dmax": t2["dmax"], "slump": t2["slump"]},
+                "tabela3": {"dmax": t3["dmax"], "mf": t3["mf"]},
+                "tabela4": abcp_tables["tabela4"],
+                "tabela5": abcp_tables["tabela5"],
+            }
+            arrays["tabela2_ca"] = _to_array(t2["ca"])
+            arrays["tabela2_ca_none"] = _none_mask(t2["ca"])
+            arrays["tabela3_vb"] = _to_array(t3["vb"])
+            arrays["tabela3_vb_none"] = _none_mask(t3["vb"])
+        payload = np.array(json.dumps(meta, default=_json_default))
+    except (ValueError, TypeError):
+        # célula de texto/data nas tabelas: sem snapshot, mas as tabelas já
+        # lidas continuam valendo
+        return None
+    path = snapshot_path(key)
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, meta=payload, **arrays)
+        os.replace(tmp, path)
+    except (OSError, ValueError, TypeError):
+        # cache é opcional: diretório sem permissão não impede o cálculo
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+        return None
+    return path
+
+
+def read_snapshot(key: str) -> Optional[Dict[str, Any]]:
+    path = snapshot_path(key)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta.get("schema") != SCHEMA_VERSION or meta.get("key") != key:
+                return None
+            ca_lookup = None
+            if "ca_lookup" in meta:
+                ca_lookup = dict(meta["ca_lookup"], ca_table=z["ca_table"])
+            abcp_tables = None
+            if "abcp_tables" in meta:
+                abcp_tables = meta["abcp_tables"]
+                abcp_tables["tabela2"]["ca"] = _from_array(z["tabela2_ca"], z["tabela2_ca_none"])
+                abcp_tables["tabela3"]["vb"] = _from_array(z["tabela3_vb"], z["tabela3_vb_none"])
+    except Exception:
+        return None
+    return {"ca_lookup": ca_lookup, "abcp_tables": abcp_tables}
+
+
+def compiled_tables(excel_path: Union[str, bytes, Path, Any]) -> Dict[str, Any]:
+    # Snapshot se existir; senão lê o Excel uma vez, compila e grava
+    from .ingest import ingest_workbook
+    from .abcp import _parse_ca_lookup
+    from .abcp_tables import _parse_abcp_tables
+
+    key = content_hash(excel_path)
+    with instrument.span("snapshot.read"):
+        snap = read_snapshot(key)
+    if snap is not None:
+        instrument.count("snapshot.hit")
+        return snap
+    instrument.count("snapshot.miss")
+    tables = ingest_workbook(excel_path)
+    ca_lookup = _parse_ca_lookup(tables)
+    try:
+        abcp_tables = _parse_abcp_tables(tables)
+    except Exception:
+        abcp_tables = None
+    with instrument.span("snapshot.write"):
+        write_snapshot(key, ca_lookup, abcp_tables)
+    return {"ca_lookup": ca_lookup, "abcp_tables": abcp_tables}
@@ -0,0 +1,16 @@
+import pytest
+
+from bench.synthetic import make_workbook
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # snapshots/calibrações de cada teste num diretório próprio
+    path = tmp_path / "cache"
+    monkeypatch.setenv("ABCP_CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture(scope="session")
+def workbook(tmp_path_factory):
+    return make_workbook(tmp_path_factory.mktemp("excel") / "abcp.xlsx")
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from bench.run_bench import BASE_INPUTS
+from core.archive import TracoArchive
+from core.compute import ABCP_INPUTS, compute_abcp_batch
+
+
+def _rows(n, seed):
+    rng = np.random.default_rng(seed)
+    cols = {k: np.full(n, float(v)) for k, v in BASE_INPUTS.items()}
+    cols["fcj"] = rng.uniform(20, 45, n)
+    cols["U_areia"] = rng.uniform(0, 8, n)
+    out = compute_abcp_batch(cols)
+    rows = {**{k: cols[k] for k in ABCP_INPUTS}, **{k: out[k].to_numpy() for k in out.columns},
+            "projeto": rng.choice(["P1", "P2", "P3"], n), "tecnico": rng.choice(["ana", "rui"], n)}
+    ts = 1_700_000_000 + rng.permutation(n) * 60        # fora de ordem: ts também ganha índice
+    return rows, ts
+
+
+def _archive(tmp_path, n=3000, indexed=2000):
+    arch = TracoArchive(tmp_path / "arq", reindex_min=10**9)
+    rows, ts = _rows(n, 0)
+    first = {k: v[:indexed] for k, v in rows.items()}
+    rest = {k: v[indexed:] for k, v in rows.items()}
+    arch.append(first, ts=ts[:indexed])
+    arch.build_indexes()
+    arch.append(rest, ts=ts[indexed:])                   # cauda não indexada
+    return arch, pd.DataFrame(rows).assign(ts=ts)
+
+
+def test_select_matches_pandas_masks(tmp_path):
+    arch, df = _archive(tmp_path)
+    got = arch.select(projeto="P2", tecnico="rui", ac=(0.45, 0.6), Cc=(300, None),
+                      date_from=1_700_000_000 + 600 * 60, U_areia=(1.0, 5.0))
+    mask = ((df.projeto == "P2") & (df.tecnico == "rui") & df.ac.between(0.45, 0.6)
+            & (df.Cc >= 300) & (df.ts >= 1_700_000_000 + 600 * 60) & df.U_areia.between(1.0, 5.0))
+    assert len(got) and np.array_equal(got, np.flatnonzero(mask))
+    assert len(arch.select(projeto="nao-existe")) == 0
+
+
+def test_aggregate_and_reopen(tmp_path):
+    arch, df = _archive(tmp_path)
+    agg = arch.aggregate(["Cc"])
+    ref = df.groupby("projeto")["Cc"].agg(["size", "mean", "min", "max"])
+    assert np.array_equal(agg.loc[ref.index, "n"], ref["size"])
+    assert np.allclose(agg.loc[ref.index, "Cc_mean"], ref["mean"])
+    assert np.allclose(agg.loc[ref.index, "Cc_max"], ref["max"])
+
+    again = TracoArchive(tmp_path / "arq")
+    assert len(again) == len(df)
+    assert np.array_equal(again.select(projeto="P1", ac=(None, 0.5)), arch.select(projeto="P1", ac=(None, 0.5)))
+
+
+def test_reindex_keeps_open_maps_readable(tmp_path):
+    arch, _ = _archive(tmp_path)
+    reader = TracoArchive(tmp_path / "arq")
+    before = reader.select(ac=(0.4, 0.55))
+    arch.build_indexes()                                # troca .key/.ord sob os memmaps do leitor
+    assert np.array_equal(reader.select(ac=(0.4, 0.55)), before)
+    assert not list((tmp_path / "arq").glob("*.tmp"))
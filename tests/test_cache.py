@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from core.cache import LRUCache
+
+
+def test_lru_evicts_least_recent():
+    c = LRUCache(2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is None and c.get("a") == 1 and c.get("c") == 3
+
+
+def test_get_or_set_builds_once_under_concurrency():
+    c = LRUCache(4)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return 42
+
+    threads = [threading.Thread(target=c.get_or_set, args=("k", build)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [1] and c.get("k") == 42
+
+
+def test_get_or_set_failure_leaves_no_build_lock():
+    c = LRUCache(4)
+
+    def boom():
+        raise RuntimeError("falhou")
+
+    with pytest.raises(RuntimeError):
+        c.get_or_set("k", boom)
+    assert c._building == {}
+    assert c.get_or_set("k", lambda: 1) == 1
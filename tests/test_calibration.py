@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.calibration import AbramsCalibration
+
+CURVES = {("CP II", 28): (96.0, 9.2), ("CP V", 7): (80.0, 7.0)}
+
+
+def _records(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    parts = []
+    for (cimento, idade), (A, B) in CURVES.items():
+        ac = rng.uniform(0.40, 0.70, n)
+        fc = A / B**ac * np.exp(rng.normal(0, 0.02, n))
+        parts.append(pd.DataFrame({"cimento": cimento, "idade": idade, "ac": ac, "fc": fc}))
+    return pd.concat(parts, ignore_index=True)
+
+
+def test_fit_recovers_curves_and_refits_incrementally():
+    recs = _records()
+    cal = AbramsCalibration("lab").fit(recs.iloc[:500])
+    cal.fit(recs)
+    assert cal.last_update == {"mode": "incremental", "rows": len(recs) - 500}
+    full = AbramsCalibration().fit(recs)
+    assert np.allclose(cal.table[["A", "B"]], full.table[["A", "B"]])
+    for key, (A, B) in CURVES.items():
+        c = cal.curve(*key)
+        assert c.A == pytest.approx(A, rel=0.05) and c.B == pytest.approx(B, rel=0.05)
+    assert AbramsCalibration("lab").digest == cal.digest        # recarregado do cache
+
+
+def test_ac_for_broadcasts_target_against_row_keys():
+    cal = AbramsCalibration().fit(_records())
+    cimento = np.array(["CP II", "CP V", "CP II", "outro"], dtype=object)
+    idade = np.array([28, 7, 28, 28])
+    ac = cal.ac_for(35.0, cimento, idade)                         # alvo escalar, chaves por linha
+    assert ac.shape == (4,) and np.isnan(ac[3])
+    assert ac[0] == ac[2] == pytest.approx(float(cal.curve("CP II", 28).ac_for(35.0)))
+    assert ac[1] == pytest.approx(float(cal.curve("CP V", 7).ac_for(35.0)))
+    assert np.allclose(cal.fc_for(ac[:3], cimento[:3], idade[:3]), 35.0)
+
+
+def test_outside_tested_range_is_nan_unless_extrapolating():
+    cal = AbramsCalibration().fit(_records())
+    row = cal.table.set_index(["cimento", "idade"]).loc[("CP II", 28)]
+    curve = cal.curve("CP II", 28)
+    fc_hi, fc_lo = curve.fc_for(row["ac_min"]), curve.fc_for(row["ac_max"])
+    targets = [fc_hi * 1.2, fc_hi, (fc_hi + fc_lo) / 2, fc_lo, fc_lo * 0.8]
+    ac = cal.ac_for(targets, "CP II", 28)
+    assert np.isnan(ac[[0, 4]]).all() and np.isfinite(ac[1:4]).all()
+    assert np.isfinite(cal.ac_for(targets, "CP II", 28, extrapolate=True)).all()
+    assert np.isnan(cal.fc_for(0.9, "CP II", 28))
+    assert cal.fc_for(0.9, "CP II", 28, extrapolate=True) == pytest.approx(float(curve.fc_for(0.9)))
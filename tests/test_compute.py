@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.compute import ABCP_INPUTS, ABCP_OUTPUTS, compute_abcp, compute_abcp_batch
+from bench.run_bench import BASE_INPUTS
+
+
+def _mixes(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame([BASE_INPUTS] * n)
+    df["ac"] = rng.uniform(0.35, 0.75, n)
+    df["Cc_min"] = rng.choice([0.0, 320.0, 600.0], n)          # passa pelo limite de Cc
+    df["Cb_total"] = rng.uniform(900, 2200, n)                  # inclui Vm <= 0
+    df["perc_b_menor"] = rng.choice([0, 30, 50, 100], n)
+    df["U_areia"] = rng.uniform(0, 10, n)
+    df["a_areia"] = rng.uniform(0, 2, n)
+    df["U_brita"] = rng.uniform(0, 2, n)
+    return df
+
+
+def test_batch_matches_scalar():
+    df = _mixes()
+    batch = compute_abcp_batch(df)
+    for i, row in enumerate(df.to_dict("records")):
+        one = compute_abcp(**row)
+        for k in ABCP_OUTPUTS:
+            assert batch[k].iloc[i] == pytest.approx(one[k], rel=1e-12, abs=1e-9), (i, k)
+
+
+def test_batch_broadcasts_scalars_and_kwargs():
+    df = _mixes(10)
+    cols = {k: df[k].to_numpy() for k in ABCP_INPUTS if k != "rho_w"}
+    out = compute_abcp_batch(cols, rho_w=1000.0)
+    assert np.allclose(out.to_numpy(), compute_abcp_batch(df).to_numpy(), equal_nan=True)
+
+
+def test_batch_missing_input():
+    with pytest.raises(KeyError):
+        compute_abcp_batch({"ac": [0.5]})
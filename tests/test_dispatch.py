@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.compute import compute_abcp_batch
+from core.dispatch import RESOLUTION, TICKET_QUANTITIES, carry_round, order_totals, plan_dispatch
+from bench.run_bench import BASE_INPUTS
+
+
+def test_carry_round_totals():
+    rng = np.random.default_rng(1)
+    group = np.repeat(np.arange(50), rng.integers(1, 9, 50))
+    exact = rng.uniform(0, 500, (len(group), 2))
+    res = np.array([1.0, 5.0])
+    out = carry_round(exact, group, res)
+    assert np.allclose(out / res, np.round(out / res))                  # múltiplos da resolução
+    assert np.all(np.abs(out - exact) <= res + 1e-9)                    # erro de no máximo 1 passo
+    tot = pd.DataFrame(out).groupby(group).sum().to_numpy()
+    want = np.round(pd.DataFrame(exact).groupby(group).sum().to_numpy() / res) * res
+    assert np.allclose(tot, want)
+
+
+def test_plan_dispatch_totals():
+    mixes = pd.DataFrame([dict(BASE_INPUTS, ac=a) for a in (0.4, 0.5, 0.6)], index=["T1", "T2", "T3"])
+    orders = pd.DataFrame({
+        "pedido": [1, 2, 3, 4], "traco": ["T1", "T2", "T1", "T3"],
+        "volume_m3": [16.0, 7.5, 23.3, 0.5], "cap_caminhao": 8.0, "cap_misturador": [3.0, 2.5, 3.0, 2.0],
+    })
+    tickets = plan_dispatch(orders, mixes)
+    tot = order_totals(tickets)
+    assert np.allclose(tot["volume_m3"], orders["volume_m3"])
+    assert tot["caminhoes"].tolist() == [2, 1, 3, 1]
+    assert (tickets["volume_m3"] <= np.repeat(orders["cap_misturador"].to_numpy(), tot["betonadas"]) + 1e-9).all()
+    per_m3 = compute_abcp_batch(mixes.loc[orders["traco"]].reset_index(drop=True))
+    for name, src in TICKET_QUANTITIES:
+        r = RESOLUTION[name]
+        want = np.round(orders["volume_m3"].to_numpy() * per_m3[src].to_numpy() / r) * r
+        assert np.allclose(tot[name], want), name
+
+
+def _orders(**cols):
+    return pd.DataFrame(dict({"pedido": [10, 11, 12], "traco": ["T1", "T2", "T1"], "volume_m3": 8.0,
+                              "cap_caminhao": 8.0, "cap_misturador": 3.0}, **cols))
+
+
+def test_defaults_fill_missing_and_blank_inputs():
+    mixes = pd.DataFrame([BASE_INPUTS, BASE_INPUTS], index=["T1", "T2"]).drop(columns=["U_brita"])
+    mixes["a_brita"] = [np.nan, 1.0]                      # vazio -> padrão (0)
+    tickets = plan_dispatch(_orders(), mixes)
+    assert tickets[[n for n, _ in TICKET_QUANTITIES]].notna().all().all()
+
+
+def test_blank_input_without_default_lists_orders():
+    mixes = pd.DataFrame([BASE_INPUTS, dict(BASE_INPUTS, U_areia=np.nan)], index=["T1", "T2"])
+    with pytest.raises(ValueError, match=r"U_areia.*11") as e:
+        plan_dispatch(_orders(), mixes)
+    assert "10" not in str(e.value).split(":")[-1]
+    inline = _orders(**{k: v for k, v in BASE_INPUTS.items()}).drop(columns="traco")
+    inline.loc[2, "ac"] = np.nan
+    with pytest.raises(ValueError, match=r"\(ac\): 12$"):
+        plan_dispatch(inline)
+
+
+def test_duplicate_mix_codes_rejected():
+    mixes = pd.DataFrame([BASE_INPUTS, dict(BASE_INPUTS, ac=0.6)], index=["T1", "T1"])
+    with pytest.raises(ValueError, match="repetidos.*T1"):
+        plan_dispatch(_orders(traco=["T1", "T1", "T1"]), mixes)
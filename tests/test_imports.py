@@ -0,0 +1,9 @@
+import pytest
+
+from bench.run_bench import LIGHT_MODULES, measure_import
+
+
+@pytest.mark.parametrize("module", LIGHT_MODULES)
+def test_light_modules_skip_heavy_deps(module):
+    # só as dependências; o tempo absoluto fica com bench.run_bench --check-imports
+    assert measure_import(module, repeat=1)["heavy"] == []
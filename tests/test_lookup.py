@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from core.lookup import GridTable
+
+NAN = float("nan")
+
+
+@pytest.fixture
+def grid():
+    # 3 Dmáx x 3 slumps, com uma célula em branco no meio da última linha
+    return GridTable([9.5, 19, 25], ["40-60", "60-80", "80-100"],
+                     [[230, 220, 210], [205, 195, 185], [200, None, 180]])
+
+
+def test_exact_by_label_and_value(grid):
+    assert grid.lookup(19, "60-80") == 195
+    assert grid.lookup("19.0", "60-80") == 195
+    assert np.isnan(grid.lookup(20, "60-80"))
+    assert np.isnan(grid.lookup(25, "60-80"))
+
+
+def test_nearest(grid):
+    assert grid.lookup(18, 72, mode="nearest") == 195
+    out = grid.lookup(np.array([9, 30]), np.array(["40-60", "90-110"]), mode="nearest")
+    assert out.tolist() == [230, 180]
+
+
+def test_bilinear_midpoint_and_clamp(grid):
+    assert grid.lookup(14.25, 60, mode="bilinear") == pytest.approx((230 + 220 + 205 + 195) / 4)
+    assert grid.lookup(5, 40, mode="bilinear") == 230          # satura na borda
+
+
+def test_bilinear_on_grid_point_next_to_blank(grid):
+    # vizinhos com peso zero não contaminam o valor exato
+    assert grid.lookup(25, "40-60", mode="bilinear") == 200    # ao lado da célula em branco
+    assert grid.lookup(19, "60-80", mode="bilinear") == 195    # acima da célula em branco
+    assert grid.lookup(25, "80-100", mode="bilinear") == 180   # último ponto (peso 1)
+    assert np.isnan(grid.lookup(22, "60-80", mode="bilinear"))  # interpola com a branca
+
+
+def test_bilinear_vectorized_matches_scalar(grid):
+    rows = np.array([9.5, 12, 19, 25, 25])
+    cols = np.array([50, 55, 70, 50, 90])
+    out = grid.lookup(rows, cols, mode="bilinear")
+    assert np.allclose(out, [grid.lookup(r, c, mode="bilinear") for r, c in zip(rows, cols)], equal_nan=True)
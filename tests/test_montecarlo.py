@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from bench.run_bench import BASE_INPUTS
+from core.compute import compute_abcp_batch
+from core.montecarlo import StreamingHistogram, run_monte_carlo
+
+DISTS = {"U_areia": ("normal", 6.0, 1.0, 0.0, 12.0), "I_inch": ("uniform", 15.0, 30.0)}
+
+
+def test_histogram_widens_instead_of_clipping():
+    rng = np.random.default_rng(0)
+    x = rng.standard_t(3, 200_000)
+    h = StreamingHistogram(-1.0, 1.0, bins=1024)               # faixa bem menor que os dados
+    for part in np.array_split(x, 10):
+        g = StreamingHistogram(-1.0, 1.0, bins=1024)
+        g.add(part)
+        h.merge(g)
+    assert h.n == len(x) and h.counts.sum() == len(x)
+    assert h.lo <= x.min() and h.hi > x.max()
+    q = [0.001, 0.5, 0.999]
+    assert np.allclose(h.quantile(q), np.quantile(x, q), atol=h.width)
+
+
+def test_percentiles_match_direct_sampling():
+    res = run_monte_carlo(BASE_INPUTS, DISTS, 100_000, chunk_size=25_000, seed=3)
+    rng = np.random.default_rng(7)
+    cols = dict(BASE_INPUTS, U_areia=np.clip(rng.normal(6, 1, 400_000), 0, 12),
+                I_inch=rng.uniform(15, 30, 400_000))
+    ref = compute_abcp_batch(cols, as_frame=False)["agua_adicionar_kg"]
+    row = res.loc["agua_adicionar_kg"]
+    assert row["n"] == 100_000
+    for p in (5, 50, 95):
+        assert row[f"p{p}"] == pytest.approx(np.percentile(ref, p), rel=0.01)
+
+
+def test_seed_reproducible_regardless_of_workers():
+    a = run_monte_carlo(BASE_INPUTS, DISTS, 40_000, chunk_size=10_000, seed=1)
+    b = run_monte_carlo(BASE_INPUTS, DISTS, 40_000, chunk_size=10_000, seed=1, workers=2)
+    assert a.equals(b)
+
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        run_monte_carlo(BASE_INPUTS, DISTS, 0)
+    with pytest.raises(KeyError, match="Ca"):
+        run_monte_carlo(BASE_INPUTS, {"Ca": ("normal", 200, 5)}, 100)
+    with pytest.raises(ValueError, match="serializáveis"):
+        run_monte_carlo(BASE_INPUTS, {"U_areia": lambda rng, n: rng.normal(6, 1, n)}, 100, workers=2)
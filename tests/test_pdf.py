@@ -0,0 +1,25 @@
+import io
+import zipfile
+
+import pytest
+
+from bench.run_bench import BASE_INPUTS
+from core.pdf_utils import render_traco_pdf, render_traco_zip
+
+IDENT = {"projeto": "Obra A", "tecnico": "Fulano", "uso": "Laje", "fabricado_em": "2024-01-02"}
+
+
+def test_single_pdf():
+    assert render_traco_pdf(IDENT, BASE_INPUTS, {"Cc": 380.0}).startswith(b"%PDF")
+
+
+def test_zip_keeps_every_pdf_with_repeated_names():
+    designs = [(IDENT, BASE_INPUTS, {"Cc": 380.0})] * 3
+    data = render_traco_zip(designs, names=["a.pdf", "a.pdf", "b"])
+    names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+    assert names == ["a.pdf", "a_2.pdf", "b"]
+
+
+def test_zip_rejects_name_count_mismatch():
+    with pytest.raises(ValueError):
+        render_traco_zip([(IDENT, BASE_INPUTS, {})] * 2, names=["a.pdf"])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from bench.run_bench import BASE_INPUTS
+from core.compute import ABCP_INPUTS, ABCP_OUTPUTS, compute_abcp_batch
+from core.sensitivity import compute_abcp_jacobian, sensitivity_table
+
+
+def _batch(n=64, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = {k: np.full(n, float(v)) for k, v in BASE_INPUTS.items()}
+    cols["ac"] = rng.uniform(0.4, 0.7, n)                 # metade com Cc_min ativo
+    cols["U_areia"] = rng.uniform(1, 8, n)
+    cols["I_inch"] = rng.uniform(15, 30, n)
+    cols["perc_b_menor"] = rng.uniform(20, 80, n)
+    cols["Ca_L"] = rng.uniform(180, 220, n)
+    return cols
+
+
+def _finite_diff(cols, h_rel=1e-6, sign=1.0):
+    base = compute_abcp_batch(cols)[list(ABCP_OUTPUTS)].to_numpy()
+    J = np.empty((len(base), len(ABCP_OUTPUTS), len(ABCP_INPUTS)))
+    for j, k in enumerate(ABCP_INPUTS):
+        h = sign * h_rel * np.maximum(np.abs(cols[k]), 1.0)
+        moved = compute_abcp_batch(dict(cols, **{k: cols[k] + h}))[list(ABCP_OUTPUTS)].to_numpy()
+        J[:, :, j] = (moved - base) / h[:, None]
+    return J
+
+
+@pytest.mark.parametrize("side", ["right", "left"])
+def test_jacobian_matches_finite_differences(side):
+    cols = _batch()
+    J = compute_abcp_jacobian(cols, side=side)["jacobian"]
+    ref = _finite_diff(cols, sign=1.0 if side == "right" else -1.0)
+    assert J.shape == (64, len(ABCP_OUTPUTS), len(ABCP_INPUTS))
+    assert np.allclose(J, ref, rtol=1e-4, atol=1e-4, equal_nan=True)
+
+
+def test_one_sided_derivatives_at_cement_floor():
+    # exatamente sobre Cc = Cc_min: à direita vale um ramo, à esquerda o outro
+    Cc = compute_abcp_batch(BASE_INPUTS)["Cc"].iloc[0]
+    cols = {k: np.array([float(v)]) for k, v in BASE_INPUTS.items()}
+    cols["Cc_min"] = np.array([Cc])
+    res = compute_abcp_jacobian(cols, side="both")
+    assert any(m[0] for m in res["kinks"].values())
+    for side, sign in (("right", 1.0), ("left", -1.0)):
+        ref = _finite_diff(cols, sign=sign)
+        assert np.allclose(res[f"jacobian_{side}"], ref, rtol=1e-4, atol=1e-4, equal_nan=True)
+    i, j = ABCP_OUTPUTS.index("Cc"), ABCP_INPUTS.index("Cc_min")
+    assert res["jacobian_right"][0, i, j] == pytest.approx(1.0)
+    assert res["jacobian_left"][0, i, j] == pytest.approx(0.0)
+
+
+def test_sensitivity_table_labels():
+    J = compute_abcp_jacobian(BASE_INPUTS)["jacobian"]
+    t = sensitivity_table(J, outputs=["agua_adicionar_kg"], inputs=["U_areia"])
+    assert t.loc["agua_adicionar_kg", "U_areia"] == J[0, ABCP_OUTPUTS.index("agua_adicionar_kg"),
+                                                      ABCP_INPUTS.index("U_areia")]
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import zipfile
+import io
+
+import pytest
+
+from bench.run_bench import BASE_INPUTS
+from core.compute import compute_abcp
+from core.server import ComputeService
+
+
+def _request(service, raw: bytes):
+    # manda bytes crus para um servidor em processo; devolve (status, cabeçalhos, corpo)
+    async def run():
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+            body = await reader.readexactly(int(headers["Content-Length"]))
+            writer.close()
+            return int(lines[0].split()[1]), headers, body
+    return asyncio.run(run())
+
+
+def _post(service, path, payload, extra=""):
+    data = json.dumps(payload).encode()
+    raw = (f"POST {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n{extra}"
+           f"Content-Length: {len(data)}\r\n\r\n").encode() + data
+    status, headers, body = _request(service, raw)
+    return status, (json.loads(body) if headers["Content-Type"] == "application/json" else body)
+
+
+@pytest.fixture
+def service():
+    s = ComputeService(workers=0)
+    yield s
+    s.close()
+
+
+def test_compute_and_batch(service):
+    status, out = _post(service, "/compute", BASE_INPUTS)
+    assert status == 200 and out["Cc"] == pytest.approx(compute_abcp(**BASE_INPUTS)["Cc"])
+    status, out = _post(service, "/compute/batch", {"mixes": [BASE_INPUTS, dict(BASE_INPUTS, ac=0.6)]})
+    assert status == 200 and out["n"] == 2
+    assert out["outputs"][1]["Cc"] == pytest.approx(compute_abcp(**dict(BASE_INPUTS, ac=0.6))["Cc"])
+    status, out = _post(service, "/compute/batch", {"columns": {k: [v] for k, v in BASE_INPUTS.items()}})
+    assert status == 200 and out["outputs"][0]["Cc"] == pytest.approx(compute_abcp(**BASE_INPUTS)["Cc"])
+
+
+def test_bad_bodies_are_client_errors(service):
+    assert _post(service, "/compute/batch", {"columns": [1, 2]})[0] == 400
+    assert _post(service, "/compute/batch", {"mixes": [{"ac": 0.5}]})[0] == 422
+    assert _post(service, "/pdf/batch", {"designs": [{"ident": {}}]})[0] == 400
+    assert _post(service, "/pdf/batch", {"designs": [{"inputs": [1]}]})[0] == 400
+    assert _post(service, "/pdf/batch", {"designs": [{"inputs": {"ac": 0.5}}]})[0] == 422
+    assert _post(service, "/pdf/batch", {"designs": [{"inputs": BASE_INPUTS}], "format": "tar"})[0] == 400
+    assert _post(service, "/pdf", {"ident": {}})[0] == 400
+    assert _post(service, "/nada", {})[0] == 404
+    assert _request(service, b"GET /compute HTTP/1.1\r\nConnection: close\r\n\r\n")[0] == 405
+
+
+def test_pdf_batch_zip(service):
+    designs = [{"ident": {"projeto": "A"}, "inputs": BASE_INPUTS},
+               {"ident": {"projeto": "B"}, "inputs": dict(BASE_INPUTS, ac=0.6)}]
+    status, body = _post(service, "/pdf/batch", {"designs": designs})
+    assert status == 200
+    names = zipfile.ZipFile(io.BytesIO(body)).namelist()
+    assert len(names) == 2 and all(n.endswith(".pdf") for n in names)
+
+
+def test_chunked_body(service):
+    data = json.dumps(BASE_INPUTS).encode()
+    chunks = b"".join(b"%x;ext=1\r\n%s\r\n" % (len(data[i:i + 50]), data[i:i + 50])
+                      for i in range(0, len(data), 50))
+    raw = (b"POST /compute HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+           b"Transfer-Encoding: chunked\r\n\r\n" + chunks + b"0\r\nX-Trailer: 1\r\n\r\n")
+    status, _, body = _request(service, raw)
+    assert status == 200 and json.loads(body)["Cc"] == pytest.approx(compute_abcp(**BASE_INPUTS)["Cc"])
+
+    gz = b"POST /compute HTTP/1.1\r\nTransfer-Encoding: gzip, chunked\r\n\r\n"
+    status, headers, _ = _request(service, gz)
+    assert status == 501 and headers["Connection"] == "close"
+    bad = b"POST /compute HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n"
+    assert _request(service, bad)[0] == 400
+
+    small = ComputeService(workers=0, max_body=100)
+    big = b"POST /compute HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n" + b"80\r\n" + b"x" * 128 + b"\r\n0\r\n\r\n"
+    assert _request(small, big)[0] == 413
+
+
+class _Writer:
+    def __init__(self, fail_drain=False):
+        self.fail_drain, self.data, self.closed = fail_drain, b"", False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        if self.fail_drain:
+            raise ConnectionResetError
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+@pytest.mark.parametrize("raw, fail_drain", [
+    (b"POST /compute HTTP/1.1\r\nContent-Length: 100\r\n\r\n{\"ac\"", False),          # corpo cortado
+    (b"POST /compute HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n10\r\nabc", False),
+    (b"GET /health HTTP/1.1\r\n\r\n", True),                                            # reset no drain
+])
+def test_client_disconnect_closes_quietly(service, raw, fail_drain):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = _Writer(fail_drain)
+        await service.handle(reader, writer)
+        return writer
+    assert asyncio.run(run()).closed
@@ -0,0 +1,73 @@
+import datetime as dt
+import zipfile
+
+import openpyxl
+import pytest
+
+from core.sheetview import SheetViewer, col_letter
+
+
+def _values(ws, row, nrows, col, ncols):
+    return [list(r) for r in ws.iter_rows(min_row=row, max_row=row + nrows - 1, min_col=col,
+                                          max_col=col + ncols - 1, values_only=True)]
+
+
+def _same(a, b):
+    return a == b or (a != a and b != b)
+
+
+def test_pages_match_openpyxl(workbook):
+    wb = openpyxl.load_workbook(workbook, data_only=True)
+    with SheetViewer(workbook, stride=7) as v:
+        assert v.sheetnames == wb.sheetnames
+        for name in wb.sheetnames:
+            ws = wb[name]
+            assert v.dimensions(name) == (ws.max_row, ws.max_column)
+            for row in (1, 8, max(ws.max_row - 5, 1)):
+                df = v.page(name, row, 10, 1, ws.max_column)
+                ref = _values(ws, row, 10, 1, ws.max_column)
+                got = df.values.tolist()
+                assert all(_same(a, b) for ra, rb in zip(got, ref) for a, b in zip(ra, rb)), (name, row)
+                assert list(df.columns) == [col_letter(c) for c in range(1, ws.max_column + 1)]
+
+
+def _patched(tmp_path, sheet_xml):
+    # xlsx mínimo do openpyxl com a aba trocada por `sheet_xml`
+    src = tmp_path / "base.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active["A1"] = 1
+    wb.save(src)
+    out = tmp_path / "patched.xlsx"
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(out, "w") as zout:
+        for item in zin.infolist():
+            data = sheet_xml if item.filename == "xl/worksheets/sheet1.xml" else zin.read(item)
+            zout.writestr(item, data)
+    return out
+
+
+SHEET = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<dimension ref="A1:B2"/><sheetData>'
+    '<row r="1"><c r="A1" t="d"><v>2024-03-01T10:20:00</v></c><c r="B1" t="d"><v>2024-03-01</v></c></row>'
+    '<row r="2"><c r="A2"><v>#N/D</v></c><c r="E2"><v>2.5</v></c></row>'
+    '</sheetData></worksheet>'
+)
+
+
+def test_iso_dates_bad_numbers_and_stale_dimension(tmp_path):
+    with SheetViewer(_patched(tmp_path, SHEET)) as v:
+        name = v.sheetnames[0]
+        assert v.dimensions(name) == (2, 5)          # E2 fora do <dimension>
+        df = v.page(name, 1, 2, 1, 5)
+        assert df.loc[1, "A"] == dt.datetime(2024, 3, 1, 10, 20)
+        assert df.loc[1, "B"] == dt.date(2024, 3, 1)
+        assert df.loc[2, "A"] == "#N/D"
+        assert df.loc[2, "E"] == 2.5
+
+
+def test_not_a_workbook(tmp_path):
+    bad = tmp_path / "bad.xlsx"
+    bad.write_bytes(b"not a zip")
+    with pytest.raises(zipfile.BadZipFile):
+        SheetViewer(bad)
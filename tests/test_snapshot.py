@@ -0,0 +1,60 @@
+import numpy as np
+
+from core.abcp import _parse_ca_lookup
+from core.abcp_tables import _parse_abcp_tables, lookup_ca_from_tables
+from core.ingest import ingest_workbook
+from core.snapshot import compiled_tables, content_hash, snapshot_path
+
+
+def _same(a, b):
+    if isinstance(a, dict):
+        assert set(a) == set(b)
+        for k in a:
+            _same(a[k], b[k])
+    elif isinstance(a, (list, tuple, np.ndarray)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            _same(x, y)
+    elif isinstance(a, float) and np.isnan(a):
+        assert isinstance(b, float) and np.isnan(b)
+    else:
+        assert a == b
+
+
+def test_snapshot_round_trip(workbook):
+    tables = ingest_workbook(str(workbook))
+    parsed = {"ca_lookup": _parse_ca_lookup(tables), "abcp_tables": _parse_abcp_tables(tables)}
+
+    first = compiled_tables(str(workbook))          # lê o Excel e grava o snapshot
+    assert snapshot_path(content_hash(str(workbook))).exists()
+    second = compiled_tables(str(workbook))         # vem do snapshot
+    _same(parsed, first)
+    _same(parsed, second)
+
+
+def test_blank_cells_same_cold_and_warm(workbook):
+    cold = compiled_tables(str(workbook))["abcp_tables"]
+    warm = compiled_tables(str(workbook))["abcp_tables"]
+    t2 = cold["tabela2"]
+    for slump in t2["slump"]:
+        for dmax in [d for d in t2["dmax"] if d == d]:     # rótulos reais (sem NaN)
+            a = lookup_ca_from_tables(cold, dmax, slump)
+            b = lookup_ca_from_tables(warm, dmax, slump)
+            assert (a is None and b is None) or a == b or (np.isnan(a) and np.isnan(b)), (dmax, slump)
+
+
+def test_unserializable_cells_do_not_break_loading(workbook, monkeypatch):
+    import datetime
+    import core.abcp_tables as at
+
+    parse = at._parse_abcp_tables
+
+    def with_date(tables):
+        out = parse(tables)
+        out["tabela1"]["extra"] = datetime.date(2024, 1, 1)
+        return out
+
+    monkeypatch.setattr(at, "_parse_abcp_tables", with_date)
+    out = compiled_tables(str(workbook))
+    assert out["abcp_tables"]["tabela1"]["extra"] == datetime.date(2024, 1, 1)
+    assert not snapshot_path(content_hash(str(workbook))).exists()